@@ -0,0 +1,3 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
@@ -0,0 +1,101 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+"""
+Run benchmarks and write results as JSON.
+
+    python -m benchmark --quick --output result.json
+    python -m benchmark --output new.json --baseline result.json
+
+Each case runs in its own process, so peak RSS is not affected by other cases.
+With baseline, cases slower than threshold make exit code 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+from typing import Any
+
+import PIL
+
+from .cases import CASES
+from .measure import measure
+
+
+def key(result: dict[str, Any]) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results: list[dict[str, Any]], baseline: dict[str, Any], threshold: float) -> bool:
+    """
+    Print ratio of time to baseline. Return False if a case is slower than threshold.
+    """
+    base = {key(result): result for result in baseline["results"]}
+    passed = True
+    for result in results:
+        old = base.get(key(result))
+        if old is None:
+            print(f"{key(result)}: not in baseline")
+            continue
+        ratio = result["seconds"] / max(old["seconds"], 1e-9)
+        slower = ratio > threshold
+        passed = passed and not slower
+        mark = " SLOWER" if slower else ""
+        print(f"{key(result)}: {old['seconds']:.4f}s -> {result['seconds']:.4f}s (x{ratio:.2f}){mark}")
+    return passed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="benchmark of image_jointer")
+    parser.add_argument("-k", dest="keyword", default="", help="run only cases whose name contains keyword")
+    parser.add_argument("--quick", action="store_true", help="run small parameters only")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs. default to 3")
+    parser.add_argument("--output", help="file to write results as JSON. default to stdout")
+    parser.add_argument("--baseline", help="JSON written by previous run to compare")
+    parser.add_argument("--threshold", type=float, default=1.2, help="allowed ratio of time to baseline")
+    args = parser.parse_args(argv)
+
+    jobs = [
+        (case.name, params)
+        for case in CASES.values()
+        if args.keyword in case.name
+        for params in (case.quick_params if args.quick else case.params)
+    ]
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for name, params in jobs:
+        with context.Pool(1) as pool:
+            result = pool.apply(measure, (name, params, args.repeat))
+        print(f"{key(result)}: {result['seconds']:.4f}s", file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": results,
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+"""
+Benchmark cases.
+Each case makes its inputs and returns a function to measure. The function may return extra metrics.
+If "parts" is returned, bytes per part is reported from peak of traced memory.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from PIL import Image
+
+from image_jointer import ImageJointer, JointAlignment, LayoutPlan, PositionAlignment, Utility
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    setup: Callable[..., Callable[[], dict[str, Any] | None]]
+    params: tuple[dict[str, Any], ...]
+    quick_params: tuple[dict[str, Any], ...]
+
+
+CASES: dict[str, Case] = {}
+
+
+def case(name: str, params: list[dict[str, Any]], quick_params: list[dict[str, Any]] | None = None):
+    def register(setup: Callable[..., Callable[[], dict[str, Any] | None]]):
+        CASES[name] = Case(name, setup, tuple(params), tuple(params if quick_params is None else quick_params))
+        return setup
+
+    return register
+
+
+def make_images(count: int, mode: str = "RGB", min_size: int = 8, max_size: int = 64, seed: int = 0):
+    rng = random.Random(seed)
+    sizes = [(rng.randint(min_size, max_size), rng.randint(min_size, max_size)) for _ in range(count)]
+    return [Image.new(mode, size, (i % 256, 64, 128)[: len(mode)]) for i, size in enumerate(sizes)]
+
+
+@case("joint_chain", [{"length": n} for n in (10, 100, 1000, 10000, 100000)], [{"length": n} for n in (10, 1000)])
+def joint_chain(length: int):
+    images = make_images(length)
+
+    def run():
+        jointed = ImageJointer()
+        for image in images:
+            jointed = jointed.joint(JointAlignment.RIGHT_CENTER, image)
+        return {"parts": length}
+
+    return run
+
+
+@case("joint_batch", [{"length": n} for n in (1000, 100000)], [{"length": 1000}])
+def joint_batch(length: int):
+    images = make_images(length)
+
+    def run():
+        ImageJointer().joint(JointAlignment.RIGHT_CENTER, *images)
+        return {"parts": length}
+
+    return run
+
+
+@case("nest_depth", [{"depth": n} for n in (1, 10, 100, 1000)], [{"depth": n} for n in (1, 100)])
+def nest_depth(depth: int):
+    images = make_images(depth + 1, min_size=4, max_size=16)
+
+    def run():
+        jointed = ImageJointer(images[0])
+        for i, image in enumerate(images[1:]):
+            alignment = JointAlignment.DOWN_CENTER if i % 2 else JointAlignment.RIGHT_CENTER
+            jointed = ImageJointer(image).joint(alignment, jointed)
+        jointed.to_image()
+
+    return run
+
+
+@case(
+    "alignment",
+    [{"alignment": alignment.name, "count": 1000} for alignment in JointAlignment],
+    [{"alignment": alignment.name, "count": 100} for alignment in JointAlignment],
+)
+def alignment(alignment: str, count: int):
+    images = make_images(count, "RGBA", 4, 32)
+
+    def run():
+        ImageJointer().joint(JointAlignment[alignment], *images).to_image()
+
+    return run
+
+
+@case("unify_image_size", [{"count": n} for n in (100, 1000, 10000, 50000)], [{"count": n} for n in (100, 1000)])
+def unify_image_size(count: int):
+    images = make_images(count)
+
+    def run():
+        Utility.unify_image_size(PositionAlignment.CENTER_CENTER, *images)
+
+    return run
+
+
+@case("grid", [{"cells": n} for n in (1000, 100000)], [{"cells": 1000}])
+def grid(cells: int):
+    images = make_images(cells, "L", 1, 8)
+
+    def run():
+        Utility.grid(PositionAlignment.CENTER_CENTER, int(cells**0.5), *images)
+
+    return run
+
+
+@case("pack", [{"sprites": n} for n in (1000, 50000)], [{"sprites": 1000}])
+def pack(sprites: int):
+    images = {i: image for i, image in enumerate(make_images(sprites))}
+    area = sum(image.width * image.height for image in images.values())
+
+    def run():
+        packed, _ = Utility.pack(images)
+        return {"density": area / (packed.width * packed.height)}
+
+    return run
+
+
+def make_canvas(size: int, tile: int, mode: str):
+    images = make_images((size // tile) ** 2, mode, tile, tile)
+    return Utility.grid(PositionAlignment.TOP_LEFT, size // tile, *images)
+
+
+@case(
+    "render",
+    [
+        {"size": size, "tile": 256, "mode": mode, "workers": workers}
+        for size in (4096, 16384)
+        for mode in ("RGB", "RGBA")
+        for workers in (1, 4)
+    ],
+    [{"size": 1024, "tile": 128, "mode": mode, "workers": 1} for mode in ("RGB", "RGBA")],
+)
+def render(size: int, tile: int, mode: str, workers: int):
+    canvas = make_canvas(size, tile, mode)
+
+    def run():
+        canvas.to_image(workers=workers, mode="auto")
+
+    return run
+
+
+@case(
+    "render_array",
+    [{"size": 4096, "tile": 256, "mode": mode} for mode in ("RGB", "RGBA")],
+    [{"size": 1024, "tile": 128, "mode": "RGB"}],
+)
+def render_array(size: int, tile: int, mode: str):
+    canvas = make_canvas(size, tile, mode)
+
+    def run():
+        canvas.to_array(mode=mode)
+
+    return run
+
+
+@case("render_region", [{"parts": n} for n in (10000, 100000)], [{"parts": 10000}])
+def render_region(parts: int):
+    canvas = Utility.grid(PositionAlignment.TOP_LEFT, int(parts**0.5), *make_images(parts, "RGB", 16, 16))
+    canvas.to_image(box=(0, 0, 1, 1))
+
+    def run():
+        for i in range(100):
+            left = i * 13 % (canvas.width - 256)
+            top = i * 29 % (canvas.height - 256)
+            canvas.to_image(box=(left, top, left + 256, top + 256))
+
+    return run
+
+
+@case("plan_load", [{"parts": n} for n in (100000, 1000000)], [{"parts": 100000}])
+def plan_load(parts: int):
+    data = LayoutPlan(
+        parts,
+        1,
+        [f"{i}.png" for i in range(100)],
+        [i % 100 for i in range(parts)],
+        range(parts),
+        [0] * parts,
+        [1] * parts,
+        [1] * parts,
+    ).to_bytes()
+
+    def run():
+        LayoutPlan.from_bytes(data)
+        return {"bytes": len(data)}
+
+    return run
@@ -0,0 +1,59 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from .cases import CASES
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def measure(name: str, params: dict[str, Any], repeat: int) -> dict[str, Any]:
+    """
+    Measure case in current process. Wall time is minimum of repeat without tracing,
+    and memory is measured in one more traced run.
+    """
+    run = CASES[name].setup(**params)
+
+    seconds = []
+    extra = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        extra = run()
+        seconds.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result: dict[str, Any] = {
+        "name": name,
+        "params": params,
+        "seconds": min(seconds),
+        "tracemalloc_peak": traced_peak,
+        "rss_peak": None if resource is None else _max_rss(),
+    }
+    if extra:
+        result["extra"] = extra
+        if "parts" in extra:
+            result["extra"]["bytes_per_part"] = traced_peak / max(extra["parts"], 1)
+    return result
+
+
+def _max_rss() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on others.
+    return rss if sys.platform == "darwin" else rss * 1024
@@ -4,8 +4,28 @@
 
 from .base.blank import Blank
 from .base.enums import JointAlignment, PositionAlignment
+from .base.lazy_image import LazyImage
 from .base.vector import Vector
+from .batch_render import RenderResult
 from .image_jointer import ImageJointer
+from .layout_plan import LayoutPlan
+from .profiler import Profiler, ProfileRecord
+from .render_cache import RenderCache
+from .render_pool import RenderPool
 from .utils import Utility
 
-__all__ = ["Blank", "JointAlignment", "PositionAlignment", "Vector", "ImageJointer", "Utility"]
+__all__ = [
+    "Blank",
+    "JointAlignment",
+    "PositionAlignment",
+    "LazyImage",
+    "Vector",
+    "ImageJointer",
+    "LayoutPlan",
+    "Profiler",
+    "ProfileRecord",
+    "RenderCache",
+    "RenderPool",
+    "RenderResult",
+    "Utility",
+]
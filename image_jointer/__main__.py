@@ -0,0 +1,9 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -2,8 +2,11 @@
 # This software is released under the MIT License
 # https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
 
+from __future__ import annotations
+
+import threading
 from dataclasses import dataclass
-from typing import Generator
+from typing import TYPE_CHECKING, Generator
 
 from PIL import Image
 
@@ -11,11 +14,20 @@ from .figure import Figure
 from .part import _Part
 from .vector import Vector
 
+if TYPE_CHECKING:
+    import numpy as np
+
+# image given by Image.open reads its file at first use, and reading it from threads at once breaks the stream.
+_LOAD_LOCK = threading.Lock()
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ImageAdapter(Figure):
     image: Image.Image
 
+    _overwrite = True
+    _array = True
+
     @property
     def width(self) -> int:
         return self.image.width
@@ -24,8 +36,87 @@ class ImageAdapter(Figure):
     def height(self) -> int:
         return self.image.height
 
+    @property
+    def _mode(self) -> str:
+        if self.image.mode == "P" and "transparency" in self.image.info:
+            return "PA"
+        return self.image.mode
+
     def _paste(self, position: Vector) -> Generator[_Part, None, None]:
         yield _Part(self, position)
 
     def _draw(self, output: Image.Image, position: Vector):
-        output.paste(self.image, (position.x, position.y))
+        self._draw_region(output, position, (0, 0, self.width, self.height))
+
+    def _draw_region(self, output: Image.Image, position: Vector, region: tuple[int, int, int, int]):
+        box = _visible_box(output.size, position, self.width, self.height, region)
+        if box is None:
+            return
+
+        image = _loaded(self.image)
+        if box == (0, 0, self.width, self.height):
+            output.paste(image, (position.x, position.y))
+        else:
+            # crop first not to convert invisible pixels in paste.
+            left, top, _, _ = box
+            output.paste(image.crop(box), (position.x + left, position.y + top))
+
+    def _draw_array(self, output: np.ndarray, mode: str, position: Vector, region: tuple[int, int, int, int]):
+        box = _visible_box((output.shape[1], output.shape[0]), position, self.width, self.height, region)
+        if box is None:
+            return
+
+        image = _loaded(self.image)
+        if box != (0, 0, self.width, self.height):
+            image = image.crop(box)
+        if image.mode != mode:
+            image = image.convert(mode)
+        left, top, right, bottom = box
+        # image is converted to array through array interface.
+        output[position.y + top : position.y + bottom, position.x + left : position.x + right] = image
+
+
+def _loaded(image: Image.Image) -> Image.Image:
+    """
+    Image with its pixels loaded. Image not loaded yet is loaded under lock, so threads and renders share it safely.
+    """
+    # tile is left only until image is loaded.
+    if getattr(image, "tile", None):
+        with _LOAD_LOCK:
+            image.load()
+    return image
+
+
+def _visible_box(
+    output_size: tuple[int, int],
+    position: Vector,
+    width: int,
+    height: int,
+    region: tuple[int, int, int, int] | None = None,
+) -> tuple[int, int, int, int] | None:
+    """
+    Region of figure inside output whose size is output_size.
+
+    Returns:
+        tuple[int, int, int, int] | None: left, top, right, bottom in figure coordinate. None if not visible.
+    """
+    if region is None:
+        region = (0, 0, width, height)
+    left = max(-position.x, region[0], 0)
+    top = max(-position.y, region[1], 0)
+    right = min(output_size[0] - position.x, region[2], width)
+    bottom = min(output_size[1] - position.y, region[3], height)
+    if left >= right or top >= bottom:
+        return None
+    return (left, top, right, bottom)
+
+
+def _source_identity(source: Figure) -> Image.Image | Figure:
+    """
+    Object given by user as source.
+    """
+    match source:
+        case ImageAdapter():
+            return source.image
+        case _:
+            return source
@@ -0,0 +1,112 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+from itertools import accumulate
+from typing import Sequence
+
+from .enums import JointAlignment
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+
+# (joint horizontally, joint to up or left, how to align on cross axis)
+_JOINT_RULE = {
+    JointAlignment.UP_LEFT: (False, True, "start"),
+    JointAlignment.UP_CENTER: (False, True, "center"),
+    JointAlignment.UP_RIGHT: (False, True, "end"),
+    JointAlignment.DOWN_LEFT: (False, False, "start"),
+    JointAlignment.DOWN_CENTER: (False, False, "center"),
+    JointAlignment.DOWN_RIGHT: (False, False, "end"),
+    JointAlignment.LEFT_TOP: (True, True, "start"),
+    JointAlignment.LEFT_CENTER: (True, True, "center"),
+    JointAlignment.LEFT_BOTTOM: (True, True, "end"),
+    JointAlignment.RIGHT_TOP: (True, False, "start"),
+    JointAlignment.RIGHT_CENTER: (True, False, "center"),
+    JointAlignment.RIGHT_BOTTOM: (True, False, "end"),
+}
+
+# use numpy only if there are enough images to amortize array conversion.
+_NUMPY_THRESHOLD = 64
+
+
+def _align(cross: str, outer, inner):
+    match cross:
+        case "start":
+            return outer * 0
+        case "center":
+            return (outer - inner) // 2
+        case "end":
+            return outer - inner
+
+
+def calc_joint_offsets(
+    alignment: JointAlignment, sizes: Sequence[tuple[int, int]]
+) -> tuple[list[int], list[int], int, int]:
+    """
+    Calculate paste positions of jointing sizes[1:] to sizes[0] one by one at once.
+
+    Jointing one by one extends the base size and moves all jointed images whenever a larger image comes.
+    So the position of each image is its own alignment in the extended size plus all later moves.
+    On joint axis, position is just prefix sum of sizes.
+
+    Args:
+        alignment (JointAlignment): how to align image
+        sizes (Sequence[tuple[int, int]]): (width, height) of base and images to joint
+
+    Returns:
+        tuple[list[int], list[int], int, int]: x, y of each size and width, height of jointed image
+    """
+    horizontal, reverse, cross = _JOINT_RULE[alignment]
+    if horizontal:
+        main = [width for width, _ in sizes]
+        sub = [height for _, height in sizes]
+    else:
+        main = [height for _, height in sizes]
+        sub = [width for width, _ in sizes]
+
+    if np is not None and len(sizes) >= _NUMPY_THRESHOLD:
+        main_pos, sub_pos, main_size, sub_size = _calc_numpy(reverse, cross, main, sub)
+    else:
+        main_pos, sub_pos, main_size, sub_size = _calc_python(reverse, cross, main, sub)
+
+    if horizontal:
+        return main_pos, sub_pos, main_size, sub_size
+    else:
+        return sub_pos, main_pos, sub_size, main_size
+
+
+def _calc_python(reverse: bool, cross: str, main: list[int], sub: list[int]):
+    main_end = list(accumulate(main))
+    main_size = main_end[-1]
+    if reverse:
+        main_pos = [main_size - end for end in main_end]
+    else:
+        main_pos = [end - length for end, length in zip(main_end, main)]
+
+    sub_max = list(accumulate(sub, max))
+    moves = [0] + [_align(cross, current, previous) for previous, current in zip(sub_max, sub_max[1:])]
+    later_moves = list(accumulate(reversed(moves[1:]), initial=0))[::-1]
+    sub_pos = [_align(cross, bound, length) + move for bound, length, move in zip(sub_max, sub, later_moves)]
+    return main_pos, sub_pos, main_size, sub_max[-1]
+
+
+def _calc_numpy(reverse: bool, cross: str, main: list[int], sub: list[int]):
+    main_array = np.asarray(main, dtype=np.int64)
+    sub_array = np.asarray(sub, dtype=np.int64)
+
+    main_end = np.cumsum(main_array)
+    main_size = int(main_end[-1])
+    main_pos = main_size - main_end if reverse else main_end - main_array
+
+    sub_max = np.maximum.accumulate(sub_array)
+    moves = np.zeros_like(sub_max)
+    moves[1:] = _align(cross, sub_max[1:], sub_max[:-1])
+    later_moves = moves.sum() - np.cumsum(moves)
+    sub_pos = _align(cross, sub_max, sub_array) + later_moves
+    return main_pos.tolist(), sub_pos.tolist(), main_size, int(sub_max[-1])
@@ -2,13 +2,22 @@
 # This software is released under the MIT License
 # https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from PIL import Image
 
 from .figure import Figure
 from .vector import Vector
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class Blank(Figure):
+    _array = True
+
     def __init__(self, width: int, height: int) -> None:
         if not isinstance(width, int):
             pass
@@ -26,8 +35,15 @@ class Blank(Figure):
     def height(self) -> int:
         return self.__height
 
+    @property
+    def _mode(self) -> str:
+        return ""
+
     def _paste(self, position: Vector):
         yield from []
 
     def _draw(self, output: Image.Image, position: Vector):
         pass
+
+    def _draw_array(self, output: np.ndarray, mode: str, position: Vector, region: tuple[int, int, int, int]):
+        pass
@@ -0,0 +1,87 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Hashable, Iterable, Sequence
+
+from .adapter import ImageAdapter, _loaded
+from .figure import Figure
+from .lazy_image import LazyImage, _LastDecoded
+
+# modes of canvas converted pixel by pixel, so converting whole source once gives same pixels as converting each piece.
+# conversion into palette or bilevel image dithers.
+_CONVERTIBLE_MODES = ("L", "LA", "RGB", "RGBA")
+# paste of premultiplied image uses its alpha as mask, which converted image draws differently.
+_PREMULTIPLIED_MODES = ("La", "RGBa")
+
+
+def _convert_repeated(
+    sources: Sequence[Figure], indices: Iterable[int], mode: str, decoded: _LastDecoded | None = None
+) -> tuple[dict[int, ImageAdapter], int]:
+    """
+    Convert sources drawn more than once into mode of canvas.
+    Image in other mode is converted once instead of in every paste and LazyImage is decoded once.
+
+    Args:
+        sources (Sequence[Figure]): sources of parts
+        indices (Iterable[int]): index of parts to draw
+        mode (str): mode of canvas
+        decoded (_LastDecoded | None): LazyImage is decoded through it if given. default to None
+
+    Returns:
+        tuple[dict[int, ImageAdapter], int]: converted figure by index of part, and number of sources converted
+    """
+    if mode not in _CONVERTIBLE_MODES:
+        return {}, 0
+
+    groups: dict[Hashable, list[int]] = {}
+    for i in indices:
+        groups.setdefault(_group_key(sources[i]), []).append(i)
+
+    converted: dict[int, ImageAdapter] = {}
+    conversions = 0
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        figure = _convert(sources[group[0]], mode, decoded)
+        if figure is not None:
+            converted.update(dict.fromkeys(group, figure))
+            conversions += 1
+    return converted, conversions
+
+
+def _group_key(source: Figure) -> Hashable:
+    """
+    Key of sources drawing same pixels.
+    Parts pasting same image are grouped even if each of them has its own ImageAdapter,
+    and LazyImage of same file and size are grouped.
+    """
+    match source:
+        case ImageAdapter():
+            return id(source.image)
+        case LazyImage() if isinstance(source.fp, (str, Path)):
+            return (str(source.fp), source.width, source.height)
+        case _:
+            return id(source)
+
+
+def _convert(source: Figure, mode: str, decoded: _LastDecoded | None = None) -> ImageAdapter | None:
+    """
+    Source in mode. None if source is drawn as it is without conversion.
+    """
+    match source:
+        case ImageAdapter():
+            image = _loaded(source.image)
+        case LazyImage():
+            image = source._load() if decoded is None else decoded.load(source).image
+        case _:
+            return None
+
+    if image.mode != mode and image.mode not in _PREMULTIPLIED_MODES:
+        image = image.convert(mode)
+    elif isinstance(source, ImageAdapter):
+        return None
+    return ImageAdapter(image)
@@ -12,10 +12,27 @@ from PIL import Image
 from .vector import Vector
 
 if TYPE_CHECKING:
+    import numpy as np
+
     from .part import _Part
 
 
 class Figure(ABC):
+    __slots__ = ()
+
+    # True if _draw overwrites every pixel in its rectangle. used to skip hidden drawing.
+    _overwrite: bool = False
+    # True if _draw_array is implemented. used to draw into NumPy array.
+    _array: bool = False
+
+    @property
+    def _mode(self) -> str | None:
+        """
+        Mode of pixels drawn by _draw. used to choose mode of output.
+        None if unknown, and empty string if nothing is drawn.
+        """
+        return None
+
     @abstractproperty
     def width(self) -> int:
         ...
@@ -31,3 +48,18 @@ class Figure(ABC):
     @abstractmethod
     def _draw(self, output: Image.Image, position: Vector):
         ...
+
+    def _draw_region(self, output: Image.Image, position: Vector, region: tuple[int, int, int, int]):
+        """
+        Draw only region (left, top, right, bottom in own coordinate) if possible.
+        Drawing outside of region is allowed, so default is drawing whole figure.
+        """
+        self._draw(output, position)
+
+    def _draw_array(self, output: np.ndarray, mode: str, position: Vector, region: tuple[int, int, int, int]):
+        """
+        Draw region into uint8 array of mode same as _draw_region.
+        Shape of output is (height, width) for "L" and (height, width, channels) for others.
+        Called only if _array is True.
+        """
+        raise NotImplementedError()
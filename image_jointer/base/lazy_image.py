@@ -0,0 +1,141 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Generator
+
+from PIL import Image
+
+from .adapter import ImageAdapter, _visible_box
+from .figure import Figure
+from .part import _Part
+from .vector import Vector
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class LazyImage(Figure):
+    _overwrite = True
+    _array = True
+
+    def __init__(self, fp: str | Path | IO[bytes], size: tuple[int, int] | None = None) -> None:
+        """
+        Image loaded from file only while drawing.
+        Only header is read at construction and pixels are released just after drawing.
+
+        Args:
+            fp (str | Path | IO[bytes]): file path or seekable binary file object
+            size (tuple[int, int] | None): size to draw. image is resized if differs. default to None (size of file)
+
+        Raises:
+            ValueError: raise if size is invalid
+        """
+        with Image.open(fp) as image:
+            self.__file_size: tuple[int, int] = image.size
+            self.__mode = "PA" if image.mode == "P" and "transparency" in image.info else image.mode
+
+        if size is None:
+            size = self.__file_size
+        elif len(size) != 2 or size[0] <= 0 or size[1] <= 0:
+            raise ValueError("size is invalid")
+
+        self.__fp = fp
+        self.__size = (int(size[0]), int(size[1]))
+        # file object is one stream shared by all drawings, so it is read by one of them at once.
+        self.__lock = None if isinstance(fp, (str, Path)) else threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        state["_LazyImage__lock"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if not isinstance(self.__fp, (str, Path)):
+            self.__lock = threading.Lock()
+
+    @property
+    def fp(self) -> str | Path | IO[bytes]:
+        return self.__fp
+
+    @property
+    def width(self) -> int:
+        return self.__size[0]
+
+    @property
+    def height(self) -> int:
+        return self.__size[1]
+
+    @property
+    def _mode(self) -> str:
+        return self.__mode
+
+    @property
+    def _file_size(self) -> tuple[int, int]:
+        return self.__file_size
+
+    def _paste(self, position: Vector) -> Generator[_Part, None, None]:
+        yield _Part(self, position)
+
+    def _load(self) -> Image.Image:
+        """
+        Decode image in drawing size.
+        """
+        if self.__lock is None:
+            return self.__decode()
+        with self.__lock:
+            return self.__decode()
+
+    def __decode(self) -> Image.Image:
+        image = Image.open(self.__fp)
+        if self.__size == self.__file_size:
+            # file opened by path is closed after load.
+            image.load()
+            return image
+
+        if self.__size[0] <= self.__file_size[0] and self.__size[1] <= self.__file_size[1]:
+            # JPEG can be decoded in 1/2, 1/4 or 1/8 scale directly.
+            image.draft(None, self.__size)
+        with image:
+            return image.resize(self.__size)
+
+    def _draw(self, output: Image.Image, position: Vector):
+        self._draw_region(output, position, (0, 0, self.width, self.height))
+
+    def _draw_region(self, output: Image.Image, position: Vector, region: tuple[int, int, int, int]):
+        if _visible_box(output.size, position, self.width, self.height, region) is None:
+            return
+
+        ImageAdapter(self._load())._draw_region(output, position, region)
+
+    def _draw_array(self, output: np.ndarray, mode: str, position: Vector, region: tuple[int, int, int, int]):
+        if _visible_box((output.shape[1], output.shape[0]), position, self.width, self.height, region) is None:
+            return
+
+        ImageAdapter(self._load())._draw_array(output, mode, position, region)
+
+
+class _LastDecoded(object):
+    """
+    Last decoded LazyImage kept for next bands, so image spanning bands is decoded once.
+    Only one image is kept, so memory is bounded by one source image.
+    """
+
+    __slots__ = ("__last",)
+
+    def __init__(self) -> None:
+        self.__last: tuple[LazyImage, ImageAdapter] | None = None
+
+    def load(self, source: LazyImage) -> ImageAdapter:
+        # source and image are replaced at once, so threads drawing other sources get right image.
+        last = self.__last
+        if last is None or last[0] is not source:
+            # release previous image before decoding next one.
+            self.__last = None
+            last = self.__last = (source, ImageAdapter(source._load()))
+        return last[1]
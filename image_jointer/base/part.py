@@ -2,15 +2,23 @@
 # This software is released under the MIT License
 # https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
 
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Iterator, overload
 
 from PIL import Image
 
 from .figure import Figure
 from .vector import Vector
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class _Part:
     source: Figure
     position: Vector = Vector()
@@ -24,7 +32,84 @@ class _Part:
         return self.source.height
 
     def paste(self, position: Vector):
-        return _Part(self.source, self.position + position)
+        return _Part(self.source, Vector(self.position.x + position.x, self.position.y + position.y))
+
+    def draw(self, output: Image.Image, origin: Vector = Vector(), region: tuple[int, int, int, int] | None = None):
+        """
+        Draw source to output.
+
+        Args:
+            output (Image.Image): image to draw
+            origin (Vector): position of output left top corner in layout. default to Vector(0, 0)
+            region (tuple[int, int, int, int] | None): left, top, right, bottom in layout to draw.
+                                                       default to None (whole part)
+        """
+        position = self.position - origin
+        if region is None:
+            self.source._draw(output, position)
+        else:
+            left, top, right, bottom = region
+            x, y = self.position.x, self.position.y
+            self.source._draw_region(output, position, (left - x, top - y, right - x, bottom - y))
+
+    def draw_array(
+        self, output: np.ndarray, mode: str, origin: Vector = Vector(), region: tuple[int, int, int, int] | None = None
+    ):
+        """
+        Draw source to array. Same as draw.
+        """
+        if region is None:
+            region = (self.position.x, self.position.y, self.position.x + self.width, self.position.y + self.height)
+        left, top, right, bottom = region
+        x, y = self.position.x, self.position.y
+        self.source._draw_array(output, mode, self.position - origin, (left - x, top - y, right - x, bottom - y))
+
+
+class _PartColumns(Sequence):
+    """
+    Parts stored as columns of sources and positions instead of _Part objects.
+    _Part is made only when accessed, so a part costs a reference and two int32.
+    """
+
+    __slots__ = ("sources", "x", "y")
+
+    def __init__(self, sources: Sequence[Figure] = (), x: array | None = None, y: array | None = None) -> None:
+        self.sources = sources
+        self.x = array("i") if x is None else x
+        self.y = array("i") if y is None else y
+
+    @classmethod
+    def of(cls, parts: Iterable[_Part]) -> _PartColumns:
+        if isinstance(parts, _PartColumns):
+            return parts
+        parts = tuple(parts)
+        return cls(
+            tuple(part.source for part in parts),
+            array("i", (part.position.x for part in parts)),
+            array("i", (part.position.y for part in parts)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    @overload
+    def __getitem__(self, index: int) -> _Part:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> _PartColumns:
+        ...
+
+    def __getitem__(self, index: int | slice) -> _Part | _PartColumns:
+        if isinstance(index, slice):
+            return _PartColumns(self.sources[index], self.x[index], self.y[index])
+        return _Part(self.sources[index], Vector(self.x[index], self.y[index]))
+
+    def __iter__(self) -> Iterator[_Part]:
+        for source, x, y in zip(self.sources, self.x, self.y):
+            yield _Part(source, Vector(x, y))
 
-    def draw(self, output: Image.Image):
-        self.source._draw(output, self.position)
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, _PartColumns):
+            return NotImplemented
+        return (tuple(self.sources), self.x, self.y) == (tuple(other.sources), other.x, other.y)
@@ -0,0 +1,142 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Generator
+
+from .figure import Figure
+from .part import _Part, _PartColumns
+from .vector import Vector
+
+
+@dataclass(frozen=True, slots=True)
+class _PartTree:
+    """
+    Persistent store of parts.
+    Nodes are never modified, so jointed layouts share their sub trees instead of copying parts.
+    Parts of a node are placed before parts of its children. Every part is moved by offset of all ancestors.
+    Parts are stored as columns, and given sequence of _Part is converted.
+    nested is True for layout given as argument of joint, which RenderCache may store.
+    """
+
+    parts: _PartColumns = field(default_factory=_PartColumns)
+    children: tuple[_PartTree, ...] = ()
+    offset: Vector = Vector()
+    nested: bool = field(default=False, compare=False)
+    length: int = field(init=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "parts", _PartColumns.of(self.parts))
+        object.__setattr__(self, "length", len(self.parts) + sum(child.length for child in self.children))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __reduce__(self):
+        # pickle and deepcopy recurse into children, and a long joint chain makes a deep tree.
+        # saved as one flat node. sharing of sub trees is not kept.
+        return (_PartTree, (self.columns(),))
+
+    def __iter__(self) -> Generator[_Part, None, None]:
+        return self.walk(Vector())
+
+    def shifted(self, offset: Vector) -> _PartTree:
+        """
+        Same tree moved by offset. Parts and children are shared.
+        """
+        return _PartTree(self.parts, self.children, self.offset + offset, self.nested)
+
+    def as_nested(self) -> _PartTree:
+        """
+        Same tree marked as nested layout. Parts and children are shared.
+        """
+        if self.nested:
+            return self
+        return _PartTree(self.parts, self.children, self.offset, True)
+
+    def concat(self, *others: _PartTree) -> _PartTree:
+        """
+        New tree which has parts of self then parts of others.
+        """
+        children = tuple(tree for tree in (self, *others) if tree.length != 0)
+        match children:
+            case ():
+                return _PartTree()
+            case (single,):
+                return single
+            case _:
+                return _PartTree(children=children)
+
+    def walk(self, position: Vector) -> Generator[_Part, None, None]:
+        """
+        Yield parts with absolute position in order.
+        Use own stack instead of recursion because a long joint chain makes a deep tree.
+        """
+        stack = [(self, position)]
+        while stack:
+            node, origin = stack.pop()
+            origin = origin + node.offset
+            parts = node.parts
+            for source, x, y in zip(parts.sources, parts.x, parts.y):
+                yield _Part(source, Vector(x + origin.x, y + origin.y))
+            stack.extend((child, origin) for child in reversed(node.children))
+
+    def columns(self) -> _PartColumns:
+        """
+        All parts with absolute position in order as columns. _Part is not made.
+        """
+        sources: list[Figure] = []
+        x_list = array("i")
+        y_list = array("i")
+        stack = [(self, 0, 0)]
+        while stack:
+            node, x, y = stack.pop()
+            x += node.offset.x
+            y += node.offset.y
+            parts = node.parts
+            sources.extend(parts.sources)
+            x_list.extend(parts.x if x == 0 else (value + x for value in parts.x))
+            y_list.extend(parts.y if y == 0 else (value + y for value in parts.y))
+            stack.extend((child, x, y) for child in reversed(node.children))
+        return _PartColumns(sources, x_list, y_list)
+
+    def replaced(self, sources: dict[int, Figure]) -> _PartTree:
+        """
+        New tree whose sources of parts are replaced. key of sources is index of part in walk order.
+        Only nodes on paths to replaced parts are copied, and other sub trees are shared.
+        """
+        indices = sorted(sources)
+        done: list[_PartTree] = []
+        stack = [(self, 0, False)]
+        while stack:
+            node, start, expanded = stack.pop()
+            found = bisect_left(indices, start)
+            if found == len(indices) or indices[found] >= start + node.length:
+                done.append(node)
+                continue
+
+            if not expanded:
+                stack.append((node, start, True))
+                child_starts = list(
+                    accumulate((child.length for child in node.children[:-1]), initial=start + len(node.parts))
+                )
+                # pushed in reverse to be done in order.
+                stack.extend(
+                    (child, child_start, False)
+                    for child, child_start in zip(reversed(node.children), reversed(child_starts))
+                )
+                continue
+
+            count = len(node.children)
+            children = tuple(done[len(done) - count :])
+            del done[len(done) - count :]
+            parts = node.parts
+            replaced = tuple(sources.get(start + i, source) for i, source in enumerate(parts.sources))
+            done.append(_PartTree(_PartColumns(replaced, parts.x, parts.y), children, node.offset, node.nested))
+        return done[0]
@@ -0,0 +1,274 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from PIL import Image, ImageColor
+
+from .spatial_index import _GridIndex
+
+_Box = tuple[int, int, int, int]
+
+# a part hidden into more pieces than this is drawn as a whole.
+_MAX_PIECES = 8
+
+# clearing a gap costs about the same as clearing this many pixels in addition to its area.
+_GAP_COST = 16384
+
+
+@dataclass(frozen=True)
+class _RenderPlan:
+    """
+    What to draw for a region.
+
+    draws: index of parts to draw in order, and visible pieces of the part in layout coordinate.
+           pieces are None if whole part is visible.
+    gaps: boxes in layout coordinate which no part overwrites. they must be cleared.
+    covered: True if overwriting parts cover whole region, and there are no gaps.
+    """
+
+    draws: tuple[tuple[int, tuple[_Box, ...] | None], ...]
+    gaps: tuple[_Box, ...]
+    covered: bool
+
+
+def _make_plan(index: _GridIndex, box: _Box) -> _RenderPlan:
+    """
+    Make render plan of box.
+    Parts covered by later overwriting parts are skipped (or drawn partially),
+    and only pixels not overwritten by any part are cleared.
+    """
+    found = index.query_index(box)
+    sources = index.parts.sources
+
+    draws: list[tuple[int, tuple[_Box, ...] | None]] = []
+    for i in found:
+        if i not in index.overlapped:
+            draws.append((i, None))
+            continue
+
+        part_box = _intersect(index.boxes[i], box)
+        covers = [index.boxes[j] for j in index.query_index(part_box) if j > i and sources[j]._overwrite]
+        pieces = _subtract(part_box, covers)
+        if not pieces:
+            continue
+        if pieces == [part_box] or len(pieces) > _MAX_PIECES:
+            draws.append((i, None))
+        else:
+            draws.append((i, tuple(pieces)))
+
+    overwrites = [_intersect(index.boxes[i], box) for i in found if sources[i]._overwrite]
+
+    # clearing whole box in one call is faster than many small calls.
+    covered_limit = min(sum(_area(area) for area in overwrites), _area(box))
+    gaps = _find_gaps(box, overwrites, covered_limit // _GAP_COST)
+    covered = gaps == []
+    if gaps is not None:
+        if len(gaps) * _GAP_COST > _area(box) - sum(_area(gap) for gap in gaps):
+            gaps = None
+
+    return _RenderPlan(tuple(draws), (box,) if gaps is None else tuple(gaps), covered)
+
+
+def _area(box: _Box) -> int:
+    return max(box[2] - box[0], 0) * max(box[3] - box[1], 0)
+
+
+def _intersect(first: _Box, second: _Box) -> _Box:
+    return (max(first[0], second[0]), max(first[1], second[1]), min(first[2], second[2]), min(first[3], second[3]))
+
+
+def _subtract(box: _Box, others: list[_Box]) -> list[_Box]:
+    """
+    Split box minus others into boxes.
+    """
+    pieces = [box]
+    for other in others:
+        next_pieces = []
+        for left, top, right, bottom in pieces:
+            o_left, o_top, o_right, o_bottom = _intersect((left, top, right, bottom), other)
+            if o_left >= o_right or o_top >= o_bottom:
+                next_pieces.append((left, top, right, bottom))
+                continue
+            if top < o_top:
+                next_pieces.append((left, top, right, o_top))
+            if o_bottom < bottom:
+                next_pieces.append((left, o_bottom, right, bottom))
+            if left < o_left:
+                next_pieces.append((left, o_top, o_left, o_bottom))
+            if o_right < right:
+                next_pieces.append((o_right, o_top, right, o_bottom))
+        pieces = next_pieces
+        if not pieces:
+            break
+    return pieces
+
+
+def _find_gaps(box: _Box, overwrites: list[_Box], max_gaps: int | None = None) -> list[_Box] | None:
+    """
+    Split box minus overwrites into boxes.
+    Sweep along both axes and use the one finishing in budget. Return None if both fail.
+    """
+    left, top, right, bottom = box
+    overwrites = [area for area in overwrites if area[0] < area[2] and area[1] < area[3]]
+    if left >= right or top >= bottom:
+        return []
+    budget = 16 * len(overwrites) + 1024
+
+    # estimate work as (number of bands) * (average number of areas crossing a band).
+    y_edges = len({edge for area in overwrites for edge in (area[1], area[3])})
+    x_edges = len({edge for area in overwrites for edge in (area[0], area[2])})
+    y_work = y_edges * sum(area[3] - area[1] for area in overwrites) / (bottom - top)
+    x_work = x_edges * sum(area[2] - area[0] for area in overwrites) / (right - left)
+
+    for transpose in (False, True) if y_work <= x_work else (True, False):
+        if transpose:
+            gaps = _sweep(_transpose(box), [_transpose(area) for area in overwrites], budget, max_gaps)
+            gaps = None if gaps is None else [_transpose(gap) for gap in gaps]
+        else:
+            gaps = _sweep(box, overwrites, budget, max_gaps)
+        if gaps is not None:
+            return gaps
+
+    return None
+
+
+def _transpose(box: _Box) -> _Box:
+    left, top, right, bottom = box
+    return (top, left, bottom, right)
+
+
+def _sweep(box: _Box, overwrites: list[_Box], budget: int, max_gaps: int | None) -> list[_Box] | None:
+    """
+    Sweep from top to bottom. Gaps of adjacent bands are merged if they have same x range.
+    Return None if work exceeds budget or gaps are more than max_gaps.
+    """
+    left, top, right, bottom = box
+    if left >= right or top >= bottom:
+        return []
+
+    starts: dict[int, list[int]] = {}
+    ends: dict[int, list[int]] = {}
+    for i, (_, area_top, _, area_bottom) in enumerate(overwrites):
+        starts.setdefault(area_top, []).append(i)
+        ends.setdefault(area_bottom, []).append(i)
+    edges = sorted({top, bottom, *starts, *ends})
+
+    gaps: list[_Box] = []
+    opened: dict[tuple[int, int], int] = {}  # x range -> top of gap
+    active: set[int] = set()
+    work = 0
+    for band_top, band_bottom in zip(edges, edges[1:]):
+        active.difference_update(ends.get(band_top, ()))
+        active.update(starts.get(band_top, ()))
+
+        work += len(active) + 1
+        if work > budget:
+            return None
+
+        ranges = []
+        x = left
+        for area_left, _, area_right, _ in sorted(overwrites[i] for i in active):
+            if x < area_left:
+                ranges.append((x, area_left))
+            x = max(x, area_right)
+        if x < right:
+            ranges.append((x, right))
+
+        current = {}
+        for x_range in ranges:
+            current[x_range] = opened.pop(x_range, band_top)
+        for (gap_left, gap_right), gap_top in opened.items():
+            gaps.append((gap_left, gap_top, gap_right, band_top))
+        opened = current
+        if max_gaps is not None and len(gaps) + len(opened) > max_gaps:
+            return None
+
+    for (gap_left, gap_right), gap_top in opened.items():
+        gaps.append((gap_left, gap_top, gap_right, bottom))
+    return gaps
+
+
+# kind of pixels for each mode. (colored, has alpha)
+_MODE_KIND = {
+    "": None,
+    "1": (False, False),
+    "L": (False, False),
+    "I": (False, False),
+    "I;16": (False, False),
+    "F": (False, False),
+    "LA": (False, True),
+    "La": (False, True),
+    "P": (True, False),
+    "PA": (True, True),
+    "RGB": (True, False),
+    "RGBX": (True, False),
+    "CMYK": (True, False),
+    "YCbCr": (True, False),
+    "LAB": (True, False),
+    "HSV": (True, False),
+    "RGBA": (True, True),
+    "RGBa": (True, True),
+}
+
+
+def _choose_mode(modes: Iterable[str | None]) -> str:
+    """
+    Choose narrowest mode representing all modes.
+
+    Args:
+        modes (Iterable[str | None]): modes of drawn figures and of background if it is left. None is unknown.
+
+    Returns:
+        str: one of "L", "LA", "RGB" or "RGBA"
+    """
+    colored = False
+    alpha = False
+    for mode in set(modes):
+        kind = _MODE_KIND.get(mode, (True, True)) if mode is not None else (True, True)
+        if kind is None:
+            continue
+        colored = colored or kind[0]
+        alpha = alpha or kind[1]
+    return ("RGB" if colored else "L") + ("A" if alpha else "")
+
+
+def _background_mode(background: float | tuple[float, ...] | str | None) -> str | None:
+    """
+    Narrowest mode background can be filled in. None background is transparent.
+    None if background is invalid, then it is rejected in filling.
+    """
+    match background:
+        case None:
+            return "LA"
+        case int() | float():
+            return "L"
+        case str():
+            try:
+                color = ImageColor.getrgb(background)
+            except ValueError:
+                return None
+            # color name is filled in any mode, so gray one is drawn in "L".
+            colored = not color[0] == color[1] == color[2]
+        case tuple() if 1 <= len(background) <= 4:
+            color = background
+            colored = len(color) >= 3
+        case _:
+            return None
+
+    alpha = len(color) in (2, 4) and color[-1] < 255
+    return ("RGB" if colored else "L") + ("A" if alpha else "")
+
+
+def _fill_color(mode: str, background: float | tuple[float, ...] | str | None) -> float | tuple[float, ...]:
+    """
+    Pixel value of background in mode.
+    """
+    try:
+        return Image.new(mode, (1, 1), 0 if background is None else background).getpixel((0, 0))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"mode {mode} or background {background} is invalid") from e
@@ -0,0 +1,118 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Generator
+
+from PIL import Image
+
+from .adapter import ImageAdapter, _loaded, _visible_box
+from .blank import Blank
+from .figure import Figure
+from .lazy_image import LazyImage
+from .part import _Part
+from .vector import Vector
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# resizing first reduces image by integer factor until it is this times larger than output.
+_REDUCING_GAP = 2.0
+
+
+class _ScaledFigure(Figure):
+    """
+    Source figure drawn in other size.
+    Source is resized at first drawing and kept, so parts sharing same source and size resize it once.
+    """
+
+    def __init__(self, source: Figure, width: int, height: int) -> None:
+        self.__source = source
+        self.__size = (width, height)
+        self.__resized: ImageAdapter | None = None
+        self._overwrite = source._overwrite
+        # resized image is ImageAdapter, which draws into array. but array is overwritten,
+        # so figure drawn over output through its alpha can not draw into array.
+        self._array = source._overwrite
+
+    @property
+    def width(self) -> int:
+        return self.__size[0]
+
+    @property
+    def height(self) -> int:
+        return self.__size[1]
+
+    @property
+    def _mode(self) -> str | None:
+        return self.__source._mode
+
+    def _paste(self, position: Vector) -> Generator[_Part, None, None]:
+        yield _Part(self, position)
+
+    def __get_resized(self) -> ImageAdapter:
+        # drawn in threads at same time, the image may be resized twice but result is same.
+        if self.__resized is None:
+            self.__resized = ImageAdapter(_shrink(self.__source, self.__size))
+        return self.__resized
+
+    def _draw(self, output: Image.Image, position: Vector):
+        self._draw_region(output, position, (0, 0, self.width, self.height))
+
+    def _draw_region(self, output: Image.Image, position: Vector, region: tuple[int, int, int, int]):
+        box = _visible_box(output.size, position, self.width, self.height, region)
+        if box is None:
+            return
+
+        if self._overwrite:
+            self.__get_resized()._draw_region(output, position, region)
+        else:
+            # figure not overwriting pixels is drawn over output through its alpha.
+            left, top, _, _ = box
+            image = self.__get_resized().image.crop(box)
+            output.paste(image, (position.x + left, position.y + top), image)
+
+    def _draw_array(self, output: np.ndarray, mode: str, position: Vector, region: tuple[int, int, int, int]):
+        if _visible_box((output.shape[1], output.shape[0]), position, self.width, self.height, region) is None:
+            return
+
+        self.__get_resized()._draw_array(output, mode, position, region)
+
+
+def _scale_figure(source: Figure, width: int, height: int) -> Figure | None:
+    """
+    Figure drawing source in size of width and height. None if nothing is drawn.
+    """
+    match source:
+        case Blank():
+            return None
+        case LazyImage():
+            # decoded in small size by draft.
+            return LazyImage(source.fp, (width, height))
+        case _:
+            return _ScaledFigure(source, width, height)
+
+
+def _shrink(source: Figure, size: tuple[int, int]) -> Image.Image:
+    """
+    Resize source. Image is reduced by integer factor first, so cost is mostly in reading source once.
+    """
+    match source:
+        case ImageAdapter():
+            image = _loaded(source.image)
+        case _:
+            image = Image.new("RGBA", (source.width, source.height))
+            source._draw(image, Vector())
+
+    # palette and bilevel images are resized by nearest neighbor, so convert them.
+    match image.mode:
+        case "P" | "PA":
+            image = image.convert("RGBA" if image.mode == "PA" or "transparency" in image.info else "RGB")
+        case "1":
+            image = image.convert("L")
+
+    if image.size == size:
+        return image
+    return image.resize(size, reducing_gap=_REDUCING_GAP)
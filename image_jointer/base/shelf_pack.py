@@ -0,0 +1,60 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+from math import isqrt
+from typing import Sequence
+
+
+def pack_shelves(
+    sizes: Sequence[tuple[int, int]], max_width: int | None = None, padding: int = 0
+) -> tuple[list[int], list[int], int, int]:
+    """
+    Pack rectangles into shelves. (next fit decreasing height)
+    Rectangles are sorted by height and put from left to right, and new shelf is started when shelf is full.
+    Height of shelves decreases, so little space is wasted when there are many rectangles.
+
+    Args:
+        sizes (Sequence[tuple[int, int]]): width and height of rectangles
+        max_width (int | None): maximum width of packed area. default to None (about square)
+        padding (int): space between rectangles
+
+    Returns:
+        tuple[list[int], list[int], int, int]: x and y of each rectangle, width and height of packed area
+
+    Raises:
+        ValueError: raise if a rectangle is wider than max_width or padding is negative
+    """
+    if padding < 0:
+        raise ValueError("padding must not be negative")
+    if not sizes:
+        return [], [], 0, 0
+
+    widest = max(width for width, _ in sizes)
+    if max_width is None:
+        area = sum((width + padding) * (height + padding) for width, height in sizes)
+        max_width = max(widest, isqrt(area - 1) + 1)
+    elif widest > max_width:
+        raise ValueError("image is wider than max_width")
+
+    x_list = [0] * len(sizes)
+    y_list = [0] * len(sizes)
+    x = 0
+    y = 0
+    shelf_height = 0
+    right = 0
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        width, height = sizes[i]
+        if x != 0 and x + width > max_width:
+            y += shelf_height + padding
+            x = 0
+            shelf_height = 0
+        x_list[i] = x
+        y_list[i] = y
+        right = max(right, x + width)
+        shelf_height = max(shelf_height, height)
+        x += width + padding
+
+    return x_list, y_list, right, y + shelf_height
@@ -0,0 +1,240 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+import copy
+import operator
+from array import array
+from bisect import bisect_left
+from typing import Iterator, Sequence
+
+from .figure import Figure
+from .part import _Part, _PartColumns
+
+_Box = tuple[int, int, int, int]
+
+
+class _GridIndex(object):
+    """
+    Uniform grid over part rectangles to find parts in a region quickly.
+    Cell size is average part size, so a part is registered to a few cells.
+    Boxes and cells are stored in arrays, so index costs a few dozen bytes per part.
+    """
+
+    def __init__(self, parts: _PartColumns) -> None:
+        self.__parts = parts
+        self.__boxes = boxes = _column_boxes(parts)
+        self.__overlapped: frozenset[int] | None = None
+
+        count = max(len(parts), 1)
+        self.__cell_width = cell_width = max((sum(boxes.right) - sum(boxes.left)) // count, 1)
+        self.__cell_height = cell_height = max((sum(boxes.bottom) - sum(boxes.top)) // count, 1)
+
+        nonempty = array(
+            "i", (i for i, (left, top, right, bottom) in enumerate(boxes) if left < right and top < bottom)
+        )
+        # range costs nothing when no part is empty, which is usual.
+        self.__nonempty: Sequence[int] = range(len(parts)) if len(nonempty) == len(parts) else nonempty
+        if len(nonempty) == len(parts):
+            self.__extent = (
+                min(boxes.left, default=0),
+                min(boxes.top, default=0),
+                max(boxes.right, default=0),
+                max(boxes.bottom, default=0),
+            )
+        else:
+            self.__extent = (
+                min((boxes.left[i] for i in nonempty), default=0),
+                min((boxes.top[i] for i in nonempty), default=0),
+                max((boxes.right[i] for i in nonempty), default=0),
+                max((boxes.bottom[i] for i in nonempty), default=0),
+            )
+        del nonempty
+
+        # cells are numbered row by row from left top cell of extent.
+        # entries are sorted by cell and then by part as one int, and stored as flat arrays.
+        self.__origin = (self.__extent[0] // cell_width, self.__extent[1] // cell_height)
+        origin_x, origin_y = self.__origin
+        self.__columns = columns = max((self.__extent[2] - 1) // cell_width + 1 - origin_x, 1)
+        self.__rows = max((self.__extent[3] - 1) // cell_height + 1 - origin_y, 1)
+        keys: list[int] = []
+        for i in self.__nonempty:
+            left, top, right, bottom = boxes[i]
+            cell_left = left // cell_width - origin_x
+            cell_top = top // cell_height - origin_y
+            cell_right = (right - 1) // cell_width + 1 - origin_x
+            cell_bottom = (bottom - 1) // cell_height + 1 - origin_y
+            if cell_right - cell_left == 1 and cell_bottom - cell_top == 1:
+                keys.append((cell_top * columns + cell_left) * count + i)
+                continue
+            for cell_y in range(cell_top, cell_bottom):
+                for cell_x in range(cell_left, cell_right):
+                    keys.append((cell_y * columns + cell_x) * count + i)
+        keys.sort()
+
+        self.__members = array("i", (key % count for key in keys))
+        # id of each non-empty cell and start of its members. last start is end of members.
+        self.__cell_ids = array("q")
+        self.__starts = array("q")
+        previous = -1
+        for position, key in enumerate(keys):
+            cell = key // count
+            if cell != previous:
+                self.__cell_ids.append(cell)
+                self.__starts.append(position)
+                previous = cell
+        self.__starts.append(len(keys))
+
+    def __cell_range(self, left: int, top: int, right: int, bottom: int) -> _Box:
+        """
+        Range of cells overlapping box, clipped to extent.
+        """
+        origin_x, origin_y = self.__origin
+        return (
+            max(left // self.__cell_width - origin_x, 0),
+            max(top // self.__cell_height - origin_y, 0),
+            min((right - 1) // self.__cell_width + 1 - origin_x, self.__columns),
+            min((bottom - 1) // self.__cell_height + 1 - origin_y, self.__rows),
+        )
+
+    @property
+    def parts(self) -> _PartColumns:
+        return self.__parts
+
+    @property
+    def boxes(self) -> _BoxColumns:
+        """
+        left, top, right, bottom of each part in layout.
+        """
+        return self.__boxes
+
+    @property
+    def overlapped(self) -> frozenset[int]:
+        """
+        Index of parts overlapping any other part. Other parts never share pixels.
+        """
+        if self.__overlapped is None:
+            overlapped: set[int] = set()
+            boxes = self.__boxes
+            starts = self.__starts
+            for start, end in zip(starts, starts[1:]):
+                if end - start < 2:
+                    continue
+                cell = [(i, boxes[i]) for i in self.__members[start:end]]
+                for n, (first, first_box) in enumerate(cell):
+                    for second, second_box in cell[n + 1 :]:
+                        if _is_overlapped(first_box, second_box):
+                            overlapped.update((first, second))
+            self.__overlapped = frozenset(overlapped)
+        return self.__overlapped
+
+    def replaced(self, sources: dict[int, Figure]) -> _GridIndex:
+        """
+        Index whose sources of parts are replaced by sources of same size. key of sources is index.
+        Boxes and cells are shared.
+        """
+        replaced = list(self.__parts.sources)
+        for i, source in sources.items():
+            replaced[i] = source
+        index = copy.copy(self)
+        index.__parts = _PartColumns(replaced, self.__parts.x, self.__parts.y)
+        return index
+
+    def query_index(self, box: _Box) -> list[int]:
+        """
+        Find parts overlapping box.
+
+        Args:
+            box (tuple[int, int, int, int]): left, top, right, bottom
+
+        Returns:
+            list[int]: index of overlapping parts in drawing order
+        """
+        left, top, right, bottom = box
+        if left >= right or top >= bottom:
+            return []
+        if _is_contained(self.__extent, box):
+            return list(self.__nonempty)
+
+        cell_left, cell_top, cell_right, cell_bottom = self.__cell_range(left, top, right, bottom)
+        found: set[int] = set()
+        if cell_left < cell_right:
+            # cells of one row in range are consecutive in arrays.
+            for cell_y in range(cell_top, cell_bottom):
+                first = bisect_left(self.__cell_ids, cell_y * self.__columns + cell_left)
+                last = bisect_left(self.__cell_ids, cell_y * self.__columns + cell_right, first)
+                found.update(self.__members[self.__starts[first] : self.__starts[last]])
+
+        return [i for i in sorted(found) if _is_overlapped(self.__boxes[i], box)]
+
+    def query(self, box: _Box) -> list[_Part]:
+        """
+        Find parts overlapping box.
+
+        Args:
+            box (tuple[int, int, int, int]): left, top, right, bottom
+
+        Returns:
+            list[_Part]: overlapping parts in drawing order
+        """
+        return [self.__parts[i] for i in self.query_index(box)]
+
+
+class _BoxColumns(Sequence):
+    """
+    left, top, right, bottom of parts stored as columns. tuple is made only when accessed.
+    """
+
+    __slots__ = ("left", "top", "right", "bottom")
+
+    def __init__(self, left: array, top: array, right: array, bottom: array) -> None:
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+
+    def __len__(self) -> int:
+        return len(self.left)
+
+    def __getitem__(self, index: int) -> _Box:
+        return (self.left[index], self.top[index], self.right[index], self.bottom[index])
+
+    def __iter__(self) -> Iterator[_Box]:
+        return zip(self.left, self.top, self.right, self.bottom)
+
+
+def _column_boxes(parts: _PartColumns) -> _BoxColumns:
+    """
+    Boxes of parts. left and top are shared with parts.
+    """
+    # width and height are asked once for each source.
+    sizes: dict[int, tuple[int, int]] = {}
+    for source in parts.sources:
+        if id(source) not in sizes:
+            sizes[id(source)] = (source.width, source.height)
+    widths = array("i", (sizes[id(source)][0] for source in parts.sources))
+    heights = array("i", (sizes[id(source)][1] for source in parts.sources))
+    return _BoxColumns(
+        parts.x,
+        parts.y,
+        array("i", map(operator.add, parts.x, widths)),
+        array("i", map(operator.add, parts.y, heights)),
+    )
+
+
+def _part_box(part: _Part) -> _Box:
+    return (part.position.x, part.position.y, part.position.x + part.width, part.position.y + part.height)
+
+
+def _is_overlapped(first: _Box, second: _Box) -> bool:
+    if first[0] >= second[2] or second[0] >= first[2]:
+        return False
+    if first[1] >= second[3] or second[1] >= first[3]:
+        return False
+    return True
+
+
+def _is_contained(inner: _Box, outer: _Box) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
@@ -7,7 +7,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Vector:
     x: int = 0
     y: int = 0
@@ -17,3 +17,9 @@ class Vector:
             raise TypeError(f"unsupported operand type: {type(self)} and {type(other)}")
 
         return Vector(self.x + other.x, self.y + other.y)
+
+    def __sub__(self, other) -> Vector:
+        if not isinstance(other, Vector):
+            raise TypeError(f"unsupported operand type: {type(self)} and {type(other)}")
+
+        return Vector(self.x - other.x, self.y - other.y)
@@ -0,0 +1,175 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+import os
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+from PIL import Image
+
+from .base.figure import Figure
+from .image_jointer import ImageJointer
+from .layout_plan import LayoutPlan
+
+# layouts sent to each worker process ahead, so workers do not wait for next one.
+_PENDING_PER_WORKER = 2
+
+_END = object()
+
+
+@dataclass(frozen=True, slots=True)
+class RenderResult:
+    """
+    Result of one layout rendered by Utility.render_many.
+
+    index: position of layout in given layouts
+    image: rendered image. None if written to file or failed
+    path: file written. None if not written
+    error: traceback of exception raised while compiling, rendering or saving. None if succeeded
+    seconds: time to render and save in worker process
+    """
+
+    index: int
+    image: Image.Image | None = None
+    path: Path | None = None
+    error: str | None = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _render_many(
+    layouts: Iterable[ImageJointer | LayoutPlan],
+    workers: int | None,
+    out: str | Path | Callable[[int], str | Path] | None,
+    format: str | None,
+    mode: str,
+    background: float | tuple[float, ...] | str | None,
+    resolver: Callable[[Hashable], Image.Image | Figure] | None,
+    source_id: Callable[[Image.Image | Figure], Hashable] | None,
+    progress: Callable[[int, int], None] | None,
+    params: dict[str, Any],
+) -> Iterator[RenderResult]:
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 0:
+        raise ValueError("workers must be positive")
+    if isinstance(out, (str, Path)):
+        Path(out).mkdir(parents=True, exist_ok=True)
+
+    return _run(iter(layouts), workers, out, format, mode, background, resolver, source_id, progress, params)
+
+
+def _run(
+    layouts: Iterator[ImageJointer | LayoutPlan],
+    workers: int,
+    out: str | Path | Callable[[int], str | Path] | None,
+    format: str | None,
+    mode: str,
+    background: float | tuple[float, ...] | str | None,
+    resolver: Callable[[Hashable], Image.Image | Figure] | None,
+    source_id: Callable[[Image.Image | Figure], Hashable] | None,
+    progress: Callable[[int, int], None] | None,
+    params: dict[str, Any],
+) -> Iterator[RenderResult]:
+    """
+    Submit layouts as binary plans while keeping number of pending ones bounded, and yield results as they complete.
+    """
+    completed = 0
+    failed = 0
+    pending: dict[Future[RenderResult], int] = {}
+    executor = ProcessPoolExecutor(workers)
+    try:
+        index = 0
+        exhausted = False
+        while pending or not exhausted:
+            ready: list[RenderResult] = []
+            while not exhausted and len(pending) < workers * _PENDING_PER_WORKER:
+                layout = next(layouts, _END)
+                if layout is _END:
+                    exhausted = True
+                    break
+                try:
+                    data = _compile(layout, source_id)
+                    path = _output_path(out, index, format)
+                except Exception:
+                    ready.append(RenderResult(index, error=traceback.format_exc()))
+                else:
+                    future = executor.submit(_render_one, index, data, path, format, mode, background, resolver, params)
+                    pending[future] = index
+                index += 1
+
+            if not ready and pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ready.append(_result(future, pending.pop(future)))
+
+            for result in ready:
+                completed += 1
+                failed += not result.ok
+                if progress is not None:
+                    progress(completed, failed)
+                yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _compile(layout: ImageJointer | LayoutPlan, source_id: Callable[[Image.Image | Figure], Hashable] | None) -> bytes:
+    match layout:
+        case ImageJointer():
+            return layout.compile(source_id).to_bytes()
+        case LayoutPlan():
+            return layout.to_bytes()
+        case _:
+            raise ValueError("layout is invalid type")
+
+
+def _output_path(out: str | Path | Callable[[int], str | Path] | None, index: int, format: str | None) -> Path | None:
+    match out:
+        case None:
+            return None
+        case str() | Path():
+            return Path(out) / f"{index}.{(format or 'PNG').lower()}"
+        case _:
+            return Path(out(index))
+
+
+def _result(future: Future[RenderResult], index: int) -> RenderResult:
+    try:
+        return future.result()
+    except Exception:
+        # worker process died or result could not be sent back.
+        return RenderResult(index, error=traceback.format_exc())
+
+
+def _render_one(
+    index: int,
+    data: bytes,
+    path: Path | None,
+    format: str | None,
+    mode: str,
+    background: float | tuple[float, ...] | str | None,
+    resolver: Callable[[Hashable], Image.Image | Figure] | None,
+    params: dict[str, Any],
+) -> RenderResult:
+    """
+    Render one plan in worker process. Sources are loaded by resolver in the worker.
+    """
+    start = perf_counter()
+    try:
+        image = LayoutPlan.from_bytes(data).to_image(resolver, mode=mode, background=background)
+        if path is not None:
+            image.save(path, format or ("PNG" if not path.suffix else None), **params)
+            image = None
+    except Exception:
+        return RenderResult(index, error=traceback.format_exc(), seconds=perf_counter() - start)
+    return RenderResult(index, image, path, None, perf_counter() - start)
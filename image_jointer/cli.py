@@ -0,0 +1,146 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+"""
+Render outputs described by manifest. Outputs whose layout and inputs are unchanged since last run are skipped.
+
+    image-jointer manifest.json
+    image-jointer manifest.toml --workers 8 --force
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from itertools import groupby
+from pathlib import Path
+
+from .manifest import _load_manifest, _Output, _resolve_source, _source_id
+from .utils import Utility
+
+# file next to manifest keeping keys of outputs built last time.
+_STATE_FILE = ".image-jointer-state.json"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="image-jointer", description="render images described by manifest")
+    parser.add_argument("manifest", type=Path, help="JSON or TOML manifest")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of processes. default to CPUs")
+    parser.add_argument("-f", "--force", action="store_true", help="render all outputs even if up to date")
+    parser.add_argument("--state", type=Path, help=f"file keeping last build. default to {_STATE_FILE} of manifest")
+    parser.add_argument("-q", "--quiet", action="store_true", help="print only errors and summary")
+    args = parser.parse_args(argv)
+
+    try:
+        outputs = _load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if args.workers is not None and args.workers <= 0:
+        print("error: workers must be positive", file=sys.stderr)
+        return 2
+
+    state_path = args.state if args.state is not None else args.manifest.resolve().parent / _STATE_FILE
+    state = _read_state(state_path)
+
+    keys = {output.path: output.key() for output in outputs}
+    stale = [
+        output
+        for output in outputs
+        if args.force or state.get(str(output.path)) != keys[output.path] or not output.path.exists()
+    ]
+
+    built = 0
+    failed = 0
+    try:
+        # outputs of same settings are rendered in one pool.
+        for _, group in groupby(sorted(stale, key=_settings_key), key=_settings_key):
+            group_built, group_failed = _render(list(group), args.workers, keys, state, args.quiet)
+            built += group_built
+            failed += group_failed
+    finally:
+        _write_state(state_path, state)
+
+    print(f"{built} built, {len(outputs) - len(stale)} up to date, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _settings_key(output: _Output) -> str:
+    return json.dumps(output.settings, sort_keys=True)
+
+
+def _render(
+    outputs: list[_Output], workers: int | None, keys: dict[Path, str], state: dict[str, str], quiet: bool
+) -> tuple[int, int]:
+    """
+    Render outputs of same settings and record keys of built ones to state.
+
+    Returns:
+        tuple[int, int]: number of built and failed outputs
+    """
+    built = 0
+    failed = 0
+    submitted: list[_Output] = []
+
+    def fail(output: _Output, error: str):
+        nonlocal failed
+        failed += 1
+        state.pop(str(output.path), None)
+        print(f"error: {output.path}\n{error}", file=sys.stderr)
+
+    def layouts():
+        # layouts are built lazily, so sources are opened only when workers are ready.
+        for output in outputs:
+            try:
+                layout = output.build()
+            except (OSError, ValueError) as e:
+                fail(output, str(e))
+                continue
+            output.path.parent.mkdir(parents=True, exist_ok=True)
+            submitted.append(output)
+            yield layout
+
+    settings = outputs[0].settings
+    results = Utility.render_many(
+        layouts(),
+        workers=workers,
+        out=lambda i: submitted[i].path,
+        format=settings["format"],
+        mode=settings["mode"],
+        background=settings["background"],
+        resolver=_resolve_source,
+        source_id=_source_id,
+        **settings["options"],
+    )
+    for result in results:
+        output = submitted[result.index]
+        if not result.ok:
+            fail(output, result.error)
+            continue
+        built += 1
+        state[str(output.path)] = keys[output.path]
+        if not quiet:
+            print(output.path)
+    return built, failed
+
+
+def _read_state(path: Path) -> dict[str, str]:
+    try:
+        with open(path) as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _write_state(path: Path, state: dict[str, str]):
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "w") as file:
+        json.dump(state, file, indent=1, sort_keys=True)
+    temporary.replace(path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
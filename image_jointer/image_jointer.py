@@ -4,18 +4,59 @@
 
 from __future__ import annotations
 
+import inspect
+import io
+import math
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Callable, Hashable, Iterable, Iterator, Sequence
+
 from PIL import Image
 
+from .base.batch_layout import calc_joint_offsets
+from .base.conversion import _convert_repeated
 from .base.blank import Blank
 from .base.enums import JointAlignment
 from .base.figure import Figure
-from .base.adapter import ImageAdapter
-from .base.part import _Part
+from .base.lazy_image import LazyImage, _LastDecoded
+from .base.adapter import ImageAdapter, _source_identity
+from .base.part import _Part, _PartColumns
+from .base.part_tree import _PartTree
+from .base.render_plan import _background_mode, _choose_mode, _fill_color, _intersect, _make_plan, _RenderPlan
+from .base.scaled import _scale_figure
+from .base.spatial_index import _GridIndex, _is_overlapped, _part_box
 from .base.vector import Vector
+from .layout_plan import LayoutPlan, _default_source_id
+from .memmap_canvas import _memmap_format, _open_memmap
+from .profiler import _DISABLED, _record, _Recorder
+from .render_cache import RenderCache
+from .render_pool import RenderPool, _get_default_pool
+from .stream_encoder import (
+    _STREAM_FORMATS,
+    _check_stream_format,
+    _is_streamable,
+    _make_stream_encoder,
+    _take_chunks,
+)
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+# modes to_array supports and number of channels
+_ARRAY_CHANNELS = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4}
+
+# height of band drawn at once when figures can not draw into memory-mapped file.
+_MEMMAP_BAND_HEIGHT = 256
 
 
 class ImageJointer(Figure):
-    __parts: tuple[_Part, ...]
+    __tree: _PartTree
+    __index: _GridIndex | None
+    __plan: _RenderPlan | None
+    __sources: dict[int, list[int]] | None
 
     def __init__(self, source: Image.Image | Figure | None = None) -> None:
         """
@@ -29,24 +70,84 @@ class ImageJointer(Figure):
         Raises:
             ValueError: raise if source is invalid type
         """
+        self.__index = None
+        self.__plan = None
+        self.__sources = None
+
         match source:
             case Image.Image():
                 source = ImageAdapter(source)
 
         match source:
             case ImageJointer():
-                self.__parts = source.__parts
+                self.__tree = source.__tree.as_nested()
                 self.__width = source.width
                 self.__height = source.height
             case None:
-                self.__parts = tuple()
+                self.__tree = _PartTree()
                 self.__width = 0
                 self.__height = 0
             case _:
-                self.__parts = (_Part(source),)
+                # same as jointing. Blank makes no part.
+                self.__tree = _PartTree(tuple(source._paste(Vector())))
                 self.__width = source.width
                 self.__height = source.height
 
+    def __getstate__(self) -> dict:
+        # caches are made again from tree. map of sources is keyed by id, which copied sources do not have.
+        state = dict(self.__dict__)
+        state.update(_ImageJointer__index=None, _ImageJointer__plan=None, _ImageJointer__sources=None)
+        return state
+
+    @classmethod
+    def _arranged(
+        cls,
+        placements: Iterable[tuple[Image.Image | Figure, Vector]],
+        width: int,
+        height: int,
+        base: ImageJointer | None = None,
+    ) -> ImageJointer:
+        """
+        Layout of given size which has sources at positions in drawing order.
+        Size is not extended to sources.
+        Layouts placed are nested layouts except base, which is layout jointed to.
+        """
+        # share parts of nested layouts, and gather parts of other figures into one node.
+        trees: list[_PartTree] = []
+        sources: list[Figure] = []
+        x_list: list[int] = []
+        y_list: list[int] = []
+        adapters: dict[int, ImageAdapter] = {}
+        for figure, position in placements:
+            match figure:
+                case ImageJointer():
+                    trees.append(_PartTree(_PartColumns(tuple(sources), array("i", x_list), array("i", y_list))))
+                    tree = figure.__tree if figure is base else figure.__tree.as_nested()
+                    trees.append(tree.shifted(position))
+                    sources, x_list, y_list = [], [], []
+                case Image.Image() | ImageAdapter():
+                    if isinstance(figure, Image.Image):
+                        adapter = adapters.get(id(figure))
+                        if adapter is None:
+                            adapter = adapters[id(figure)] = ImageAdapter(figure)
+                        figure = adapter
+                    # same as _paste of ImageAdapter without making _Part.
+                    sources.append(figure)
+                    x_list.append(position.x)
+                    y_list.append(position.y)
+                case _:
+                    for part in figure._paste(position):
+                        sources.append(part.source)
+                        x_list.append(part.position.x)
+                        y_list.append(part.position.y)
+        trees.append(_PartTree(_PartColumns(tuple(sources), array("i", x_list), array("i", y_list))))
+
+        arranged = cls()
+        arranged.__tree = _PartTree().concat(*trees)
+        arranged.__width = width
+        arranged.__height = height
+        return arranged
+
     @property
     def width(self) -> int:
         return self.__width
@@ -56,11 +157,10 @@ class ImageJointer(Figure):
         return self.__height
 
     def _paste(self, position: Vector):
-        for part in self.__parts:
-            yield part.paste(position)
+        yield from self.__tree.walk(position)
 
     def _draw(self, output: Image.Image, position: Vector):
-        for part in self.__parts:
+        for part in self.__tree.walk(position):
             part.draw(output)
 
     def __calc_paste_pos(self, alignment: JointAlignment, paste_image: Figure) -> Vector:
@@ -89,9 +189,13 @@ class ImageJointer(Figure):
             case _:
                 raise ValueError("alignment is invalid")
 
-    def __run_joint(self, image: Figure, paste_to: Vector):
-        yield from self.__parts
-        yield from image._paste(paste_to)
+    def __run_joint(self, image: Figure, paste_to: Vector) -> _PartTree:
+        match image:
+            case ImageJointer():
+                # share parts of nested layout instead of copying them.
+                return self.__tree.concat(image.__tree.shifted(paste_to))
+            case _:
+                return self.__tree.concat(_PartTree(tuple(image._paste(paste_to))))
 
     def __joint_single(self, alignment: JointAlignment, image: Image.Image | Figure) -> ImageJointer:
         """
@@ -151,12 +255,49 @@ class ImageJointer(Figure):
 
         # make output
         output = ImageJointer()
-        output.__parts = tuple(base_image.__run_joint(image, paste_to))
+        output.__tree = base_image.__run_joint(image, paste_to)
         output.__width = max(base_image.width, image.width + paste_to.x)
         output.__height = max(base_image.height, image.height + paste_to.y)
 
         return output
 
+    def __joint_multiple(self, alignment: JointAlignment, images: tuple[Image.Image | Figure, ...]) -> ImageJointer:
+        """
+        Joint images at once.
+        Same result as jointing one by one, but all paste positions are calculated in one pass.
+        There are no side effect.
+
+        Args:
+            alignment (JointAlignment): how to align image
+
+            images (tuple[Image.Image | Figure, ...]): images to joint
+
+        Returns:
+            ImageJointer: New instance of jointed image. Method chainable.
+        """
+        if not isinstance(alignment, JointAlignment):
+            raise ValueError("alignment is invalid type")
+        if not all(isinstance(image, (Image.Image, Figure)) for image in images):
+            raise ValueError("Image is invalid type")
+
+        # apply adapter
+        figures = [self, *_adapt(images)]
+
+        x_list, y_list, width, height = calc_joint_offsets(
+            alignment, [(figure.width, figure.height) for figure in figures]
+        )
+
+        placements = list(zip(figures, x_list, y_list))
+
+        # jointing to up or left puts later images in front of base.
+        match alignment:
+            case JointAlignment.UP_LEFT | JointAlignment.UP_CENTER | JointAlignment.UP_RIGHT:
+                placements.reverse()
+            case JointAlignment.LEFT_TOP | JointAlignment.LEFT_CENTER | JointAlignment.LEFT_BOTTOM:
+                placements.reverse()
+
+        return ImageJointer._arranged(((figure, Vector(x, y)) for figure, x, y in placements), width, height, self)
+
     def joint(
         self,
         alignment: JointAlignment,
@@ -174,19 +315,891 @@ class ImageJointer(Figure):
         Returns:
             ImageJointer: New instance of jointed image. Method chainable.
         """
-        jointed = self
-        for element in images:
-            jointed = jointed.__joint_single(alignment, element)
+        recorder = _record("joint")
+        # layouts given here are nested layouts, and layout made by jointing to self is not.
+        images = tuple(image.__as_nested() if isinstance(image, ImageJointer) else image for image in images)
+        match images:
+            case ():
+                jointed = self
+            case (image,):
+                jointed = self.__joint_single(alignment, image)
+            case _:
+                jointed = self.__joint_multiple(alignment, images)
+        recorder.lap("layout")
+        recorder.finish(jointed.__tree.length)
         return jointed
 
-    def to_image(self):
+    def __as_nested(self) -> ImageJointer:
+        tree = self.__tree.as_nested()
+        if tree is self.__tree:
+            return self
+        nested = ImageJointer()
+        nested.__tree = tree
+        nested.__width = self.__width
+        nested.__height = self.__height
+        return nested
+
+    def __get_index(self) -> _GridIndex:
+        # layout is immutable, so index can be reused.
+        if self.__index is None:
+            self.__index = _GridIndex(self.__tree.columns())
+        return self.__index
+
+    def replace(
+        self,
+        old: Image.Image | Figure,
+        new: Image.Image | Figure,
+        image: Image.Image | None = None,
+        background: float | tuple[float, ...] | str | None = None,
+    ) -> ImageJointer:
+        """
+        Replace source by another one of same size.
+        There are no side effect on this layout.
+        If image made by to_image of this layout is given, only rectangles of replaced source are redrawn in it.
+
+        Args:
+            old (Image.Image | Figure): source to replace. found by identity, not by pixels
+            new (Image.Image | Figure): new source of same size. figure must be drawn as one part
+                                        such as image or LazyImage, not ImageJointer or Blank
+            image (Image.Image | None): whole image made from this layout. updated in place. default to None
+            background (float | tuple[float, ...] | str | None): background given to to_image. default to None
+
+        Returns:
+            ImageJointer: New instance of replaced layout.
+
+        Raises:
+            ValueError: raise if old is not in layout, new is not one part or size of new or image is different
+        """
+        if not isinstance(new, (Image.Image, Figure)):
+            raise ValueError("Image is invalid type")
+        if (old.width, old.height) != (new.width, new.height):
+            raise ValueError("size of new source must be same as old one")
+        if image is not None and image.size != (self.width, self.height):
+            raise ValueError("image is not made from this layout")
+
+        sources = self.__get_sources()
+        found = sources.get(id(old))
+        if found is None:
+            raise ValueError("old source is not in layout")
+        if isinstance(new, Image.Image):
+            new = ImageAdapter(new)
+        # each replaced part is drawn by new one, so new must be one part at its origin.
+        match list(new._paste(Vector())):
+            case [part] if part.position == Vector() and (part.width, part.height) == (new.width, new.height):
+                new = part.source
+            case _:
+                raise ValueError("new source must be drawn as one part")
+
+        index = self.__get_index()
+
+        replaced = ImageJointer()
+        replaced.__width = self.width
+        replaced.__height = self.height
+        replaced.__tree = self.__tree.replaced({i: new for i in found})
+        replaced.__index = index.replaced({i: new for i in found})
+        if self.__plan is not None and index.parts.sources[found[0]]._overwrite == new._overwrite:
+            replaced.__plan = self.__plan
+        replaced.__sources = dict(sources)
+        del replaced.__sources[id(old)]
+        key = id(_source_identity(new))
+        replaced.__sources[key] = sorted(found + replaced.__sources.get(key, []))
+
+        if image is not None:
+            fill = _fill_color(image.mode, background)
+            for i in found:
+                box = _intersect(index.boxes[i], (0, 0, self.width, self.height))
+                if box[0] < box[2] and box[1] < box[3]:
+                    image.paste(replaced.__draw_region(box, mode=image.mode, fill=fill), box[:2])
+        return replaced
+
+    def __get_sources(self) -> dict[int, list[int]]:
+        """
+        Index of parts for each source. key is id of source given by user.
+        """
+        if self.__sources is None:
+            self.__sources = {}
+            for i, source in enumerate(self.__get_index().parts.sources):
+                self.__sources.setdefault(id(_source_identity(source)), []).append(i)
+        return self.__sources
+
+    def compile(self, source_id: Callable[[Image.Image | Figure], Hashable] | None = None) -> LayoutPlan:
+        """
+        Compile layout to plan which can be serialized and rendered without this layout.
+        Sources are stored as id and resolved at rendering.
+
+        Args:
+            source_id (Callable[[Image.Image | Figure], Hashable] | None): function giving id of source.
+                id must be str, int or tuple of them to serialize. sources of same id are regarded as same.
+                default to None (path and size of LazyImage or file name of Image opened from file)
+
+        Returns:
+            LayoutPlan: plan
+
+        Raises:
+            ValueError: raise if id of source is unknown
+        """
+        if source_id is None:
+            source_id = _default_source_id
+
+        table: dict[Hashable, int] = {}
+        found: dict[int, int] = {}  # id of source -> index in table
+        sources = []
+        for source in self.__get_index().parts.sources:
+            identity = _source_identity(source)
+            index = found.get(id(identity))
+            if index is None:
+                index = table.setdefault(source_id(identity), len(table))
+                found[id(identity)] = index
+            sources.append(index)
+
+        boxes = self.__get_index().boxes
+        return LayoutPlan(
+            self.width,
+            self.height,
+            list(table),
+            sources,
+            [box[0] for box in boxes],
+            [box[1] for box in boxes],
+            [box[2] - box[0] for box in boxes],
+            [box[3] - box[1] for box in boxes],
+        )
+
+    def to_image(
+        self,
+        box: tuple[int, int, int, int] | None = None,
+        workers: int = 1,
+        cache: RenderCache | None = None,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+        scale: float | None = None,
+        max_size: tuple[int, int] | None = None,
+    ):
         """
         Make Image.
 
+        Args:
+            box (tuple[int, int, int, int] | None): left, top, right, bottom of region to make.
+                                                    only parts in the region are drawn. default to None (whole image)
+                                                    with scale or max_size, box is in scaled image.
+            workers (int): number of threads drawing parts in parallel. default to 1
+            cache (RenderCache | None): cache of rendered sub layouts. default to None (not use cache)
+            mode (str): mode of image. "auto" chooses narrowest one of "L", "LA", "RGB" and "RGBA"
+                        which represents all images and background. default to "RGBA"
+            background (float | tuple[float, ...] | str | None): color of pixels no image is drawn.
+                                                                default to None (transparent black)
+            scale (float | None): make image scaled by this. each image is shrunk before pasting,
+                                  and full size image is never made. default to None (not scaled)
+            max_size (tuple[int, int] | None): make image scaled down to fit in this size
+                                               keeping aspect ratio. default to None (not scaled)
+
         Returns:
             Image.Image: image
+
+        Raises:
+            ValueError: raise if box, workers, mode, background, scale or max_size is invalid
         """
-        output = Image.new("RGBA", (self.width, self.height), (0, 0, 0, 0))
-        for part in self.__parts:
-            part.draw(output)
+        scale = self.__preview_scale(scale, max_size)
+        if scale is not None:
+            return self.__get_preview(scale).to_image(box, workers, cache, mode, background)
+
+        recorder = _record("to_image")
+        box = self.__check_region(box, workers)
+        self.__get_index()
+        recorder.lap("index")
+        mode = self.__resolve_mode(box, mode, background)
+        image = self.__draw_region(box, workers, cache, mode, _fill_color(mode, background), recorder)
+        recorder.finish(self.__tree.length)
+        return image
+
+    def __preview_scale(self, scale: float | None, max_size: tuple[int, int] | None) -> float | None:
+        """
+        Scale of preview. None if not scaled.
+        """
+        if scale is not None and max_size is not None:
+            raise ValueError("give only one of scale and max_size")
+        if scale is not None:
+            if not scale > 0:
+                raise ValueError("scale must be positive")
+            return None if scale == 1 else scale
+        if max_size is not None:
+            if max_size[0] <= 0 or max_size[1] <= 0:
+                raise ValueError("max_size must be positive")
+            if self.width <= max_size[0] and self.height <= max_size[1]:
+                return None
+            # side of zero length fits in any size.
+            return min(limit / length for limit, length in zip(max_size, (self.width, self.height)) if length > 0)
+        return None
+
+    def __get_preview(self, scale: float) -> ImageJointer:
+        """
+        Layout scaled by scale. Parts with shrunk sources are placed at rounded edges,
+        so edges shared by neighboring parts stay shared.
+        It is not kept, so resized sources are released after rendering.
+        """
+
+        def edge(value: int) -> int:
+            return math.floor(value * scale + 0.5)
+
+        index = self.__get_index()
+        figures: dict[tuple[int, int, int], Figure | None] = {}
+        placements: list[tuple[Figure, Vector]] = []
+        for source, (left, top, right, bottom) in zip(index.parts.sources, index.boxes):
+            left, top, right, bottom = edge(left), edge(top), edge(right), edge(bottom)
+            if left >= right or top >= bottom:
+                continue
+            key = (id(source), right - left, bottom - top)
+            if key not in figures:
+                figures[key] = _scale_figure(source, right - left, bottom - top)
+            figure = figures[key]
+            if figure is not None:
+                placements.append((figure, Vector(left, top)))
+
+        return ImageJointer._arranged(placements, edge(self.width), edge(self.height))
+
+    def to_array(
+        self,
+        box: tuple[int, int, int, int] | None = None,
+        workers: int = 1,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Make image as NumPy array. numpy is required.
+        Each image is written into its slice of one array, and PIL image of whole layout is never made.
+
+        Args:
+            box (tuple[int, int, int, int] | None): same as to_image. default to None (whole image)
+            workers (int): same as to_image. default to 1
+            mode (str): "L", "LA", "RGB", "RGBA" or "auto". same as to_image. default to "RGBA"
+            background (float | tuple[float, ...] | str | None): same as to_image. default to None
+            out (np.ndarray | None): uint8 array to draw into instead of new one. default to None
+
+        Returns:
+            np.ndarray: uint8 array. shape is (height, width) for "L" and (height, width, channels) for others
+
+        Raises:
+            ValueError: raise if box, workers, mode, background or out is invalid
+            ImportError: raise if numpy is not installed
+        """
+        if np is None:
+            raise ImportError("to_array requires numpy")
+
+        recorder = _record("to_array")
+        box = self.__check_region(box, workers)
+        self.__get_index()
+        recorder.lap("index")
+        mode = self.__resolve_mode(box, mode, background)
+        if mode not in _ARRAY_CHANNELS:
+            raise ValueError(f"mode {mode} is not supported")
+        if out is not None:
+            if out.dtype != np.uint8 or out.shape != _array_shape(box[2] - box[0], box[3] - box[1], mode):
+                raise ValueError("out is not uint8 array of image shape")
+        output = self.__draw_array_region(box, workers, mode, _fill_color(mode, background), out, recorder)
+        recorder.finish(self.__tree.length)
+        return output
+
+    def render_to_memmap(
+        self,
+        path: str | Path,
+        mode: str = "RGBA",
+        format: str | None = None,
+        background: float | tuple[float, ...] | str | None = None,
+        workers: int = 1,
+    ) -> np.memmap:
+        """
+        Make image directly in memory-mapped file. numpy is required.
+        Each image is written only into its own rectangle of the file,
+        so image larger than memory can be made and read back through page cache.
+
+        Args:
+            path (str | Path): file path to create
+            mode (str): "L", "LA", "RGB", "RGBA" or "auto". same as to_image. default to "RGBA"
+            format (str | None): "NPY", "RAW" (pixels only) or "TIFF" (uncompressed, less than 4GiB).
+                                 default to None (decided by file extension)
+            background (float | tuple[float, ...] | str | None): same as to_image. default to None
+            workers (int): same as to_image. default to 1
+
+        Returns:
+            np.memmap: writable uint8 array mapping pixels in file. shape is same as to_array
+
+        Raises:
+            ValueError: raise if format, mode, background or workers is invalid or image size is zero
+            ImportError: raise if numpy is not installed
+        """
+        if np is None:
+            raise ImportError("render_to_memmap requires numpy")
+
+        recorder = _record("render_to_memmap")
+        box = self.__check_region(None, workers)
+        format = _memmap_format(path, format)
+        self.__get_index()
+        recorder.lap("index")
+        mode = self.__resolve_mode(box, mode, background)
+        fill = _fill_color(mode, background)
+        recorder.lap("plan")
+
+        output = _open_memmap(path, format, self.width, self.height, mode)
+        recorder.allocated(output.nbytes)
+        recorder.lap("allocate")
+        self.__draw_array_region(box, workers, mode, fill, output, recorder)
+        output.flush()
+        recorder.lap("encode")
+        recorder.finish(self.__tree.length)
         return output
+
+    def __check_region(self, box: tuple[int, int, int, int] | None, workers: int) -> tuple[int, int, int, int]:
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+
+        if box is None:
+            return (0, 0, self.width, self.height)
+
+        left, top, right, bottom = box
+        if right < left or bottom < top:
+            raise ValueError("box is invalid")
+        return box
+
+    def __resolve_mode(
+        self, box: tuple[int, int, int, int], mode: str, background: float | tuple[float, ...] | str | None
+    ) -> str:
+        if mode != "auto":
+            return mode
+
+        plan = self.__get_plan(box)
+        sources = self.__get_index().parts.sources
+        modes = [sources[i]._mode for i, _ in plan.draws]
+        if not plan.covered:
+            # gaps are filled by background.
+            modes.append(_background_mode(background))
+        return _choose_mode(modes)
+
+    def __get_plan(self, box: tuple[int, int, int, int]) -> _RenderPlan:
+        if box != (0, 0, self.width, self.height):
+            return _make_plan(self.__get_index(), box)
+
+        # plan of whole image can be reused same as index.
+        if self.__plan is None:
+            self.__plan = _make_plan(self.__get_index(), box)
+        return self.__plan
+
+    def __draw_region(
+        self,
+        box: tuple[int, int, int, int],
+        workers: int = 1,
+        cache: RenderCache | None = None,
+        mode: str = "RGBA",
+        fill: float | tuple[float, ...] = (0, 0, 0, 0),
+        recorder: _Recorder = _DISABLED,
+        output: Image.Image | None = None,
+        decoded: _LastDecoded | None = None,
+    ) -> Image.Image:
+        """
+        Draw region following render plan.
+        Parts hidden by later parts are skipped and only pixels which no part overwrites are cleared.
+
+        With workers, draw parts in threads. Decoding, converting and pasting in Pillow release GIL.
+        Parts not overlapping others never touch same pixels, so they are drawn in any order.
+        Overlapping parts are drawn in order afterward.
+
+        With cache, sub layouts found in cache are pasted at once instead of drawing their parts.
+        Output is drawn into given image of same mode and size instead of new one.
+        With decoded, LazyImage decoded for previous band is reused.
+        """
+        left, top, right, bottom = box
+        origin = Vector(left, top)
+        parts = self.__get_index().parts
+        overlapped = self.__get_index().overlapped
+        plan = self.__get_plan(box)
+        recorder.lap("plan")
+
+        draws = plan.draws
+        blits: list[tuple[Image.Image, Vector]] = []
+        if cache is not None:
+            blits, replaced = self.__use_cache(cache, box, mode, fill)
+            if replaced:
+                skip = bytearray(len(parts))
+                for start, end in replaced:
+                    skip[start:end] = b"\x01" * (end - start)
+                draws = tuple((i, pieces) for i, pieces in draws if not skip[i])
+            recorder.lap("cache")
+
+        converted, conversions = _convert_repeated(parts.sources, (i for i, _ in draws), mode, decoded)
+        recorder.converted(conversions, len(converted))
+        recorder.lap("convert")
+
+        def draw(draws: Sequence[tuple[int, tuple[tuple[int, int, int, int], ...] | None]]):
+            for i, pieces in draws:
+                part = parts[i]
+                if i in converted:
+                    part = _Part(converted[i], part.position)
+                elif decoded is not None and isinstance(part.source, LazyImage):
+                    part = _Part(decoded.load(part.source), part.position)
+                if pieces is None:
+                    part.draw(output, origin)
+                else:
+                    for piece in pieces:
+                        part.draw(output, origin, piece)
+
+        if recorder.enabled:
+            draw = recorder.timed(draw, parts)
+
+        # not initialized. every pixel is cleared as gap or overwritten by part.
+        if output is None or output.mode != mode or output.size != (right - left, bottom - top):
+            output = Image.new(mode, (right - left, bottom - top), None)
+            recorder.allocated(output.width * output.height * len(output.getbands()))
+        for gap_left, gap_top, gap_right, gap_bottom in plan.gaps:
+            output.paste(fill, (gap_left - left, gap_top - top, gap_right - left, gap_bottom - top))
+        recorder.lap("allocate")
+
+        if workers == 1:
+            draw(draws)
+        else:
+            self.__draw_parallel(draw, draws, overlapped, workers)
+
+        # sub layouts from cache overlap no other part.
+        for image, position in blits:
+            output.paste(image, (position.x - left, position.y - top))
+        recorder.drew(len(draws) + len(blits))
+        recorder.lap("draw")
+        return output
+
+    def __draw_array_region(
+        self,
+        box: tuple[int, int, int, int],
+        workers: int,
+        mode: str,
+        fill: float | tuple[float, ...],
+        output: np.ndarray | None = None,
+        recorder: _Recorder = _DISABLED,
+    ) -> np.ndarray:
+        """
+        Draw region into NumPy array following render plan same as __draw_region.
+        If some figure can not draw into array, draw PIL image and copy it.
+        If output is given, draw into it, and PIL image is drawn band by band.
+        """
+        left, top, right, bottom = box
+        origin = Vector(left, top)
+        parts = self.__get_index().parts
+        plan = self.__get_plan(box)
+
+        if not all(parts.sources[i]._array for i, _ in plan.draws):
+            if output is None:
+                output = np.array(self.__draw_region(box, workers, None, mode, fill, recorder))
+                recorder.allocated(output.nbytes)
+                recorder.lap("draw")
+                return output
+            decoded = _LastDecoded()
+            for band_top in range(top, bottom, _MEMMAP_BAND_HEIGHT):
+                band = (left, band_top, right, min(band_top + _MEMMAP_BAND_HEIGHT, bottom))
+                output[band_top - top : band[3] - top] = self.__draw_region(
+                    band, workers, None, mode, fill, recorder, decoded=decoded
+                )
+                recorder.lap("draw")
+            return output
+        recorder.lap("plan")
+
+        converted, conversions = _convert_repeated(parts.sources, (i for i, _ in plan.draws), mode)
+        recorder.converted(conversions, len(converted))
+        recorder.lap("convert")
+
+        def draw(draws: Sequence[tuple[int, tuple[tuple[int, int, int, int], ...] | None]]):
+            for i, pieces in draws:
+                part = parts[i]
+                if i in converted:
+                    part = _Part(converted[i], part.position)
+                if pieces is None:
+                    part.draw_array(output, mode, origin)
+                else:
+                    for piece in pieces:
+                        part.draw_array(output, mode, origin, piece)
+
+        if recorder.enabled:
+            draw = recorder.timed(draw, parts)
+
+        if output is None:
+            output = np.empty(_array_shape(right - left, bottom - top, mode), np.uint8)
+            recorder.allocated(output.nbytes)
+        for gap_left, gap_top, gap_right, gap_bottom in plan.gaps:
+            output[gap_top - top : gap_bottom - top, gap_left - left : gap_right - left] = fill
+        recorder.lap("allocate")
+
+        if workers == 1:
+            draw(plan.draws)
+        else:
+            self.__draw_parallel(draw, plan.draws, self.__get_index().overlapped, workers)
+        recorder.drew(len(plan.draws))
+        recorder.lap("draw")
+        return output
+
+    @staticmethod
+    def __draw_parallel(
+        draw: Callable[[Sequence[tuple[int, tuple[tuple[int, int, int, int], ...] | None]]], None],
+        draws: Sequence[tuple[int, tuple[tuple[int, int, int, int], ...] | None]],
+        overlapped: frozenset[int],
+        workers: int,
+    ):
+        independent = [(i, pieces) for i, pieces in draws if i not in overlapped]
+        dependent = [(i, pieces) for i, pieces in draws if i in overlapped]
+        # more chunks than workers for balancing load.
+        chunk_size = max(-(-len(independent) // (workers * 4)), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(
+                draw, (independent[i : i + chunk_size] for i in range(0, len(independent), chunk_size))
+            ):
+                pass
+        draw(dependent)
+
+    def __use_cache(
+        self, cache: RenderCache, box: tuple[int, int, int, int], mode: str, fill: float | tuple[float, ...]
+    ) -> tuple[list[tuple[Image.Image, Vector]], list[tuple[int, int]]]:
+        """
+        Find nested layouts which can be pasted from cache. Only layouts given to joint or constructor are nested.
+        Sub layout is used only if no other part overlaps it.
+
+        Returns:
+            tuple[list[tuple[Image.Image, Vector]], list[tuple[int, int]]]:
+                images with position in layout, and ranges of part index replaced by them
+        """
+        index = self.__get_index()
+        blits: list[tuple[Image.Image, Vector]] = []
+        replaced: list[tuple[int, int]] = []
+
+        stack = [(self.__tree, Vector(), 0, True)]
+        while stack:
+            tree, parent, start, is_root = stack.pop()
+            origin = parent + tree.offset
+
+            if not is_root and tree.nested and tree.length >= 2:
+                entry = cache._get(tree, (mode, fill))
+                if entry is None and cache._admit(tree, (mode, fill)):
+                    entry = ImageJointer.__render_sub_layout(tree, cache, mode, fill)
+                if entry is not None:
+                    image, position = entry
+                    position = origin + position
+                    area = (position.x, position.y, position.x + image.width, position.y + image.height)
+                    end = start + tree.length
+                    if all(start <= i < end for i in index.query_index(area)):
+                        replaced.append((start, end))
+                        if _is_overlapped(area, box):
+                            blits.append((image, position))
+                        continue
+
+            child_start = start + len(tree.parts)
+            for child in tree.children:
+                stack.append((child, origin, child_start, False))
+                child_start += child.length
+
+        return blits, replaced
+
+    @staticmethod
+    def __render_sub_layout(
+        tree: _PartTree, cache: RenderCache, mode: str, fill: float | tuple[float, ...]
+    ) -> tuple[Image.Image, Vector] | None:
+        """
+        Render tree without its offset and store it to cache.
+
+        Returns:
+            tuple[Image.Image, Vector] | None: rendered image and its position. None if nothing to draw.
+        """
+        content = _PartTree(tree.parts, tree.children)
+        boxes = [_part_box(part) for part in content]
+        boxes = [(left, top, right, bottom) for left, top, right, bottom in boxes if left < right and top < bottom]
+        if not boxes:
+            return None
+
+        left = min(box[0] for box in boxes)
+        top = min(box[1] for box in boxes)
+        sub_layout = ImageJointer()
+        sub_layout.__tree = content.shifted(Vector(-left, -top))
+        sub_layout.__width = max(box[2] for box in boxes) - left
+        sub_layout.__height = max(box[3] for box in boxes) - top
+
+        # drawn without cache. looking up cache in layouts nested in sub layout would recurse as deep as nesting.
+        image = sub_layout.__draw_region((0, 0, sub_layout.width, sub_layout.height), 1, None, mode, fill)
+        cache._put(tree, (mode, fill), image, Vector(left, top))
+        return image, Vector(left, top)
+
+    def save(
+        self,
+        fp: str | Path | IO[bytes],
+        format: str | None = None,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+        band_height: int = 256,
+        **params: Any,
+    ):
+        """
+        Render and encode image into file.
+        PNG and uncompressed TIFF of mode "L", "LA", "RGB" or "RGBA" are encoded band by band same as save_streaming,
+        and whole image is never made. Other formats and options are encoded by Pillow from whole image.
+
+        Args:
+            fp (str | Path | IO[bytes]): file path or binary file object to write
+            format (str | None): format of Pillow. default to None (decided by file extension)
+            mode (str): same as to_image. default to "RGBA"
+            background (float | tuple[float, ...] | str | None): same as to_image. default to None
+            band_height (int): height of band encoded at once. default to 256
+            **params: options of Pillow encoder. "compress_level" of PNG is supported in band encoding
+
+        Raises:
+            ValueError: raise if format is unknown or not given for file object,
+                        or band_height, mode or background is invalid
+        """
+        recorder = _record("save")
+        if band_height <= 0:
+            raise ValueError("band_height must be positive")
+        format = _file_format(fp, format)
+        mode, fill = self.__prepare_encode(mode, background, recorder)
+        streaming = _is_streamable(format, mode, params)
+        self.__save(fp, self.__encode(format, mode, fill, band_height, params, streaming, recorder))
+
+    def save_streaming(
+        self,
+        fp: str | Path | IO[bytes],
+        format: str | None = None,
+        band_height: int = 256,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+    ):
+        """
+        Save image band by band without making whole image.
+        Only parts overlapping each band are drawn, so memory usage is bounded by band size.
+
+        Args:
+            fp (str | Path | IO[bytes]): file path or binary file object to write
+            format (str | None): "PNG" or "TIFF". default to None (decided by file extension)
+            band_height (int): height of band. default to 256
+            mode (str): "L", "LA", "RGB", "RGBA" or "auto". same as to_image. default to "RGBA"
+            background (float | tuple[float, ...] | str | None): same as to_image. default to None
+
+        Raises:
+            ValueError: raise if format or mode is not supported or image size is zero
+        """
+        recorder = _record("save_streaming")
+        if band_height <= 0:
+            raise ValueError("band_height must be positive")
+        format = _file_format(fp, format)
+        mode, fill = self.__prepare_encode(mode, background, recorder)
+        _check_stream_format(format, mode)
+        self.__save(fp, self.__encode(format, mode, fill, band_height, {}, True, recorder))
+
+    def iter_encoded(
+        self,
+        format: str,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+        band_height: int = 256,
+        chunk_size: int = 64 * 1024,
+        **params: Any,
+    ) -> Iterator[bytes]:
+        """
+        Render and encode image, and yield encoded bytes in chunks.
+        In band encoding same as save, chunks are yielded while encoding, so first bytes can be sent early.
+
+        Args:
+            format (str): format of Pillow
+            mode, background, band_height, **params: same as save
+            chunk_size (int): size of chunks. last one may be shorter. default to 64KiB
+
+        Returns:
+            Iterator[bytes]: encoded image in chunks
+
+        Raises:
+            ValueError: raise if format is unknown or band_height, chunk_size, mode or background is invalid
+        """
+        recorder = _record("iter_encoded")
+        if band_height <= 0 or chunk_size <= 0:
+            raise ValueError("band_height and chunk_size must be positive")
+        format = _file_format(None, format)
+        mode, fill = self.__prepare_encode(mode, background, recorder)
+        streaming = _is_streamable(format, mode, params)
+        return self.__iter_chunks(
+            self.__encode(format, mode, fill, band_height, params, streaming, recorder), chunk_size
+        )
+
+    def __prepare_encode(
+        self, mode: str, background: float | tuple[float, ...] | str | None, recorder: _Recorder
+    ) -> tuple[str, float | tuple[float, ...]]:
+        self.__get_index()
+        recorder.lap("index")
+        mode = self.__resolve_mode((0, 0, self.width, self.height), mode, background)
+        return mode, _fill_color(mode, background)
+
+    @staticmethod
+    def __save(fp: str | Path | IO[bytes], encode: Callable[[IO[bytes]], Iterator[None]]):
+        if isinstance(fp, (str, Path)):
+            try:
+                with open(fp, "wb") as file:
+                    for _ in encode(file):
+                        pass
+            except BaseException:
+                # broken file is not left.
+                Path(fp).unlink(missing_ok=True)
+                raise
+        else:
+            for _ in encode(fp):
+                pass
+
+    @staticmethod
+    def __iter_chunks(encode: Callable[[IO[bytes]], Iterator[None]], chunk_size: int) -> Iterator[bytes]:
+        buffer = io.BytesIO()
+        for _ in encode(buffer):
+            yield from _take_chunks(buffer, chunk_size)
+        yield from _take_chunks(buffer, chunk_size, last=True)
+
+    def __encode(
+        self,
+        format: str,
+        mode: str,
+        fill: float | tuple[float, ...],
+        band_height: int,
+        params: dict[str, Any],
+        streaming: bool,
+        recorder: _Recorder,
+    ) -> Callable[[IO[bytes]], Iterator[None]]:
+        """
+        Function encoding image into file object. It yields each time some bytes are written.
+        In band encoding, one band image is reused for all bands of same height.
+        """
+
+        def encode(fp: IO[bytes]) -> Iterator[None]:
+            if streaming:
+                encoder = _make_stream_encoder(format, fp, self.width, self.height, mode, band_height, **params)
+                image = None
+                decoded = _LastDecoded()
+                for top in range(0, self.height, band_height):
+                    band = (0, top, self.width, min(top + band_height, self.height))
+                    image = self.__draw_region(
+                        band, mode=mode, fill=fill, recorder=recorder, output=image, decoded=decoded
+                    )
+                    encoder.write(image)
+                    recorder.lap("encode")
+                    yield
+                encoder.close()
+            else:
+                image = self.__draw_region((0, 0, self.width, self.height), mode=mode, fill=fill, recorder=recorder)
+                image.save(fp, format, **params)
+            recorder.lap("encode")
+            recorder.finish(self.__tree.length)
+            yield
+
+        return encode
+
+    async def to_image_async(
+        self,
+        box: tuple[int, int, int, int] | None = None,
+        workers: int = 1,
+        cache: RenderCache | None = None,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+        scale: float | None = None,
+        max_size: tuple[int, int] | None = None,
+        pool: RenderPool | None = None,
+    ) -> Image.Image:
+        """
+        Same as to_image, but run in thread pool without blocking event loop.
+        Lazy images are read and decoded in the pool too.
+
+        Args:
+            box, workers, cache, mode, background, scale, max_size: same as to_image
+            pool (RenderPool | None): pool to run in. default to None (pool shared by whole process)
+
+        Returns:
+            Image.Image: image
+
+        Raises:
+            ValueError: same as to_image
+        """
+        if pool is None:
+            pool = _get_default_pool()
+        return await pool.run(self.to_image, box, workers, cache, mode, background, scale, max_size)
+
+    async def save_async(
+        self,
+        fp: str | Path | IO[bytes] | Any,
+        format: str | None = None,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+        pool: RenderPool | None = None,
+        **params: Any,
+    ):
+        """
+        Render and save image in thread pool without blocking event loop.
+        fp can be async stream such as asyncio.StreamWriter. Then encoded image is written and drained in event loop.
+
+        Args:
+            fp (str | Path | IO[bytes] | Any): file path, binary file object
+                                               or async stream whose write is coroutine or which has drain
+            format (str | None): format of Pillow. default to None (decided by file extension)
+            mode (str): same as to_image. default to "RGBA"
+            background (float | tuple[float, ...] | str | None): same as to_image. default to None
+            pool (RenderPool | None): pool to run in. default to None (pool shared by whole process)
+            **params: same as save
+
+        Raises:
+            ValueError: raise if format is not given for file object, or mode or background is invalid
+        """
+        if format is None and not isinstance(fp, (str, Path)):
+            raise ValueError("format is required for file object")
+        if pool is None:
+            pool = _get_default_pool()
+
+        if not _is_async_stream(fp):
+            await pool.run(self.save, fp, format, mode, background, **params)
+            return
+
+        # chunks are encoded in pool one by one, and drain waits until client receives them.
+        chunks = await pool.run(self.iter_encoded, format, mode, background, **params)
+        while (chunk := await pool.run(next, chunks, None)) is not None:
+            written = fp.write(chunk)
+            if inspect.isawaitable(written):
+                await written
+            drain = getattr(fp, "drain", None)
+            if drain is not None:
+                await drain()
+
+
+def _adapt(images: Iterable[Image.Image | Figure]) -> list[Figure]:
+    """
+    Wrap images by ImageAdapter. Same image shares one adapter.
+    """
+    adapters: dict[int, ImageAdapter] = {}
+    figures: list[Figure] = []
+    for image in images:
+        if isinstance(image, Image.Image):
+            adapter = adapters.get(id(image))
+            if adapter is None:
+                adapter = adapters[id(image)] = ImageAdapter(image)
+            image = adapter
+        figures.append(image)
+    return figures
+
+
+def _file_format(fp: str | Path | IO[bytes] | None, format: str | None) -> str:
+    """
+    Format given or decided by file extension.
+    """
+    if format is None:
+        if not isinstance(fp, (str, Path)):
+            raise ValueError("format is required for file object")
+        format = Image.registered_extensions().get(Path(fp).suffix.lower())
+        if format is None:
+            raise ValueError(f"format of {fp} is unknown")
+
+    Image.init()
+    if format.upper() not in Image.SAVE and format.upper() not in _STREAM_FORMATS:
+        raise ValueError(f"format {format} is not supported")
+    return format
+
+
+def _is_async_stream(fp: Any) -> bool:
+    """
+    True if fp is written in event loop.
+    """
+    return hasattr(fp, "drain") or inspect.iscoroutinefunction(getattr(fp, "write", None))
+
+
+def _array_shape(width: int, height: int, mode: str) -> tuple[int, ...]:
+    channels = _ARRAY_CHANNELS[mode]
+    return (height, width) if channels == 1 else (height, width, channels)
@@ -0,0 +1,290 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+import json
+import struct
+import sys
+from array import array
+from typing import Callable, Hashable, Sequence
+
+from PIL import Image
+
+from .base.adapter import ImageAdapter
+from .base.conversion import _convert_repeated
+from .base.figure import Figure
+from .base.lazy_image import LazyImage
+from .base.render_plan import _background_mode, _choose_mode, _fill_color
+from .base.vector import Vector
+
+_MAGIC = b"IJPL"
+_VERSION = 1
+# magic, version, width, height, number of parts, byte length of source ids
+_HEADER = struct.Struct("<4sHIIII")
+_FIELDS = ("sources", "x", "y", "widths", "heights")
+
+
+class LayoutPlan(object):
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        source_ids: Sequence[Hashable],
+        sources: Sequence[int],
+        x: Sequence[int],
+        y: Sequence[int],
+        widths: Sequence[int],
+        heights: Sequence[int],
+    ) -> None:
+        """
+        Compiled layout which is rendered without building layout.
+        Made by ImageJointer.compile. Parts are stored as arrays in drawing order.
+
+        Args:
+            width (int): width of image
+            height (int): height of image
+            source_ids (Sequence[Hashable]): id of each source. str, int or tuple of them to serialize
+            sources (Sequence[int]): index of source id of each part
+            x (Sequence[int]): x of each part
+            y (Sequence[int]): y of each part
+            widths (Sequence[int]): width of each part
+            heights (Sequence[int]): height of each part
+
+        Raises:
+            ValueError: raise if length of arrays are different
+        """
+        self.__width = width
+        self.__height = height
+        # id of tuple is loaded from JSON as list.
+        self.__source_ids = tuple(
+            tuple(source_id) if isinstance(source_id, list) else source_id for source_id in source_ids
+        )
+        self.__sources = _int_array(sources)
+        self.__x = _int_array(x)
+        self.__y = _int_array(y)
+        self.__widths = _int_array(widths)
+        self.__heights = _int_array(heights)
+
+        if not len(self.__sources) == len(self.__x) == len(self.__y) == len(self.__widths) == len(self.__heights):
+            raise ValueError("length of arrays must be same")
+
+    @property
+    def width(self) -> int:
+        return self.__width
+
+    @property
+    def height(self) -> int:
+        return self.__height
+
+    @property
+    def source_ids(self) -> tuple[Hashable, ...]:
+        return self.__source_ids
+
+    @property
+    def sources(self) -> array:
+        return self.__sources
+
+    @property
+    def x(self) -> array:
+        return self.__x
+
+    @property
+    def y(self) -> array:
+        return self.__y
+
+    @property
+    def widths(self) -> array:
+        return self.__widths
+
+    @property
+    def heights(self) -> array:
+        return self.__heights
+
+    def __len__(self) -> int:
+        return len(self.__sources)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, LayoutPlan):
+            return NotImplemented
+        return self.__fields() == other.__fields()
+
+    def __fields(self) -> tuple:
+        return (self.__width, self.__height, self.__source_ids, *(getattr(self, field) for field in _FIELDS))
+
+    def to_json(self) -> str:
+        """
+        Serialize to JSON.
+        """
+        data = {"version": _VERSION, "width": self.__width, "height": self.__height, "source_ids": self.__source_ids}
+        data.update((field, getattr(self, field).tolist()) for field in _FIELDS)
+        return json.dumps(data, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str | bytes) -> LayoutPlan:
+        """
+        Deserialize from JSON made by to_json.
+
+        Raises:
+            ValueError: raise if text is not plan
+        """
+        data = json.loads(text)
+        if not isinstance(data, dict) or data.get("version") != _VERSION:
+            raise ValueError("text is not layout plan")
+        return cls(data["width"], data["height"], data["source_ids"], *(data[field] for field in _FIELDS))
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize to compact binary. Arrays are stored as little endian int32.
+        """
+        ids = json.dumps(self.__source_ids, separators=(",", ":")).encode()
+        header = _HEADER.pack(_MAGIC, _VERSION, self.__width, self.__height, len(self), len(ids))
+        chunks = [header, ids]
+        for field in _FIELDS:
+            values = getattr(self, field)
+            if sys.byteorder == "big":
+                values = array("i", values)
+                values.byteswap()
+            chunks.append(values.tobytes())
+        return b"".join(chunks)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> LayoutPlan:
+        """
+        Deserialize from binary made by to_bytes. Arrays are loaded without parsing each part.
+
+        Raises:
+            ValueError: raise if data is not plan
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("data is not layout plan")
+        magic, version, width, height, count, ids_size = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("data is not layout plan")
+        item_size = array("i").itemsize
+        if len(data) != _HEADER.size + ids_size + len(_FIELDS) * count * item_size:
+            raise ValueError("size of data is invalid")
+
+        view = memoryview(data)
+        offset = _HEADER.size + ids_size
+        fields = []
+        for _ in _FIELDS:
+            values = array("i")
+            values.frombytes(view[offset : offset + count * item_size])
+            if sys.byteorder == "big":
+                values.byteswap()
+            fields.append(values)
+            offset += count * item_size
+
+        source_ids = json.loads(data[_HEADER.size : _HEADER.size + ids_size])
+        return cls(width, height, source_ids, *fields)
+
+    def to_image(
+        self,
+        resolver: Callable[[Hashable], Image.Image | Figure] | None = None,
+        box: tuple[int, int, int, int] | None = None,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+    ) -> Image.Image:
+        """
+        Make image from plan. Only sources of parts in box are resolved and each of them is resolved once.
+
+        Args:
+            resolver (Callable[[Hashable], Image.Image | Figure] | None): function giving source from source id.
+                                                                         default to None (LazyImage of path and size)
+            box (tuple[int, int, int, int] | None): same as ImageJointer.to_image. default to None (whole image)
+            mode (str): same as ImageJointer.to_image. "auto" keeps color and alpha of background too.
+                        default to "RGBA"
+            background (float | tuple[float, ...] | str | None): same as ImageJointer.to_image. default to None
+
+        Returns:
+            Image.Image: image
+
+        Raises:
+            ValueError: raise if box, mode, background or index of source is invalid
+                        or size of resolved source is different
+        """
+        if resolver is None:
+            resolver = _default_resolver
+        if box is None:
+            box = (0, 0, self.__width, self.__height)
+        left, top, right, bottom = box
+        if right < left or bottom < top:
+            raise ValueError("box is invalid")
+
+        drawn = [
+            i
+            for i, (x, y, width, height) in enumerate(zip(self.__x, self.__y, self.__widths, self.__heights))
+            if x < right and left < x + width and y < bottom and top < y + height
+        ]
+
+        figures: dict[int, Figure] = {}
+        for i in drawn:
+            source = self.__sources[i]
+            if not 0 <= source < len(self.__source_ids):
+                raise ValueError("index of source is out of range")
+            if source not in figures:
+                figures[source] = _as_figure(resolver(self.__source_ids[source]))
+            figure = figures[source]
+            if (figure.width, figure.height) != (self.__widths[i], self.__heights[i]):
+                raise ValueError(f"size of source {self.__source_ids[source]} is different from plan")
+
+        if mode == "auto":
+            # plan does not know if parts cover box, so pixels of background are expected to be left.
+            modes = [figure._mode for figure in figures.values()]
+            mode = _choose_mode([*modes, _background_mode(background)])
+
+        sources = [figures[self.__sources[i]] for i in drawn]
+        converted, _ = _convert_repeated(sources, range(len(sources)), mode)
+
+        output = Image.new(mode, (right - left, bottom - top), _fill_color(mode, background))
+        for n, i in enumerate(drawn):
+            x, y = self.__x[i], self.__y[i]
+            converted.get(n, sources[n])._draw_region(
+                output, Vector(x - left, y - top), (left - x, top - y, right - x, bottom - y)
+            )
+        return output
+
+
+def _int_array(values: Sequence[int]) -> array:
+    if isinstance(values, array) and values.typecode == "i":
+        return values
+    return array("i", values)
+
+
+def _as_figure(source: Image.Image | Figure) -> Figure:
+    match source:
+        case Image.Image():
+            return ImageAdapter(source)
+        case Figure():
+            return source
+        case _:
+            raise ValueError("resolved source is invalid type")
+
+
+def _default_source_id(source: Image.Image | Figure) -> Hashable:
+    """
+    Path of LazyImage or file name of Image opened from file.
+    LazyImage drawn in other size than file has (path, width, height).
+    """
+    match source:
+        case LazyImage() if isinstance(source.fp, str) or hasattr(source.fp, "__fspath__"):
+            if (source.width, source.height) != source._file_size:
+                return (str(source.fp), source.width, source.height)
+            return str(source.fp)
+        case Image.Image() if getattr(source, "filename", ""):
+            return source.filename
+        case _:
+            raise ValueError(f"id of source {source} is unknown. give source_id")
+
+
+def _default_resolver(source_id: Hashable) -> LazyImage:
+    """
+    LazyImage from id made by _default_source_id.
+    """
+    match source_id:
+        case (str(path), int(width), int(height)):
+            return LazyImage(path, (width, height))
+        case _:
+            return LazyImage(source_id)
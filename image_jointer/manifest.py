@@ -0,0 +1,200 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+"""
+Manifest describing outputs and their layouts.
+
+    {
+        "defaults": {"mode": "RGB", "background": "white", "options": {"compress_level": 1}},
+        "outputs": {
+            "out/sheet.png": {
+                "joint": "DOWN_CENTER",
+                "items": [
+                    "title.png",
+                    {"blank": [0, 10]},
+                    {"joint": "RIGHT_CENTER", "items": ["a.png", {"image": "b.jpg", "size": [100, 50]}]}
+                ]
+            },
+            "out/small.jpg": {"layout": "a.png", "mode": "L", "options": {"quality": 80}}
+        }
+    }
+
+Layout is a path of image, {"image": path, "size": [width, height]}, {"blank": [width, height]}
+or {"joint": name of JointAlignment, "items": [layouts]}.
+Output is a layout or {"layout": layout} with "mode", "background", "format" and "options" overriding defaults.
+Relative paths are resolved from directory of manifest. TOML manifest has same structure.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .base.blank import Blank
+from .base.enums import JointAlignment
+from .base.figure import Figure
+from .base.lazy_image import LazyImage
+from .image_jointer import ImageJointer
+
+try:
+    import tomllib
+except ImportError:  # tomllib is available since Python 3.11
+    tomllib = None
+
+_SETTINGS = ("mode", "background", "format", "options")
+_DEFAULT_SETTINGS = {"mode": "RGBA", "background": None, "format": None, "options": {}}
+
+
+@dataclass(frozen=True)
+class _Output:
+    """
+    Output of manifest. Paths in layout are absolute.
+    """
+
+    path: Path
+    layout: Any
+    settings: dict[str, Any]
+
+    @property
+    def inputs(self) -> list[str]:
+        return sorted(set(_inputs(self.layout)))
+
+    def key(self) -> str:
+        """
+        Hash of layout, settings, and size and modification time of inputs.
+        Output is up to date if key is same as last build.
+        """
+        stats = {}
+        for path in self.inputs:
+            try:
+                stat = os.stat(path)
+                stats[path] = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                stats[path] = None
+        data = json.dumps({"layout": self.layout, "settings": self.settings, "inputs": stats}, sort_keys=True)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def build(self) -> ImageJointer:
+        return ImageJointer(_build(self.layout))
+
+
+def _load_manifest(path: str | Path) -> list[_Output]:
+    """
+    Read JSON or TOML manifest.
+
+    Raises:
+        ValueError: raise if manifest is invalid
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".toml":
+        if tomllib is None:
+            raise ValueError("TOML manifest requires Python 3.11 or later")
+        with open(path, "rb") as file:
+            data = tomllib.load(file)
+    else:
+        with open(path, "rb") as file:
+            data = json.load(file)
+
+    if not isinstance(data, dict) or not isinstance(data.get("outputs"), dict):
+        raise ValueError("manifest must have outputs")
+    defaults = _settings(data.get("defaults", {}), _DEFAULT_SETTINGS, "defaults")
+
+    root = path.resolve().parent
+    outputs = []
+    for name, value in data["outputs"].items():
+        if isinstance(value, dict) and "layout" in value:
+            settings = _settings({key: item for key, item in value.items() if key != "layout"}, defaults, name)
+            value = value["layout"]
+        else:
+            settings = defaults
+        outputs.append(_Output(root / name, _normalize(value, root, name), settings))
+    return outputs
+
+
+def _settings(value: Any, defaults: dict[str, Any], where: str) -> dict[str, Any]:
+    if not isinstance(value, dict) or any(key not in _SETTINGS for key in value):
+        raise ValueError(f"{where}: settings are invalid. keys are {', '.join(_SETTINGS)}")
+    if not isinstance(value.get("options", {}), dict):
+        raise ValueError(f"{where}: options must be table")
+    settings = dict(defaults)
+    settings.update(value)
+    if isinstance(settings["background"], list):
+        settings["background"] = tuple(settings["background"])
+    return settings
+
+
+def _normalize(node: Any, root: Path, where: str) -> Any:
+    """
+    Check layout and make paths absolute.
+    """
+    match node:
+        case str():
+            return str(root / node)
+        case {"image": str(path), **rest} if set(rest) <= {"size"}:
+            if "size" not in rest:
+                return str(root / path)
+            return {"image": str(root / path), "size": _size(rest["size"], where)}
+        case {"blank": size, **rest} if not rest:
+            return {"blank": _size(size, where, allow_zero=True)}
+        case {"joint": str(alignment), "items": list(items), **rest} if not rest:
+            if alignment.upper() not in JointAlignment.__members__:
+                raise ValueError(f"{where}: alignment {alignment} is invalid")
+            return {
+                "joint": alignment.upper(),
+                "items": [_normalize(item, root, f"{where}[{i}]") for i, item in enumerate(items)],
+            }
+        case _:
+            raise ValueError(f"{where}: layout {node!r} is invalid")
+
+
+def _size(value: Any, where: str, allow_zero: bool = False) -> list[int]:
+    minimum = 0 if allow_zero else 1
+    if not (isinstance(value, list) and len(value) == 2 and all(isinstance(item, int) for item in value)):
+        raise ValueError(f"{where}: size must be [width, height]")
+    if value[0] < minimum or value[1] < minimum:
+        raise ValueError(f"{where}: size {value} is invalid")
+    return list(value)
+
+
+def _inputs(node: Any):
+    match node:
+        case str():
+            yield node
+        case {"image": path}:
+            yield path
+        case {"image": path, "size": _}:
+            yield path
+        case {"joint": _, "items": items}:
+            for item in items:
+                yield from _inputs(item)
+
+
+def _build(node: Any) -> Figure:
+    match node:
+        case str():
+            return LazyImage(node)
+        case {"image": path, "size": size}:
+            return LazyImage(path, tuple(size))
+        case {"blank": size}:
+            return Blank(*size)
+        case {"joint": alignment, "items": items}:
+            return ImageJointer().joint(JointAlignment[alignment], *(_build(item) for item in items))
+        case _:
+            raise ValueError(f"layout {node!r} is invalid")
+
+
+def _source_id(source: LazyImage) -> tuple[str, int, int]:
+    """
+    Id of source in manifest. Size is kept because image may be resized.
+    """
+    return (str(source.fp), source.width, source.height)
+
+
+def _resolve_source(source_id: tuple[str, int, int]) -> LazyImage:
+    path, width, height = source_id
+    return LazyImage(path, (width, height))
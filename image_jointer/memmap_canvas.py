@@ -0,0 +1,62 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from .stream_encoder import _CHANNELS, _TiffEncoder
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+_MEMMAP_FORMATS = ("NPY", "RAW", "TIFF", "TIF")
+
+
+def _memmap_format(path: str | Path, format: str | None) -> str:
+    if format is None:
+        format = Path(path).suffix.lstrip(".")
+    if format.upper() not in _MEMMAP_FORMATS:
+        raise ValueError(f"format {format} is not supported")
+    return format.upper()
+
+
+def _open_memmap(path: str | Path, format: str, width: int, height: int, mode: str) -> np.memmap:
+    """
+    Create file and map its pixels. Pixels are not initialized.
+
+    Args:
+        path (str | Path): file path to create
+        format (str): "NPY", "RAW" or "TIFF"
+        width (int): width of image
+        height (int): height of image
+        mode (str): "L", "LA", "RGB" or "RGBA"
+
+    Returns:
+        np.memmap: writable uint8 array. shape is (height, width) for "L" and (height, width, channels) for others
+    """
+    if mode not in _CHANNELS:
+        raise ValueError(f"mode {mode} is not supported")
+    if width <= 0 or height <= 0:
+        raise ValueError("image size is zero")
+
+    channels = _CHANNELS[mode]
+    shape = (height, width) if channels == 1 else (height, width, channels)
+
+    match format:
+        case "NPY":
+            return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape)
+        case "RAW":
+            return np.memmap(path, dtype=np.uint8, mode="w+", shape=shape)
+        case "TIFF" | "TIF":
+            # strips are contiguous just after header, so pixels are mapped as one array.
+            with open(path, "wb") as file:
+                _TiffEncoder(file, width, height, mode, min(height, 256))
+                offset = file.tell()
+                file.truncate(offset + width * height * channels)
+            return np.memmap(path, dtype=np.uint8, mode="r+", offset=offset, shape=shape)
+        case _:
+            raise ValueError(f"format {format} is not supported")
@@ -0,0 +1,212 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+import heapq
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Sequence
+
+from PIL import Image
+
+from .base.adapter import _source_identity
+from .base.figure import Figure
+from .base.part import _PartColumns
+from .base.vector import Vector
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileRecord:
+    """
+    Measurement of one call.
+
+    operation: name of method. "joint", "to_image", "to_array", "render_to_memmap", "save", "save_streaming"
+               or "iter_encoded"
+    seconds: wall time of whole call
+    stages: seconds of each stage. stages are
+            "layout" (jointing), "index" (flattening layout and indexing parts), "plan" (finding visible parts),
+            "cache" (using RenderCache), "allocate" (making and clearing canvas),
+            "convert" (converting sources drawn more than once), "draw" (decoding and pasting parts)
+            and "encode" (writing file)
+    parts: number of parts in layout
+    drawn: number of parts drawn
+    conversions: number of sources converted into mode of canvas or decoded once for parts sharing them
+    reused: number of parts drawn from converted sources
+    bytes: bytes of pixel buffers allocated, including memory-mapped file
+    slowest: slowest drawn parts as (seconds, source, position). source is image or figure given by user.
+    """
+
+    operation: str
+    seconds: float
+    stages: dict[str, float]
+    parts: int
+    drawn: int
+    conversions: int
+    reused: int
+    bytes: int
+    slowest: tuple[tuple[float, Image.Image | Figure, Vector], ...]
+
+
+class Profiler(object):
+    def __init__(self, callback: Callable[[ProfileRecord], None] | None = None, slowest: int = 5) -> None:
+        """
+        Record time of each stage of joint and rendering while used in with block.
+        Calls in same thread (or asyncio task) as with block are recorded. Nothing is measured without profiler.
+
+            with Profiler(callback=send_metrics) as profiler:
+                image = layout.to_image()
+            print(profiler.records)
+
+        Args:
+            callback (Callable[[ProfileRecord], None] | None): called with record at end of each call.
+                                                                default to None
+            slowest (int): number of slowest parts kept in record. default to 5
+
+        Raises:
+            ValueError: raise if slowest is negative
+        """
+        if slowest < 0:
+            raise ValueError("slowest must not be negative")
+
+        self.__callback = callback
+        self.__slowest = slowest
+        self.__lock = Lock()
+        self.__records: list[ProfileRecord] = []
+        self.__tokens: list[Token[Profiler | None]] = []
+
+    @property
+    def records(self) -> list[ProfileRecord]:
+        with self.__lock:
+            return list(self.__records)
+
+    @property
+    def slowest(self) -> int:
+        return self.__slowest
+
+    def clear(self):
+        """
+        Remove all records.
+        """
+        with self.__lock:
+            self.__records.clear()
+
+    def __enter__(self) -> Profiler:
+        self.__tokens.append(_ACTIVE.set(self))
+        return self
+
+    def __exit__(self, *_):
+        _ACTIVE.reset(self.__tokens.pop())
+
+    def _add(self, record: ProfileRecord):
+        with self.__lock:
+            self.__records.append(record)
+        if self.__callback is not None:
+            self.__callback(record)
+
+
+_ACTIVE: ContextVar[Profiler | None] = ContextVar("image_jointer_profiler", default=None)
+
+
+class _Recorder(object):
+    """
+    Measurement of one call in progress. Stage time is time since previous lap.
+    Methods do nothing if disabled, so callers need not check if profiler is active.
+    """
+
+    __slots__ = (
+        "enabled",
+        "__profiler",
+        "__operation",
+        "__start",
+        "__last",
+        "__stages",
+        "__drawn",
+        "__conversions",
+        "__reused",
+        "__bytes",
+        "__timings",
+    )
+
+    def __init__(self, profiler: Profiler | None, operation: str) -> None:
+        self.enabled = profiler is not None
+        self.__profiler = profiler
+        self.__operation = operation
+        self.__stages: dict[str, float] = {}
+        self.__drawn = 0
+        self.__conversions = 0
+        self.__reused = 0
+        self.__bytes = 0
+        self.__timings: list[tuple[float, Figure, int, int]] = []
+        self.__start = self.__last = perf_counter() if profiler is not None else 0.0
+
+    def lap(self, stage: str):
+        if not self.enabled:
+            return
+        now = perf_counter()
+        self.__stages[stage] = self.__stages.get(stage, 0.0) + now - self.__last
+        self.__last = now
+
+    def allocated(self, size: int):
+        if self.enabled:
+            self.__bytes += size
+
+    def drew(self, count: int):
+        if self.enabled:
+            self.__drawn += count
+
+    def converted(self, conversions: int, reused: int):
+        if self.enabled:
+            self.__conversions += conversions
+            self.__reused += reused
+
+    def timed(
+        self, draw: Callable[[Sequence[tuple[int, object]]], None], parts: _PartColumns
+    ) -> Callable[[Sequence[tuple[int, object]]], None]:
+        """
+        Wrap function drawing (index of part, pieces) to measure each part.
+        """
+
+        def timed_draw(draws: Sequence[tuple[int, object]]):
+            for draw_item in draws:
+                start = perf_counter()
+                draw((draw_item,))
+                i = draw_item[0]
+                # list.append is atomic, so parts drawn in threads are recorded without lock.
+                self.__timings.append((perf_counter() - start, parts.sources[i], parts.x[i], parts.y[i]))
+
+        return timed_draw
+
+    def finish(self, parts: int):
+        if self.__profiler is None:
+            return
+        slowest = heapq.nlargest(self.__profiler.slowest, self.__timings, key=lambda timing: timing[0])
+        self.__profiler._add(
+            ProfileRecord(
+                self.__operation,
+                perf_counter() - self.__start,
+                self.__stages,
+                parts,
+                self.__drawn,
+                self.__conversions,
+                self.__reused,
+                self.__bytes,
+                tuple((seconds, _source_identity(source), Vector(x, y)) for seconds, source, x, y in slowest),
+            )
+        )
+
+
+_DISABLED = _Recorder(None, "")
+
+
+def _record(operation: str) -> _Recorder:
+    """
+    Start measuring call if profiler is active.
+    """
+    profiler = _ACTIVE.get()
+    if profiler is None:
+        return _DISABLED
+    return _Recorder(profiler, operation)
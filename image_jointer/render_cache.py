@@ -0,0 +1,131 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable
+
+from PIL import Image
+
+from .base.part_tree import _PartTree
+from .base.vector import Vector
+
+
+class RenderCache(object):
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_candidates: int = 4096) -> None:
+        """
+        Cache of rendered sub layouts shared among layouts.
+        A nested layout is rendered and stored when it is found second time,
+        and then it is pasted at once instead of drawing its parts.
+        Sub layouts are identified by layout structure and identity of sources.
+        So do not modify source images while using cache.
+
+        Args:
+            max_bytes (int): maximum total bytes of stored images. least recently used ones are evicted.
+                             default to 256MiB
+            max_candidates (int): number of sub layouts remembered to find second time. default to 4096
+
+        Raises:
+            ValueError: raise if max_bytes or max_candidates is negative
+        """
+        if max_bytes < 0 or max_candidates < 0:
+            raise ValueError("size of cache must not be negative")
+
+        self.__max_bytes = max_bytes
+        self.__max_candidates = max_candidates
+        self.__lock = Lock()
+        # key -> (sub layout, rendered image, position of image in sub layout)
+        self.__entries: OrderedDict[tuple[int, int, Hashable], tuple[_PartTree, Image.Image, Vector]] = OrderedDict()
+        # key -> sub layout found once. sub layout is kept so that its id is not reused.
+        self.__candidates: OrderedDict[tuple[int, int, Hashable], _PartTree] = OrderedDict()
+        self.__bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @property
+    def max_bytes(self) -> int:
+        return self.__max_bytes
+
+    @property
+    def bytes(self) -> int:
+        return self.__bytes
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def evictions(self) -> int:
+        return self.__evictions
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def clear(self):
+        """
+        Remove all stored images and reset counters.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__candidates.clear()
+            self.__bytes = 0
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+
+    @staticmethod
+    def __key(tree: _PartTree, variant: Hashable) -> tuple[int, int, Hashable]:
+        # shifted trees share parts and children, so they have same key.
+        return (id(tree.parts), id(tree.children), variant)
+
+    def _get(self, tree: _PartTree, variant: Hashable) -> tuple[Image.Image, Vector] | None:
+        """
+        Find rendered tree. variant is how tree is rendered such as mode.
+        """
+        key = self.__key(tree, variant)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            _, image, position = entry
+            return image, position
+
+    def _admit(self, tree: _PartTree, variant: Hashable) -> bool:
+        """
+        Return True if tree is found second time, and it should be rendered and stored.
+        """
+        key = self.__key(tree, variant)
+        with self.__lock:
+            if self.__candidates.pop(key, None) is not None:
+                return True
+            self.__candidates[key] = tree
+            while len(self.__candidates) > self.__max_candidates:
+                self.__candidates.popitem(last=False)
+            return False
+
+    def _put(self, tree: _PartTree, variant: Hashable, image: Image.Image, position: Vector):
+        size = image.width * image.height * len(image.getbands())
+        if size > self.__max_bytes:
+            return
+
+        key = self.__key(tree, variant)
+        with self.__lock:
+            if key in self.__entries:
+                return
+            self.__entries[key] = (tree, image, position)
+            self.__bytes += size
+            while self.__bytes > self.__max_bytes:
+                _, (_, evicted, _) = self.__entries.popitem(last=False)
+                self.__bytes -= evicted.width * evicted.height * len(evicted.getbands())
+                self.__evictions += 1
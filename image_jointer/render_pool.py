@@ -0,0 +1,125 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, TypeVar
+from weakref import WeakKeyDictionary
+
+_T = TypeVar("_T")
+
+
+class RenderPool(object):
+    def __init__(self, max_workers: int | None = None, max_pending: int | None = None) -> None:
+        """
+        Bounded thread pool running renders for asyncio.
+        Decoding, pasting and encoding in Pillow release GIL, so renders in threads run in parallel
+        without blocking event loop. Renders more than max_pending wait in await instead of piling up in queue.
+
+        Args:
+            max_workers (int | None): number of threads. default to None (number of CPUs)
+            max_pending (int | None): number of renders submitted to threads at once in each event loop.
+                                      default to None (same as max_workers)
+
+        Raises:
+            ValueError: raise if max_workers or max_pending is not positive
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_pending is None:
+            max_pending = max_workers
+        if max_workers <= 0 or max_pending <= 0:
+            raise ValueError("size of pool must be positive")
+
+        self.__max_workers = max_workers
+        self.__max_pending = max_pending
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__lock = Lock()
+        self.__semaphores: WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = WeakKeyDictionary()
+
+    @property
+    def max_workers(self) -> int:
+        return self.__max_workers
+
+    @property
+    def max_pending(self) -> int:
+        return self.__max_pending
+
+    def __get_executor(self) -> ThreadPoolExecutor:
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(self.__max_workers, thread_name_prefix="image_jointer")
+            return self.__executor
+
+    def __get_semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        # asyncio.Semaphore works only in one event loop.
+        with self.__lock:
+            semaphore = self.__semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self.__semaphores[loop] = asyncio.Semaphore(self.__max_pending)
+            return semaphore
+
+    async def run(self, function: Callable[..., _T], /, *args: Any, **kwargs: Any) -> _T:
+        """
+        Call function in thread and wait result. Context variables such as active Profiler are passed to thread.
+
+        Args:
+            function (Callable[..., T]): function to call
+            *args, **kwargs: arguments of function
+
+        Returns:
+            T: return value of function
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self.__get_semaphore(loop)
+        await semaphore.acquire()
+        try:
+            context = contextvars.copy_context()
+            future = self.__get_executor().submit(functools.partial(context.run, function, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+
+        # slot is released when thread finishes even if awaiting task is cancelled.
+        def release(_: Future):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:  # event loop is closed
+                pass
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop threads. Pool can be used again and new threads are started.
+
+        Args:
+            wait (bool): wait until running renders finish. default to True
+        """
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+        if executor is not None:
+            executor.shutdown(wait)
+
+
+_default_pool: RenderPool | None = None
+_default_pool_lock = Lock()
+
+
+def _get_default_pool() -> RenderPool:
+    """
+    Pool shared by all async renders without pool.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = RenderPool()
+        return _default_pool
@@ -0,0 +1,273 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+from __future__ import annotations
+
+import io
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from itertools import accumulate
+from typing import IO
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+_CHANNELS = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4}
+_STREAM_FORMATS = ("PNG", "TIFF", "TIF")
+# options of Pillow encoder which band encoders support.
+_STREAM_PARAMS = {"PNG": ("compress_level",), "TIFF": (), "TIF": ()}
+
+
+class _StreamEncoder(ABC):
+    """
+    Encode image from top to bottom band by band.
+    Whole image is never held in memory.
+    """
+
+    def __init__(self, fp: IO[bytes], width: int, height: int, mode: str) -> None:
+        if mode not in _CHANNELS:
+            raise ValueError(f"mode {mode} is not supported")
+        if width <= 0 or height <= 0:
+            raise ValueError("image size is zero")
+
+        self._fp = fp
+        self._width = width
+        self._height = height
+        self._mode = mode
+        self._channels = _CHANNELS[mode]
+
+    @abstractmethod
+    def write(self, band: Image.Image):
+        """
+        Write next band. Band width must be same as image width.
+        """
+        ...
+
+    @abstractmethod
+    def close(self):
+        """
+        Write trailer. File object is not closed.
+        """
+        ...
+
+
+class _PngEncoder(_StreamEncoder):
+    """
+    PNG compressed by zlib as one stream over all bands.
+    With NumPy, filter of each row is chosen by minimum sum of absolute differences same as libpng.
+    """
+
+    __COLOR_TYPE = {"L": 0, "LA": 4, "RGB": 2, "RGBA": 6}
+
+    def __init__(self, fp: IO[bytes], width: int, height: int, mode: str, compress_level: int = 6) -> None:
+        super().__init__(fp, width, height, mode)
+        self.__compressor = zlib.compressobj(compress_level)
+        # reused for all bands and released at close, so nothing is kept after saving.
+        self.__scanlines: bytearray | None = None
+        # last row of previous band, which first row of next band is filtered with.
+        self.__previous: bytes | None = None
+
+        self._fp.write(b"\x89PNG\r\n\x1a\n")
+        self.__write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, self.__COLOR_TYPE[mode], 0, 0, 0))
+
+    def __write_chunk(self, chunk_type: bytes, data: bytes):
+        self._fp.write(struct.pack(">I", len(data)))
+        self._fp.write(chunk_type)
+        self._fp.write(data)
+        self._fp.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+
+    def write(self, band: Image.Image):
+        raw = band.tobytes()
+        stride = self._width * self._channels
+        rows = len(raw) // stride
+        size = rows * (stride + 1)
+
+        if self.__scanlines is None or len(self.__scanlines) < size:
+            self.__scanlines = bytearray(size)
+        scanlines = self.__scanlines
+        if np is None:
+            # every scanline starts with filter type 0 (None).
+            scanlines[0 : size : stride + 1] = bytes(rows)
+            with memoryview(raw) as view:
+                for row in range(rows):
+                    start = row * (stride + 1) + 1
+                    scanlines[start : start + stride] = view[row * stride : (row + 1) * stride]
+        else:
+            output = np.frombuffer(scanlines, np.uint8, size).reshape(rows, stride + 1)
+            self.__filter(np.frombuffer(raw, np.uint8).reshape(rows, stride), output)
+        self.__previous = raw[-stride:]
+
+        with memoryview(scanlines) as view:
+            compressed = self.__compressor.compress(view[:size])
+        if compressed:
+            self.__write_chunk(b"IDAT", compressed)
+
+    def __filter(self, raw: np.ndarray, output: np.ndarray):
+        """
+        Filter rows into output. First byte of each row in output is filter type.
+        """
+        channels = self._channels
+        above = np.empty_like(raw)
+        above[0] = 0 if self.__previous is None else np.frombuffer(self.__previous, np.uint8)
+        above[1:] = raw[:-1]
+
+        # neighbors of each byte in int16, so predictors are computed without overflow.
+        current = raw.astype(np.int16)
+        up = above.astype(np.int16)
+        left = np.zeros_like(current)
+        left[:, channels:] = current[:, :-channels]
+        upper_left = np.zeros_like(current)
+        upper_left[:, channels:] = up[:, :-channels]
+
+        # Paeth predictor.
+        distance_left = np.abs(up - upper_left)
+        distance_up = np.abs(left - upper_left)
+        distance_upper_left = np.abs(left + up - 2 * upper_left)
+        paeth = np.where(
+            (distance_left <= distance_up) & (distance_left <= distance_upper_left),
+            left,
+            np.where(distance_up <= distance_upper_left, up, upper_left),
+        )
+
+        # filter types 0 (None), 1 (Sub), 2 (Up), 3 (Average) and 4 (Paeth).
+        filtered = np.stack(
+            [current, current - left, current - up, current - ((left + up) >> 1), current - paeth]
+        ).astype(np.uint8)
+        costs = np.abs(filtered.view(np.int8).astype(np.int32)).sum(axis=2)
+        chosen = costs.argmin(axis=0)
+
+        output[:, 0] = chosen
+        output[:, 1:] = filtered[chosen, np.arange(len(raw))]
+
+    def close(self):
+        self.__scanlines = None
+        self.__previous = None
+        self.__write_chunk(b"IDAT", self.__compressor.flush())
+        self.__write_chunk(b"IEND", b"")
+
+
+class _TiffEncoder(_StreamEncoder):
+    """
+    Baseline uncompressed TIFF. Each band is written as one strip.
+    Strip sizes are known in advance, so header is written first.
+    """
+
+    __SHORT = 3
+    __LONG = 4
+
+    def __init__(self, fp: IO[bytes], width: int, height: int, mode: str, rows_per_strip: int) -> None:
+        super().__init__(fp, width, height, mode)
+
+        stride = width * self._channels
+        strip_count = (height + rows_per_strip - 1) // rows_per_strip
+        byte_counts = [min(rows_per_strip, height - i * rows_per_strip) * stride for i in range(strip_count)]
+        if stride * height >= 2**32 - 2**16:
+            raise ValueError("image is too large for TIFF")
+
+        has_alpha = mode in ("LA", "RGBA")
+        entries = [
+            (256, self.__LONG, [width]),  # ImageWidth
+            (257, self.__LONG, [height]),  # ImageLength
+            (258, self.__SHORT, [8] * self._channels),  # BitsPerSample
+            (259, self.__SHORT, [1]),  # Compression: none
+            (262, self.__SHORT, [2 if mode in ("RGB", "RGBA") else 1]),  # PhotometricInterpretation
+            (273, self.__LONG, [0] * strip_count),  # StripOffsets, fixed below
+            (277, self.__SHORT, [self._channels]),  # SamplesPerPixel
+            (278, self.__LONG, [rows_per_strip]),  # RowsPerStrip
+            (279, self.__LONG, byte_counts),  # StripByteCounts
+            (284, self.__SHORT, [1]),  # PlanarConfiguration: chunky
+        ]
+        if has_alpha:
+            entries.append((338, self.__SHORT, [2]))  # ExtraSamples: unassociated alpha
+
+        ifd_size = 2 + 12 * len(entries) + 4
+        extra_size = sum(
+            self.__value_size(kind, values) for _, kind, values in entries if not self.__is_inline(kind, values)
+        )
+        data_offset = 8 + ifd_size + extra_size
+        strip_offsets = list(accumulate(byte_counts[:-1], initial=data_offset))
+        entries[5] = (273, self.__LONG, strip_offsets)
+
+        header = bytearray(b"II*\x00" + struct.pack("<I", 8))
+        extra = bytearray()
+        header += struct.pack("<H", len(entries))
+        for tag, kind, values in entries:
+            packed = self.__pack(kind, values)
+            if self.__is_inline(kind, values):
+                header += struct.pack("<HHI", tag, kind, len(values)) + packed.ljust(4, b"\x00")
+            else:
+                header += struct.pack("<HHII", tag, kind, len(values), 8 + ifd_size + len(extra))
+                extra += packed
+        header += struct.pack("<I", 0)
+        self._fp.write(bytes(header + extra))
+
+    @classmethod
+    def __value_size(cls, kind: int, values: list[int]) -> int:
+        return (2 if kind == cls.__SHORT else 4) * len(values)
+
+    @classmethod
+    def __is_inline(cls, kind: int, values: list[int]) -> bool:
+        return cls.__value_size(kind, values) <= 4
+
+    @classmethod
+    def __pack(cls, kind: int, values: list[int]) -> bytes:
+        return struct.pack(f"<{len(values)}{'H' if kind == cls.__SHORT else 'I'}", *values)
+
+    def write(self, band: Image.Image):
+        self._fp.write(band.tobytes())
+
+    def close(self):
+        pass
+
+
+def _make_stream_encoder(
+    format: str, fp: IO[bytes], width: int, height: int, mode: str, band_height: int, compress_level: int = 6
+) -> _StreamEncoder:
+    match format.upper():
+        case "PNG":
+            return _PngEncoder(fp, width, height, mode, compress_level)
+        case "TIFF" | "TIF":
+            return _TiffEncoder(fp, width, height, mode, band_height)
+        case _:
+            raise ValueError(f"format {format} is not supported")
+
+
+def _check_stream_format(format: str, mode: str):
+    if format.upper() not in _STREAM_FORMATS:
+        raise ValueError(f"format {format} is not supported")
+    if mode not in _CHANNELS:
+        raise ValueError(f"mode {mode} is not supported")
+
+
+def _is_streamable(format: str, mode: str, params: dict[str, object]) -> bool:
+    """
+    True if image can be encoded band by band.
+    PNG is encoded by Pillow without NumPy, because rows are not filtered and file is several times larger.
+    """
+    supported = _STREAM_PARAMS.get(format.upper())
+    if format.upper() == "PNG" and np is None:
+        return False
+    return supported is not None and mode in _CHANNELS and all(key in supported for key in params)
+
+
+def _take_chunks(buffer: io.BytesIO, chunk_size: int, last: bool = False) -> list[bytes]:
+    """
+    Take bytes written in buffer as chunks of chunk_size. Rest shorter than chunk_size is left unless last.
+    """
+    size = buffer.tell()
+    end = size if last else size - size % chunk_size
+    if end == 0:
+        return []
+    with buffer.getbuffer() as view:
+        chunks = [bytes(view[i : min(i + chunk_size, end)]) for i in range(0, end, chunk_size)]
+        rest = bytes(view[end:size])
+    buffer.seek(0)
+    buffer.truncate()
+    buffer.write(rest)
+    return chunks
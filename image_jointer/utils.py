@@ -4,12 +4,38 @@
 
 from __future__ import annotations
 
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterable, Iterator, Mapping
+
 from PIL import Image
 
-from .base.blank import Blank
-from .base.enums import JointAlignment, PositionAlignment
+from .base.batch_layout import _align
+from .batch_render import RenderResult, _render_many
+from .base.enums import PositionAlignment
 from .base.figure import Figure
-from .image_jointer import ImageJointer
+from .base.shelf_pack import pack_shelves
+from .base.vector import Vector
+from .image_jointer import _ARRAY_CHANNELS, ImageJointer, _array_shape
+from .layout_plan import LayoutPlan
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+# (horizontal, vertical) alignment of each position
+_POSITION_RULE = {
+    PositionAlignment.TOP_LEFT: ("start", "start"),
+    PositionAlignment.TOP_CENTER: ("center", "start"),
+    PositionAlignment.TOP_RIGHT: ("end", "start"),
+    PositionAlignment.CENTER_LEFT: ("start", "center"),
+    PositionAlignment.CENTER_CENTER: ("center", "center"),
+    PositionAlignment.CENTER_RIGHT: ("end", "center"),
+    PositionAlignment.BOTTOM_LEFT: ("start", "end"),
+    PositionAlignment.BOTTOM_CENTER: ("center", "end"),
+    PositionAlignment.BOTTOM_RIGHT: ("end", "end"),
+}
 
 
 class Utility(object):
@@ -34,36 +60,191 @@ class Utility(object):
         width = max(element.width for element in images)
         height = max(element.height for element in images)
 
-        match align:
-            case PositionAlignment.TOP_LEFT:
-                height_align = JointAlignment.RIGHT_TOP
-                width_align = JointAlignment.DOWN_LEFT
-            case PositionAlignment.TOP_CENTER:
-                height_align = JointAlignment.RIGHT_TOP
-                width_align = JointAlignment.DOWN_CENTER
-            case PositionAlignment.TOP_RIGHT:
-                height_align = JointAlignment.RIGHT_TOP
-                width_align = JointAlignment.DOWN_RIGHT
-            case PositionAlignment.CENTER_LEFT:
-                height_align = JointAlignment.RIGHT_CENTER
-                width_align = JointAlignment.DOWN_LEFT
-            case PositionAlignment.CENTER_CENTER:
-                height_align = JointAlignment.RIGHT_CENTER
-                width_align = JointAlignment.DOWN_CENTER
-            case PositionAlignment.CENTER_RIGHT:
-                height_align = JointAlignment.RIGHT_CENTER
-                width_align = JointAlignment.DOWN_RIGHT
-            case PositionAlignment.BOTTOM_LEFT:
-                height_align = JointAlignment.RIGHT_BOTTOM
-                width_align = JointAlignment.DOWN_LEFT
-            case PositionAlignment.BOTTOM_CENTER:
-                height_align = JointAlignment.RIGHT_BOTTOM
-                width_align = JointAlignment.DOWN_CENTER
-            case PositionAlignment.BOTTOM_RIGHT:
-                height_align = JointAlignment.RIGHT_BOTTOM
-                width_align = JointAlignment.DOWN_RIGHT
+        rule = _POSITION_RULE.get(align)
+        if rule is None:
+            raise ValueError("alignment is invalid")
+        horizontal, vertical = rule
 
+        # place each image directly instead of jointing Blank.
         return tuple(
-            ImageJointer(Blank(0, height)).joint(height_align, element).joint(width_align, Blank(width, 0))
+            ImageJointer._arranged(
+                (
+                    (
+                        element,
+                        Vector(_align(horizontal, width, element.width), _align(vertical, height, element.height)),
+                    ),
+                ),
+                width,
+                height,
+            )
             for element in images
         )
+
+    @staticmethod
+    def grid(align: PositionAlignment, columns: int, *images: Image.Image | Figure) -> ImageJointer:
+        """
+        Arrange images in grid from left to right and top to bottom.
+        Width of each column is maximum width in the column, and height of each row is maximum height in the row.
+        All cells are placed directly in one pass.
+
+        Args:
+            align (PositionAlignment): how to align image in cell
+            columns (int): number of columns
+            *images (Image.Image | Figure): images to arrange. use Blank for empty cell
+
+        Returns:
+            ImageJointer: arranged image
+
+        Raises:
+            ValueError: raise if columns is not positive, alignment or image is invalid
+        """
+        if columns <= 0:
+            raise ValueError("columns must be positive")
+        if not all(isinstance(image, (Image.Image, Figure)) for image in images):
+            raise ValueError("Image is invalid type")
+        rule = _POSITION_RULE.get(align)
+        if rule is None:
+            raise ValueError("alignment is invalid")
+        horizontal, vertical = rule
+
+        widths = [image.width for image in images]
+        heights = [image.height for image in images]
+        column_widths = [max(widths[column::columns], default=0) for column in range(columns)]
+        row_heights = [max(heights[top : top + columns]) for top in range(0, len(images), columns)]
+        column_lefts = list(accumulate(column_widths, initial=0))
+        row_tops = list(accumulate(row_heights, initial=0))
+
+        placements = (
+            (
+                image,
+                Vector(
+                    column_lefts[i % columns] + _align(horizontal, column_widths[i % columns], widths[i]),
+                    row_tops[i // columns] + _align(vertical, row_heights[i // columns], heights[i]),
+                ),
+            )
+            for i, image in enumerate(images)
+        )
+        return ImageJointer._arranged(placements, column_lefts[-1], row_tops[-1])
+
+    @staticmethod
+    def pack(
+        images: Mapping[Hashable, Image.Image | Figure], max_width: int | None = None, padding: int = 0
+    ) -> tuple[ImageJointer, dict[Hashable, tuple[int, int, int, int]]]:
+        """
+        Pack images into compact area such as texture atlas.
+        Images are sorted by height and put into shelves from left to right.
+
+        Args:
+            images (Mapping[Hashable, Image.Image | Figure]): images with name
+            max_width (int | None): maximum width of packed image. default to None (about square)
+            padding (int): space between images. default to 0
+
+        Returns:
+            tuple[ImageJointer, dict[Hashable, tuple[int, int, int, int]]]:
+                packed image, and left, top, right, bottom of each image by name
+
+        Raises:
+            ValueError: raise if image is invalid, wider than max_width or padding is negative
+        """
+        if not all(isinstance(image, (Image.Image, Figure)) for image in images.values()):
+            raise ValueError("Image is invalid type")
+
+        names = list(images)
+        figures = list(images.values())
+        sizes = [(figure.width, figure.height) for figure in figures]
+        x_list, y_list, width, height = pack_shelves(sizes, max_width, padding)
+
+        packed = ImageJointer._arranged(
+            ((figure, Vector(x, y)) for figure, x, y in zip(figures, x_list, y_list)), width, height
+        )
+        boxes = {
+            name: (x, y, x + figure_width, y + figure_height)
+            for name, x, y, (figure_width, figure_height) in zip(names, x_list, y_list, sizes)
+        }
+        return packed, boxes
+
+    @staticmethod
+    def unify_image_size_to_array(
+        align: PositionAlignment,
+        *images: Image.Image | Figure,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Unify image size same as unify_image_size and draw them into one stacked array. numpy is required.
+
+        Args:
+            align (PositionAlignment): how to add padding
+            *images (Image.Image | Figure): images to unify
+            mode (str): "L", "LA", "RGB" or "RGBA". default to "RGBA"
+            background (float | tuple[float, ...] | str | None): color of padding. default to None (transparent black)
+            out (np.ndarray | None): uint8 array to draw into instead of new one. default to None
+
+        Returns:
+            np.ndarray: uint8 array. shape is (count, height, width) for "L"
+                        and (count, height, width, channels) for others
+
+        Raises:
+            ValueError: raise if mode, background or out is invalid
+            ImportError: raise if numpy is not installed
+        """
+        if np is None:
+            raise ImportError("unify_image_size_to_array requires numpy")
+        if mode not in _ARRAY_CHANNELS:
+            raise ValueError(f"mode {mode} is not supported")
+
+        unified = Utility.unify_image_size(align, *images)
+        shape = (len(unified), *_array_shape(unified[0].width, unified[0].height, mode))
+        if out is None:
+            out = np.empty(shape, np.uint8)
+        elif out.dtype != np.uint8 or out.shape != shape:
+            raise ValueError("out is not uint8 array of stacked image shape")
+
+        for element, array in zip(unified, out):
+            element.to_array(mode=mode, background=background, out=array)
+        return out
+
+    @staticmethod
+    def render_many(
+        layouts: Iterable[ImageJointer | LayoutPlan],
+        workers: int | None = None,
+        out: str | Path | Callable[[int], str | Path] | None = None,
+        format: str | None = None,
+        mode: str = "RGBA",
+        background: float | tuple[float, ...] | str | None = None,
+        resolver: Callable[[Hashable], Image.Image | Figure] | None = None,
+        source_id: Callable[[Image.Image | Figure], Hashable] | None = None,
+        progress: Callable[[int, int], None] | None = None,
+        **params: Any,
+    ) -> Iterator[RenderResult]:
+        """
+        Render many independent layouts in worker processes.
+        Each layout is sent as binary LayoutPlan, and workers load sources themselves by resolver.
+        Layouts are read from iterable as workers become free, so they can be made lazily.
+        Rendering starts when result is iterated, and results are yielded in completion order.
+        Exception of a layout is returned in its result and does not stop others.
+
+        Args:
+            layouts (Iterable[ImageJointer | LayoutPlan]): layouts to render. ImageJointer is compiled by source_id
+            workers (int | None): number of processes. default to None (number of CPUs)
+            out (str | Path | Callable[[int], str | Path] | None): directory to write "{index}.{format}",
+                or function giving file path from index of layout. default to None (images are returned)
+            format (str | None): format of Pillow. default to None (decided by file extension, or PNG in directory)
+            mode (str): same as ImageJointer.to_image. default to "RGBA"
+            background (float | tuple[float, ...] | str | None): same as ImageJointer.to_image. default to None
+            resolver (Callable[[Hashable], Image.Image | Figure] | None): same as LayoutPlan.to_image.
+                it must be picklable such as function defined at top level of module. default to None (LazyImage)
+            source_id (Callable[[Image.Image | Figure], Hashable] | None): same as ImageJointer.compile.
+                default to None
+            progress (Callable[[int, int], None] | None): called with number of completed and failed layouts
+                each time layout is completed. default to None
+            **params: options of Pillow encoder
+
+        Returns:
+            Iterator[RenderResult]: result of each layout in completion order
+
+        Raises:
+            ValueError: raise if workers is not positive
+        """
+        return _render_many(layouts, workers, out, format, mode, background, resolver, source_id, progress, params)
@@ -0,0 +1,94 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import pytest
+
+from assert_image import assert_image
+from test_render import make_mosaic, make_overlay
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("mode", ("L", "LA", "RGB", "RGBA"))
+@pytest.mark.parametrize("box", (None, (12, 17, 95, 140), (-30, -30, 50, 50)))
+def test_to_array(mode: str, box: tuple[int, int, int, int] | None):
+    mosaic = make_mosaic()
+
+    array = mosaic.to_array(box=box, mode=mode)
+    expected = np.asarray(mosaic.to_image(box=box, mode=mode))
+    assert array.dtype == np.uint8
+    assert array.shape == expected.shape
+    assert (array == expected).all()
+
+
+def test_to_array_sources(tmp_path):
+    from image_jointer import ImageJointer, JointAlignment, LazyImage
+    from PIL import Image
+
+    Image.new("RGB", (30, 20), (10, 200, 30)).save(tmp_path / "lazy.png")
+    palette = Image.new("P", (15, 25), 3)
+    overlay = make_overlay(Image.new("RGBA", (20, 20), (160, 95, 0, 128)), Image.new("L", (20, 20), 70))
+    jointed = ImageJointer().joint(
+        JointAlignment.RIGHT_TOP, LazyImage(tmp_path / "lazy.png"), palette, overlay, Image.new("1", (5, 5), 1)
+    )
+
+    for workers in (1, 3):
+        array = jointed.to_array(workers=workers, mode="auto", background="white")
+        assert (array == np.asarray(jointed.to_image(mode="auto", background="white"))).all()
+
+
+def test_to_array_invalid():
+    mosaic = make_mosaic()
+
+    with pytest.raises(ValueError):
+        mosaic.to_array(mode="CMYK")
+    with pytest.raises(ValueError):
+        mosaic.to_array(box=(10, 10, 5, 20))
+
+
+@pytest.mark.parametrize("suffix", ("npy", "raw", "tiff"))
+@pytest.mark.parametrize("mode", ("L", "RGB", "RGBA"))
+def test_render_to_memmap(tmp_path, suffix: str, mode: str):
+    from PIL import Image
+
+    mosaic = make_mosaic()
+    expected = np.asarray(mosaic.to_image(mode=mode))
+
+    path = tmp_path / f"mosaic.{suffix}"
+    array = mosaic.render_to_memmap(path, mode=mode)
+    assert (array == expected).all()
+    del array
+
+    match suffix:
+        case "npy":
+            assert (np.load(path) == expected).all()
+        case "raw":
+            assert (np.fromfile(path, np.uint8).reshape(expected.shape) == expected).all()
+        case "tiff":
+            assert_image(Image.open(path), mosaic.to_image(mode=mode))
+
+
+def test_render_to_memmap_fallback(tmp_path):
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    overlay = make_overlay(Image.new("RGBA", (20, 300), (160, 95, 0, 128)), Image.new("L", (20, 600), 70))
+    jointed = ImageJointer().joint(JointAlignment.DOWN_CENTER, make_mosaic(), overlay)
+
+    array = jointed.render_to_memmap(tmp_path / "jointed.npy", workers=2)
+    assert (array == np.asarray(jointed.to_image())).all()
+
+
+def test_render_to_memmap_invalid(tmp_path):
+    from image_jointer import ImageJointer
+
+    mosaic = make_mosaic()
+
+    with pytest.raises(ValueError):
+        mosaic.render_to_memmap(tmp_path / "mosaic.bmp")
+    with pytest.raises(ValueError):
+        mosaic.render_to_memmap(tmp_path / "mosaic.npy", mode="CMYK")
+    with pytest.raises(ValueError):
+        ImageJointer().render_to_memmap(tmp_path / "empty.npy")
+    assert not list(tmp_path.iterdir())
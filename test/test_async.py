@@ -0,0 +1,149 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+
+from assert_image import assert_image
+
+
+def make_layout():
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    return ImageJointer().joint(
+        JointAlignment.RIGHT_CENTER, *(Image.new("RGB", (20 + i, 10 + 3 * i), (30 * i, 0, 0)) for i in range(5))
+    )
+
+
+def test_to_image_async():
+    from image_jointer import RenderPool
+
+    layout = make_layout()
+
+    async def main():
+        pool = RenderPool(max_workers=2)
+        images = await asyncio.gather(
+            layout.to_image_async(),
+            layout.to_image_async(mode="RGB", pool=pool),
+            layout.to_image_async(box=(5, 5, 50, 20), pool=pool),
+            layout.to_image_async(scale=0.5, pool=pool),
+        )
+        pool.shutdown()
+        return images
+
+    image, rgb, region, preview = asyncio.run(main())
+    assert_image(image, layout.to_image())
+    assert_image(rgb, layout.to_image(mode="RGB"))
+    assert_image(region, layout.to_image(box=(5, 5, 50, 20)))
+    assert_image(preview, layout.to_image(scale=0.5))
+
+
+def test_to_image_async_error():
+    layout = make_layout()
+    with pytest.raises(ValueError):
+        asyncio.run(layout.to_image_async(workers=0))
+
+
+def test_render_pool_backpressure():
+    from image_jointer import RenderPool
+
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+
+    async def main():
+        pool = RenderPool(max_workers=4, max_pending=2)
+        await asyncio.gather(*(pool.run(work) for _ in range(10)))
+        pool.shutdown()
+
+    asyncio.run(main())
+    assert peak == 2
+
+    with pytest.raises(ValueError):
+        RenderPool(max_workers=0)
+
+
+def test_to_image_async_stream():
+    import sys
+
+    from image_jointer import ImageJointer, LazyImage, RenderPool
+    from PIL import Image
+
+    stream = io.BytesIO()
+    Image.effect_noise((400, 300), 60).convert("RGB").save(stream, "PNG")
+    layout = ImageJointer(LazyImage(stream))
+    expected = layout.to_image()
+
+    async def main():
+        pool = RenderPool(max_workers=8)
+        images = await asyncio.gather(*(layout.to_image_async(pool=pool) for _ in range(40)))
+        pool.shutdown()
+        return images
+
+    # switch threads often to make them read stream at once.
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        images = asyncio.run(main())
+    finally:
+        sys.setswitchinterval(switch_interval)
+    for image in images:
+        assert_image(image, expected)
+
+
+def test_save_async(tmp_path):
+    from PIL import Image
+
+    layout = make_layout()
+
+    class Stream:
+        def __init__(self):
+            self.data = b""
+            self.drained = False
+
+        def write(self, data: bytes):
+            self.data += data
+
+        async def drain(self):
+            self.drained = True
+
+    async def main():
+        stream = Stream()
+        buffer = io.BytesIO()
+        await layout.save_async(tmp_path / "layout.png")
+        await layout.save_async(buffer, "PNG", mode="RGB", compress_level=1)
+        await layout.save_async(stream, "TIFF")
+        return buffer, stream
+
+    buffer, stream = asyncio.run(main())
+    assert_image(Image.open(tmp_path / "layout.png"), layout.to_image())
+    assert_image(Image.open(buffer), layout.to_image(mode="RGB"))
+    assert stream.drained
+    assert_image(Image.open(io.BytesIO(stream.data)), layout.to_image())
+
+    with pytest.raises(ValueError):
+        asyncio.run(layout.save_async(io.BytesIO()))
+
+
+def test_async_profiler():
+    from image_jointer import Profiler
+
+    layout = make_layout()
+    with Profiler() as profiler:
+        asyncio.run(layout.to_image_async())
+    assert [record.operation for record in profiler.records] == ["to_image"]
@@ -0,0 +1,116 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import json
+import os
+import sys
+
+import pytest
+
+from assert_image import assert_image
+
+
+def make_sources(tmp_path):
+    from PIL import Image
+
+    for i, color in enumerate(((255, 0, 0), (0, 255, 0), (0, 0, 255))):
+        Image.new("RGB", (20 + 10 * i, 10 + 5 * i), color).save(tmp_path / f"{i}.png")
+
+
+def write_manifest(tmp_path):
+    manifest = {
+        "defaults": {"mode": "RGB", "background": "white"},
+        "outputs": {
+            "out/sheet.png": {
+                "joint": "down_center",
+                "items": [
+                    "0.png",
+                    {"blank": [0, 4]},
+                    {"joint": "RIGHT_CENTER", "items": ["1.png", {"image": "2.png", "size": [20, 10]}]},
+                ],
+            },
+            "out/single.jpg": {"layout": "1.png", "mode": "L", "options": {"quality": 95}},
+        },
+    }
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    return tmp_path / "manifest.json"
+
+
+def test_cli(tmp_path, capsys):
+    from image_jointer import Blank, ImageJointer, JointAlignment, LazyImage
+    from image_jointer.cli import main
+    from PIL import Image
+
+    make_sources(tmp_path)
+    manifest = write_manifest(tmp_path)
+
+    assert main([str(manifest), "--workers", "1"]) == 0
+    assert "2 built, 0 up to date, 0 failed" in capsys.readouterr().err
+
+    expected = ImageJointer().joint(
+        JointAlignment.DOWN_CENTER,
+        Image.open(tmp_path / "0.png"),
+        Blank(0, 4),
+        ImageJointer().joint(
+            JointAlignment.RIGHT_CENTER, Image.open(tmp_path / "1.png"), LazyImage(tmp_path / "2.png", (20, 10))
+        ),
+    )
+    assert_image(Image.open(tmp_path / "out" / "sheet.png"), expected.to_image(mode="RGB", background="white"))
+    assert Image.open(tmp_path / "out" / "single.jpg").mode == "L"
+
+    # nothing changed.
+    assert main([str(manifest), "--workers", "1"]) == 0
+    assert "0 built, 2 up to date, 0 failed" in capsys.readouterr().err
+
+    # only output using changed input is rendered.
+    stat = os.stat(tmp_path / "0.png")
+    os.utime(tmp_path / "0.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert main([str(manifest), "--workers", "1"]) == 0
+    captured = capsys.readouterr()
+    assert "sheet.png" in captured.out
+    assert "single.jpg" not in captured.out
+    assert "1 built, 1 up to date, 0 failed" in captured.err
+
+    # removed output is rendered again.
+    (tmp_path / "out" / "single.jpg").unlink()
+    assert main([str(manifest), "--workers", "1", "--quiet"]) == 0
+    assert "1 built, 1 up to date, 0 failed" in capsys.readouterr().err
+
+    assert main([str(manifest), "--workers", "1", "--force"]) == 0
+    assert "2 built, 0 up to date, 0 failed" in capsys.readouterr().err
+
+
+def test_cli_error(tmp_path, capsys):
+    from image_jointer.cli import main
+
+    make_sources(tmp_path)
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"outputs": {"a.png": "0.png", "b.png": "missing.png", "c.png": ["0.png"]}}))
+    assert main([str(manifest)]) == 2
+    assert "c.png" in capsys.readouterr().err
+
+    manifest.write_text(json.dumps({"outputs": {"a.png": "0.png", "b.png": "missing.png"}}))
+    assert main([str(manifest), "--workers", "1"]) == 1
+    assert "1 built, 0 up to date, 1 failed" in capsys.readouterr().err
+
+    # failed output is tried again.
+    assert main([str(manifest), "--workers", "1"]) == 1
+    assert "0 built, 1 up to date, 1 failed" in capsys.readouterr().err
+
+
+@pytest.mark.skipif(sys.version_info < (3, 11), reason="tomllib requires Python 3.11")
+def test_cli_toml(tmp_path):
+    from image_jointer.cli import main
+    from PIL import Image
+
+    make_sources(tmp_path)
+    (tmp_path / "manifest.toml").write_text(
+        """
+[outputs."row.png"]
+joint = "RIGHT_TOP"
+items = ["0.png", { blank = [5, 0] }, "1.png"]
+"""
+    )
+    assert main([str(tmp_path / "manifest.toml"), "--workers", "1"]) == 0
+    assert Image.open(tmp_path / "row.png").size == (20 + 5 + 30, 15)
@@ -103,3 +103,92 @@ def test_blank():
     expected_image = Image.open(IMAGE_FOLDER / "blank" / "Blank.png")
 
     assert_image(joint_img, expected_image)
+
+
+def test_joint_long_chain():
+    from image_jointer import JointAlignment, ImageJointer
+    from PIL import Image
+
+    red = Image.new("RGBA", (2, 3), (255, 0, 0))
+    green = Image.new("RGBA", (2, 5), (0, 255, 0))
+
+    jointed = ImageJointer()
+    for _ in range(2000):
+        jointed = jointed.joint(JointAlignment.RIGHT_CENTER, red, green)
+    branch = jointed.joint(JointAlignment.DOWN_LEFT, red)
+
+    assert (jointed.width, jointed.height) == (8000, 5)
+    assert (branch.width, branch.height) == (8000, 8)
+
+    expected_image = Image.new("RGBA", (8000, 5), (0, 0, 0, 0))
+    for i in range(2000):
+        expected_image.paste(red, (4 * i, 1))
+        expected_image.paste(green, (4 * i + 2, 0))
+
+    assert_image(jointed.to_image(), expected_image)
+
+
+def test_joint_long_chain_copy():
+    import copy
+    import pickle
+
+    from image_jointer import JointAlignment, ImageJointer
+    from PIL import Image
+
+    red = Image.new("RGBA", (2, 3), (255, 0, 0))
+    jointed = ImageJointer(red)
+    for _ in range(5000):
+        jointed = jointed.joint(JointAlignment.RIGHT_CENTER, red)
+    image = jointed.to_image()
+
+    for copied in (pickle.loads(pickle.dumps(jointed)), copy.deepcopy(jointed)):
+        assert (copied.width, copied.height) == (10002, 3)
+        assert_image(copied.to_image(), image)
+
+
+@pytest.mark.parametrize(
+    "alignment",
+    tuple(JointAlignment),
+)
+def test_joint_multiple_same_as_single(alignment: JointAlignment):
+    from image_jointer import ImageJointer, Blank
+    from PIL import Image
+
+    sizes = ((30, 70), (5, 3), (81, 13), (2, 99), (40, 40), (7, 100), (100, 7))
+    images = [Image.new("RGBA", size, (37 * i % 256, 255, 91 * i % 256)) for i, size in enumerate(sizes)]
+    images.insert(3, Blank(11, 121))
+    images.insert(5, ImageJointer(images[0]).joint(alignment, images[1]))
+    images *= 20
+
+    single = ImageJointer(Image.new("RGB", (15, 25), (0, 0, 255)))
+    for image in images:
+        single = single.joint(alignment, image)
+    multiple = ImageJointer(Image.new("RGB", (15, 25), (0, 0, 255))).joint(alignment, *images)
+
+    assert (multiple.width, multiple.height) == (single.width, single.height)
+    assert_image(multiple.to_image(), single.to_image())
+
+
+def test_joint_parts():
+    from image_jointer import Blank, ImageJointer, Vector
+    from image_jointer.base.part import _Part
+    from PIL import Image
+
+    red = Image.new("RGB", (10, 20), (255, 0, 0))
+    blue = Image.new("RGB", (30, 10), (0, 0, 255))
+
+    inner = ImageJointer(red).joint(JointAlignment.DOWN_CENTER, blue, red)
+    jointed = ImageJointer(blue).joint(JointAlignment.RIGHT_CENTER, Blank(5, 5), inner, red)
+
+    parts = list(jointed._paste(Vector(1, 2)))
+    assert [(part.source.image, part.position) for part in parts] == [
+        (blue, Vector(1, 22)),
+        (red, Vector(46, 2)),
+        (blue, Vector(36, 22)),
+        (red, Vector(46, 32)),
+        (red, Vector(66, 17)),
+    ]
+    assert all(isinstance(part, _Part) for part in parts)
+    assert hash(Vector(1, 2)) == hash(Vector(1, 2))
+    with pytest.raises(AttributeError):
+        Vector().x = 1
@@ -0,0 +1,94 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import pytest
+
+from assert_image import assert_image
+from test_render import make_mosaic
+
+
+def compile_mosaic():
+    mosaic = make_mosaic()
+    sources = {}
+
+    def source_id(source):
+        sources[id(source)] = source
+        return id(source)
+
+    return mosaic, mosaic.compile(source_id), sources.__getitem__
+
+
+def test_compile():
+    from image_jointer import LayoutPlan
+
+    mosaic, plan, resolver = compile_mosaic()
+
+    assert (plan.width, plan.height) == (mosaic.width, mosaic.height)
+    assert len(plan) == 48
+    assert len(plan.source_ids) == 48
+
+    assert LayoutPlan.from_json(plan.to_json()) == plan
+    assert LayoutPlan.from_bytes(plan.to_bytes()) == plan
+
+    for loaded in (plan, LayoutPlan.from_json(plan.to_json()), LayoutPlan.from_bytes(plan.to_bytes())):
+        assert_image(loaded.to_image(resolver), mosaic.to_image())
+        assert_image(loaded.to_image(resolver, box=(12, 17, 95, 140)), mosaic.to_image(box=(12, 17, 95, 140)))
+        assert_image(
+            loaded.to_image(resolver, mode="auto", background="white"),
+            mosaic.to_image(mode="auto", background="white"),
+        )
+
+
+def test_compile_lazy_image(tmp_path):
+    from image_jointer import ImageJointer, JointAlignment, LayoutPlan, LazyImage
+    from PIL import Image
+
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"{i}.png"))
+        Image.new("RGB", (10 + 5 * i, 20), (50 * i, 0, 0)).save(paths[-1])
+    opened = Image.open(paths[0])
+
+    jointed = ImageJointer().joint(
+        JointAlignment.RIGHT_CENTER, *(LazyImage(path) for path in paths), LazyImage(tmp_path / "1.png"), opened
+    )
+    plan = LayoutPlan.from_bytes(jointed.compile().to_bytes())
+
+    assert plan.source_ids == (paths[0], paths[1], paths[2])
+    assert list(plan.sources) == [0, 1, 2, 1, 0]
+    assert_image(plan.to_image(), jointed.to_image())
+
+    # size is kept in id of resized LazyImage.
+    resized = ImageJointer(LazyImage(paths[2], (20, 15))).joint(JointAlignment.RIGHT_TOP, LazyImage(paths[2]))
+    plan = LayoutPlan.from_json(resized.compile().to_json())
+    assert plan.source_ids == ((paths[2], 20, 15), paths[2])
+    assert LayoutPlan.from_bytes(plan.to_bytes()) == plan
+    assert_image(plan.to_image(), resized.to_image())
+
+    # joint of different heights is padded with Blank, which is not a source.
+    padded = ImageJointer(LazyImage(paths[0])).joint(JointAlignment.DOWN_CENTER, LazyImage(paths[2]))
+    padded = padded.joint(JointAlignment.RIGHT_CENTER, LazyImage(paths[1]))
+    assert_image(padded.compile().to_image(), padded.to_image())
+
+
+def test_compile_invalid():
+    from image_jointer import ImageJointer, JointAlignment, LayoutPlan
+    from PIL import Image
+
+    jointed = ImageJointer().joint(JointAlignment.RIGHT_CENTER, Image.new("RGB", (10, 10)), Image.new("RGB", (5, 5)))
+
+    with pytest.raises(ValueError):
+        jointed.compile()
+
+    plan = jointed.compile(lambda source: source.width)
+    with pytest.raises(ValueError):
+        plan.to_image(lambda source_id: Image.new("RGB", (source_id, source_id + 1)))
+    with pytest.raises(ValueError):
+        LayoutPlan.from_bytes(plan.to_bytes()[:-1])
+    with pytest.raises(ValueError):
+        LayoutPlan.from_json("[]")
+    with pytest.raises(ValueError):
+        LayoutPlan(10, 10, ["a"], [0], [0], [0, 1], [1], [1])
+    with pytest.raises(ValueError):
+        LayoutPlan(10, 10, ["a"], [1], [0], [0], [1], [1]).to_image(lambda source_id: Image.new("RGB", (1, 1)))
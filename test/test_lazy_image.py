@@ -0,0 +1,86 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import copy
+import io
+import pickle
+
+import pytest
+
+from assert_image import assert_image
+
+
+def make_gradient(width: int, height: int):
+    from PIL import Image
+
+    image = Image.new("RGB", (width, height))
+    image.putdata([(x * 255 // width, y * 255 // height, 128) for y in range(height) for x in range(width)])
+    return image
+
+
+@pytest.mark.parametrize("format", ("PNG", "JPEG"))
+def test_lazy_image(format: str, tmp_path):
+    from image_jointer import ImageJointer, JointAlignment, LazyImage
+    from PIL import Image
+
+    path = tmp_path / f"gradient.{format.lower()}"
+    make_gradient(120, 80).save(path, format=format)
+    stream = io.BytesIO(path.read_bytes())
+
+    from_path = LazyImage(path)
+    from_stream = LazyImage(stream)
+    assert (from_path.width, from_path.height) == (120, 80)
+    assert (from_stream.width, from_stream.height) == (120, 80)
+
+    jointed = ImageJointer(from_path).joint(JointAlignment.DOWN_CENTER, from_stream)
+    expected = ImageJointer(Image.open(path)).joint(JointAlignment.DOWN_CENTER, Image.open(path))
+
+    assert_image(jointed.to_image(), expected.to_image())
+    assert_image(jointed.to_image(box=(30, 50, 100, 120)), expected.to_image(box=(30, 50, 100, 120)))
+
+    for copied in (pickle.loads(pickle.dumps(jointed)), copy.deepcopy(jointed)):
+        assert_image(copied.to_image(), expected.to_image())
+
+
+def test_lazy_image_size(tmp_path):
+    from image_jointer import ImageJointer, LazyImage
+    from PIL import Image
+
+    path = tmp_path / "gradient.jpg"
+    make_gradient(400, 200).save(path)
+
+    lazy = LazyImage(path, size=(100, 50))
+    assert (lazy.width, lazy.height) == (100, 50)
+
+    expected = Image.open(path)
+    expected.draft(None, (100, 50))
+    expected = expected.resize((100, 50))
+
+    assert_image(ImageJointer(lazy).to_image(), ImageJointer(expected).to_image())
+
+    with pytest.raises(ValueError):
+        LazyImage(path, size=(0, 50))
+
+
+def test_lazy_image_decoded_once_in_bands(tmp_path, monkeypatch):
+    from image_jointer import ImageJointer, JointAlignment, LazyImage
+    from PIL import Image
+
+    make_gradient(60, 400).save(tmp_path / "tall.png")
+    make_gradient(40, 300).save(tmp_path / "short.png")
+    tall = LazyImage(tmp_path / "tall.png")
+    short = LazyImage(tmp_path / "short.png")
+    jointed = ImageJointer(tall).joint(JointAlignment.DOWN_LEFT, short)
+
+    loads = []
+    load = LazyImage._load
+    monkeypatch.setattr(LazyImage, "_load", lambda self: loads.append(self) or load(self))
+
+    stream = io.BytesIO()
+    jointed.save_streaming(stream, format="PNG", band_height=50)
+    stream.seek(0)
+
+    # each source spans several bands but is decoded once.
+    assert loads == [tall, short]
+    assert_image(Image.open(stream), jointed.to_image())
@@ -0,0 +1,145 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import pytest
+
+from assert_image import assert_image
+
+
+def make_layout():
+    from image_jointer import Blank, ImageJointer, JointAlignment
+    from PIL import Image
+
+    red = Image.new("RGB", (40, 30), (255, 0, 0))
+    large = Image.new("RGBA", (400, 300), (0, 0, 255, 255))
+    return red, large, ImageJointer(red).joint(JointAlignment.RIGHT_CENTER, Blank(5, 0), large)
+
+
+def test_profiler_joint_and_to_image():
+    from image_jointer import Profiler, Vector
+
+    records = []
+    with Profiler(callback=records.append, slowest=1) as profiler:
+        red, large, layout = make_layout()
+        image = layout.to_image()
+
+    assert [record.operation for record in profiler.records] == ["joint", "to_image"]
+    assert records == profiler.records
+
+    joint, render = profiler.records
+    assert joint.parts == 2
+    assert set(joint.stages) == {"layout"}
+
+    assert render.parts == 2
+    assert render.drawn == 2
+    assert render.bytes == 445 * 300 * 4
+    assert {"index", "plan", "allocate", "draw"} <= set(render.stages)
+    assert sum(render.stages.values()) <= render.seconds
+    assert len(render.slowest) == 1
+    _, source, position = render.slowest[0]
+    assert (source, position) in ((red, Vector(0, 135)), (large, Vector(45, 0)))
+
+    # nothing is recorded out of with block.
+    assert_image(layout.to_image(), image)
+    assert len(profiler.records) == 2
+
+
+def test_profiler_slowest_part(tmp_path):
+    from image_jointer import ImageJointer, JointAlignment, LazyImage, Profiler, Vector
+    from PIL import Image
+
+    # decoding large file takes far longer than pasting one pixel.
+    Image.effect_noise((2000, 2000), 64).save(tmp_path / "large.png")
+    large = LazyImage(tmp_path / "large.png")
+    dot = Image.new("RGB", (1, 1))
+    layout = ImageJointer().joint(JointAlignment.RIGHT_TOP, dot, large, dot)
+
+    with Profiler(slowest=1) as profiler:
+        layout.to_image()
+
+    (render,) = profiler.records
+    assert len(render.slowest) == 1
+    _, source, position = render.slowest[0]
+    assert source is large
+    assert position == Vector(1, 0)
+
+
+def test_profiler_workers_and_cache():
+    from image_jointer import Profiler, RenderCache
+
+    _, _, layout = make_layout()
+    with Profiler() as profiler:
+        layout.to_image(workers=2, cache=RenderCache())
+        layout.to_image(box=(0, 140, 10, 150))
+
+    first, second = profiler.records
+    assert "cache" in first.stages
+    assert first.drawn == 2
+    assert len(first.slowest) == 2
+    assert first.slowest[0][0] >= first.slowest[1][0]
+    assert second.drawn == 1
+    assert second.bytes == 10 * 10 * 4
+
+
+def test_profiler_to_array_and_save_streaming(tmp_path):
+    from image_jointer import Profiler
+
+    np = pytest.importorskip("numpy")
+    _, _, layout = make_layout()
+    with Profiler() as profiler:
+        array = layout.to_array(mode="RGB")
+        layout.save_streaming(tmp_path / "layout.png", band_height=100)
+
+    to_array, save = profiler.records
+    assert to_array.operation == "to_array"
+    assert to_array.bytes == array.nbytes
+    assert np.array_equal(array, np.asarray(layout.to_image(mode="RGB")))
+
+    assert save.operation == "save_streaming"
+    assert save.drawn == 1 + 2 + 1
+    assert "encode" in save.stages
+
+
+def test_profiler_nested():
+    from image_jointer import Profiler
+
+    _, _, layout = make_layout()
+    with Profiler() as outer:
+        with Profiler() as inner:
+            layout.to_image()
+        layout.to_image()
+
+    assert len(inner.records) == 1
+    assert len(outer.records) == 1
+
+    outer.clear()
+    assert outer.records == []
+
+    with pytest.raises(ValueError):
+        Profiler(slowest=-1)
+
+
+def test_profiler_conversions(tmp_path):
+    from image_jointer import ImageJointer, JointAlignment, LazyImage, Profiler
+    from PIL import Image
+
+    logo = Image.new("RGB", (10, 10), (255, 0, 0))
+    Image.new("RGBA", (10, 10), (0, 0, 255, 255)).save(tmp_path / "blue.png")
+    layout = ImageJointer().joint(
+        JointAlignment.RIGHT_CENTER,
+        *[logo] * 5,
+        *[LazyImage(tmp_path / "blue.png") for _ in range(3)],
+        Image.new("RGB", (10, 10)),
+    )
+
+    with Profiler() as profiler:
+        layout.to_image(mode="RGBA")
+        layout.to_image(mode="RGB")
+
+    rgba, rgb = profiler.records
+    # logo is converted once and file is decoded once.
+    assert (rgba.conversions, rgba.reused) == (2, 8)
+    assert "convert" in rgba.stages
+    # logo is already in mode of canvas.
+    assert (rgb.conversions, rgb.reused) == (1, 3)
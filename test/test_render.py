@@ -0,0 +1,631 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import pytest
+
+from assert_image import assert_image
+
+
+def make_mosaic():
+    from image_jointer import Blank, ImageJointer, JointAlignment
+    from PIL import Image
+
+    rows = []
+    for row in range(6):
+        images = [
+            Image.new("RGB", (10 + 7 * column, 10 + 5 * row), (40 * row, 30 * column, 255 - 20 * column))
+            for column in range(8)
+        ]
+        images.insert(row % 8, Blank(13, 4))
+        rows.append(ImageJointer().joint(JointAlignment.RIGHT_CENTER, *images))
+    return ImageJointer().joint(JointAlignment.DOWN_CENTER, *rows)
+
+
+@pytest.mark.parametrize(
+    "box",
+    (
+        (0, 0, 1, 1),
+        (12, 17, 95, 140),
+        (100, 20, 100, 40),
+        (-30, -30, 50, 50),
+        (300, 150, 600, 500),
+        (1000, 1000, 1010, 1010),
+    ),
+)
+def test_to_image_box(box: tuple[int, int, int, int]):
+    mosaic = make_mosaic()
+
+    assert_image(mosaic.to_image(box=box), mosaic.to_image().crop(box))
+
+
+def test_to_image_invalid_box():
+    mosaic = make_mosaic()
+
+    with pytest.raises(ValueError):
+        mosaic.to_image(box=(10, 10, 5, 20))
+
+
+@pytest.mark.parametrize(
+    "format, band_height",
+    (
+        ("PNG", 1),
+        ("PNG", 50),
+        ("PNG", 1000),
+        ("TIFF", 1),
+        ("TIFF", 50),
+        ("TIFF", 1000),
+    ),
+)
+def test_save_streaming(format: str, band_height: int):
+    import io
+    from PIL import Image
+
+    mosaic = make_mosaic()
+
+    stream = io.BytesIO()
+    mosaic.save_streaming(stream, format=format, band_height=band_height)
+    stream.seek(0)
+
+    saved = Image.open(stream)
+    assert saved.format == format
+    assert saved.mode == "RGBA"
+    assert_image(saved, mosaic.to_image())
+
+
+@pytest.mark.parametrize("band_height", (1, 7, 256))
+def test_save_streaming_png_filter(band_height: int):
+    import io
+
+    from image_jointer import ImageJointer
+    from PIL import Image
+
+    np = pytest.importorskip("numpy")
+
+    y, x = np.mgrid[0:120, 0:160]
+    gradient = Image.fromarray(np.stack([x, y, x + y], -1).astype(np.uint8), "RGB")
+    layout = ImageJointer(gradient)
+
+    stream = io.BytesIO()
+    layout.save_streaming(stream, "PNG", band_height=band_height, mode="RGB")
+    pillow = io.BytesIO()
+    gradient.save(pillow, "PNG")
+
+    # rows are filtered same as Pillow, also first row of each band.
+    assert_image(Image.open(stream), gradient)
+    assert len(stream.getvalue()) <= len(pillow.getvalue()) * 1.1
+
+
+def test_save_streaming_path(tmp_path):
+    from PIL import Image
+
+    mosaic = make_mosaic()
+
+    mosaic.save_streaming(tmp_path / "mosaic.png")
+
+    assert_image(Image.open(tmp_path / "mosaic.png"), mosaic.to_image())
+
+    with pytest.raises(ValueError):
+        mosaic.save_streaming(tmp_path / "mosaic.bmp")
+
+
+@pytest.mark.parametrize(
+    "format, mode, params",
+    (
+        ("PNG", "RGBA", {}),
+        ("PNG", "auto", {"compress_level": 1}),
+        ("TIFF", "L", {}),
+        ("JPEG", "RGB", {"quality": 90}),
+        ("PNG", "P", {}),
+        ("TIFF", "RGB", {"compression": "tiff_lzw"}),
+    ),
+)
+def test_save(format: str, mode: str, params: dict):
+    import io
+    from PIL import Image
+
+    mosaic = make_mosaic()
+
+    stream = io.BytesIO()
+    mosaic.save(stream, format, mode=mode, background="#0080ff", band_height=40, **params)
+    stream.seek(0)
+
+    expected = io.BytesIO()
+    mosaic.to_image(mode=mode, background="#0080ff").save(expected, format, **params)
+    expected.seek(0)
+
+    saved = Image.open(stream)
+    assert saved.format == format
+    assert_image(saved, Image.open(expected))
+
+
+def test_save_path(tmp_path):
+    from PIL import Image
+
+    mosaic = make_mosaic()
+
+    mosaic.save(tmp_path / "mosaic.tif")
+    mosaic.save(tmp_path / "mosaic.bmp", mode="RGB")
+
+    assert_image(Image.open(tmp_path / "mosaic.tif"), mosaic.to_image())
+    assert_image(Image.open(tmp_path / "mosaic.bmp"), mosaic.to_image(mode="RGB"))
+
+    with pytest.raises(ValueError):
+        mosaic.save(tmp_path / "mosaic.unknown")
+
+    # RGBA can not be saved as JPEG and no broken file is left.
+    with pytest.raises(OSError):
+        mosaic.save(tmp_path / "mosaic.jpg")
+    assert not (tmp_path / "mosaic.jpg").exists()
+
+
+@pytest.mark.parametrize(
+    "format, chunk_size",
+    (
+        ("PNG", 1),
+        ("PNG", 1000),
+        ("TIFF", 4096),
+        ("TIFF", 10**9),
+        ("GIF", 100),
+    ),
+)
+def test_iter_encoded(format: str, chunk_size: int):
+    import io
+
+    mosaic = make_mosaic()
+
+    chunks = list(mosaic.iter_encoded(format, mode="RGB", band_height=30, chunk_size=chunk_size))
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= chunk_size
+
+    expected = io.BytesIO()
+    mosaic.save(expected, format, mode="RGB", band_height=30)
+    assert b"".join(chunks) == expected.getvalue()
+
+    with pytest.raises(ValueError):
+        mosaic.iter_encoded(format, chunk_size=0)
+    with pytest.raises(ValueError):
+        mosaic.iter_encoded("UNKNOWN")
+
+
+@pytest.mark.parametrize("workers", (2, 3, 16, 1000))
+def test_to_image_workers(workers: int):
+    mosaic = make_mosaic()
+
+    assert_image(mosaic.to_image(workers=workers), mosaic.to_image())
+    assert_image(mosaic.to_image(box=(12, 17, 95, 140), workers=workers), mosaic.to_image(box=(12, 17, 95, 140)))
+
+    with pytest.raises(ValueError):
+        mosaic.to_image(workers=0)
+
+
+def test_to_image_workers_opened_source(tmp_path):
+    import sys
+
+    from image_jointer import PositionAlignment, Utility
+    from PIL import Image
+
+    source = Image.effect_noise((400, 300), 60).convert("RGB")
+    source.save(tmp_path / "source.png")
+    # switch threads often to make them load image at once.
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        expected = Utility.grid(PositionAlignment.TOP_LEFT, 4, *[source] * 16).to_image(mode="RGB")
+        for _ in range(5):
+            # image given by Image.open is not loaded until first paste.
+            with Image.open(tmp_path / "source.png") as opened:
+                jointed = Utility.grid(PositionAlignment.TOP_LEFT, 4, *[opened] * 16)
+                assert_image(jointed.to_image(workers=8, mode="RGB"), expected)
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+def make_overlay(*images):
+    from image_jointer import Vector
+    from image_jointer.base.adapter import ImageAdapter
+    from image_jointer.base.figure import Figure
+    from image_jointer.base.part import _Part
+    from PIL import Image
+
+    class Overlay(Figure):
+        """
+        Figure of images overlapping each other diagonally.
+        """
+
+        def __init__(self, *images: Image.Image) -> None:
+            self.images = images
+
+        @property
+        def width(self) -> int:
+            return max(image.width + 10 * i for i, image in enumerate(self.images))
+
+        @property
+        def height(self) -> int:
+            return max(image.height + 10 * i for i, image in enumerate(self.images))
+
+        def _paste(self, position: Vector):
+            for i, image in enumerate(self.images):
+                yield _Part(ImageAdapter(image), position + Vector(10 * i, 10 * i))
+
+        def _draw(self, output: Image.Image, position: Vector):
+            pass
+
+    return Overlay(*images)
+
+
+def draw_naive(jointed):
+    from image_jointer import Vector
+    from PIL import Image
+
+    output = Image.new("RGBA", (jointed.width, jointed.height), (0, 0, 0, 0))
+    for part in jointed._paste(Vector()):
+        part.draw(output)
+    return output
+
+
+def test_to_image_workers_overlapped():
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    overlay = make_overlay(*(Image.new("RGB", (30, 30), (80 * i, 255 - 80 * i, 0)) for i in range(4)))
+    jointed = ImageJointer(make_mosaic()).joint(JointAlignment.RIGHT_TOP, overlay, overlay)
+
+    expected = jointed.to_image()
+    assert expected.getpixel((make_mosaic().width + 25, 25)) == (160, 95, 0, 255)
+    assert_image(jointed.to_image(workers=4), expected)
+
+
+def test_to_image_hidden_parts():
+    from image_jointer import Blank, ImageJointer, JointAlignment
+    from PIL import Image
+
+    overlay = make_overlay(
+        Image.new("RGBA", (50, 50), (255, 0, 0, 100)),
+        Image.new("RGB", (20, 20), (0, 255, 0)),
+        Image.new("RGBA", (40, 10), (0, 0, 255, 0)),
+        Image.new("RGB", (15, 45), (255, 255, 0)),
+        Image.new("L", (40, 40), 30),
+    )
+    jointed = (
+        ImageJointer(make_mosaic())
+        .joint(JointAlignment.RIGHT_CENTER, overlay, Blank(20, 200), overlay)
+        .joint(JointAlignment.DOWN_RIGHT, Image.new("RGBA", (30, 7), (9, 9, 9, 9)), overlay)
+    )
+
+    expected = draw_naive(jointed)
+    assert_image(jointed.to_image(), expected)
+    assert_image(jointed.to_image(workers=3), expected)
+    assert_image(jointed.to_image(box=(280, 20, 380, 200)), expected.crop((280, 20, 380, 200)))
+
+
+def test_find_gaps():
+    from image_jointer.base.render_plan import _find_gaps
+
+    box = (0, 0, 40, 30)
+    overwrites = [(0, 0, 10, 10), (5, 5, 20, 12), (30, 0, 40, 30), (12, 20, 25, 30), (0, 25, 12, 30)]
+
+    gaps = _find_gaps(box, overwrites)
+
+    def pixels(boxes):
+        return [(x, y) for left, top, right, bottom in boxes for x in range(left, right) for y in range(top, bottom)]
+
+    covered = set(pixels(overwrites))
+    cleared = pixels(gaps)
+    assert len(cleared) == len(set(cleared))
+    assert set(cleared) == {(x, y) for x in range(40) for y in range(30)} - covered
+
+
+@pytest.mark.parametrize(
+    "source_mode, expected_mode",
+    (
+        ("RGB", "RGB"),
+        ("L", "L"),
+        ("LA", "LA"),
+        ("RGBA", "RGBA"),
+    ),
+)
+def test_to_image_mode_auto(source_mode: str, expected_mode: str):
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    images = [Image.new(source_mode, (10 + 5 * i, 20), (30 * i,) * len(source_mode)) for i in range(4)]
+    jointed = ImageJointer().joint(JointAlignment.RIGHT_CENTER, *images)
+
+    image = jointed.to_image(mode="auto")
+    assert image.mode == expected_mode
+    assert_image(image, jointed.to_image().convert(expected_mode))
+
+
+def test_to_image_mode_gaps():
+    from PIL import Image
+
+    mosaic = make_mosaic()
+
+    # blanks and differently sized images leave transparent gaps.
+    assert mosaic.to_image(mode="auto").mode == "RGBA"
+
+    image = mosaic.to_image(mode="auto", background=(255, 0, 0))
+    assert image.mode == "RGB"
+    expected = Image.new("RGBA", (mosaic.width, mosaic.height), (255, 0, 0, 255))
+    expected.alpha_composite(mosaic.to_image())
+    assert_image(image, expected.convert("RGB"))
+
+    image = mosaic.to_image(mode="RGB", box=(12, 17, 95, 140))
+    assert_image(image, mosaic.to_image(box=(12, 17, 95, 140)).convert("RGB"))
+
+    with pytest.raises(ValueError):
+        mosaic.to_image(mode="XYZ")
+    with pytest.raises(ValueError):
+        mosaic.to_image(mode="RGB", background="no such color")
+    with pytest.raises(ValueError):
+        mosaic.to_image(mode="auto", background="no such color")
+
+
+@pytest.mark.parametrize(
+    "source_mode, background, expected_mode",
+    (
+        ("L", "red", "RGB"),
+        ("L", "white", "L"),
+        ("L", (255, 255, 255), "RGB"),
+        ("L", (128, 128), "LA"),
+        ("RGB", (0, 0, 255, 0), "RGBA"),
+        ("RGB", "#00ff0080", "RGBA"),
+        ("RGB", 255, "RGB"),
+    ),
+)
+def test_to_image_mode_background(source_mode: str, background, expected_mode: str):
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    # images of different heights leave gaps filled by background.
+    images = [Image.new(source_mode, (10, 10 + 10 * i), 200) for i in range(3)]
+    jointed = ImageJointer().joint(JointAlignment.RIGHT_TOP, *images)
+    expected = jointed.to_image(mode=expected_mode, background=background)
+
+    image = jointed.to_image(mode="auto", background=background)
+    assert image.mode == expected_mode
+    assert_image(image, expected)
+
+    sources = {}
+
+    def source_id(source):
+        sources[id(source)] = source
+        return id(source)
+
+    # plan draws background everywhere parts are not known to cover.
+    plan = jointed.compile(source_id)
+    image = plan.to_image(sources.__getitem__, mode="auto", background=background)
+    assert image.mode == expected_mode
+    assert_image(image, expected)
+
+
+@pytest.mark.parametrize("format", ("PNG", "TIFF"))
+@pytest.mark.parametrize("mode", ("L", "LA", "RGB", "auto"))
+def test_save_streaming_mode(format: str, mode: str):
+    import io
+    from PIL import Image
+
+    mosaic = make_mosaic()
+
+    stream = io.BytesIO()
+    mosaic.save_streaming(stream, format=format, band_height=50, mode=mode, background="#0080ff")
+    stream.seek(0)
+
+    saved = Image.open(stream)
+    assert_image(saved, mosaic.to_image(mode=mode, background="#0080ff"))
+    assert saved.mode == ("RGB" if mode == "auto" else mode)
+
+
+def test_render_cache_mode():
+    from image_jointer import RenderCache
+
+    mosaic = make_mosaic()
+    cache = RenderCache()
+
+    for _ in range(3):
+        assert_image(mosaic.to_image(cache=cache, mode="RGB"), mosaic.to_image(mode="RGB"))
+        assert_image(mosaic.to_image(cache=cache), mosaic.to_image())
+
+
+@pytest.mark.parametrize("mode", ("RGBA", "RGB", "L"))
+def test_replace(mode: str):
+    from image_jointer import Blank, ImageJointer, JointAlignment
+    from PIL import Image
+
+    panels = [Image.new("RGB", (20 + 3 * i, 30), (10 * i, 50, 90)) for i in range(6)]
+    rows = [ImageJointer().joint(JointAlignment.RIGHT_CENTER, *panels[:3], Blank(5, 40)), panels[3]]
+    layout = ImageJointer().joint(
+        JointAlignment.DOWN_LEFT, *rows, ImageJointer(panels[4]).joint(JointAlignment.RIGHT_TOP, panels[0])
+    )
+
+    image = layout.to_image(mode=mode, background="gray")
+    new = Image.new("RGBA", panels[0].size, (200, 0, 0, 100))
+    replaced = layout.replace(panels[0], new, image, background="gray")
+
+    assert_image(image, replaced.to_image(mode=mode, background="gray"))
+    assert_image(layout.to_image(mode=mode, background="gray"), replaced.to_image(mode=mode, background="gray"), False)
+
+    # new source can be replaced again and original one is not in layout.
+    image = replaced.to_image()
+    again = replaced.replace(new, panels[5].resize(panels[0].size), image)
+    assert_image(image, again.to_image())
+    assert_image(again.to_image(), layout.replace(panels[0], panels[5].resize(panels[0].size)).to_image())
+    with pytest.raises(ValueError):
+        replaced.replace(panels[0], new)
+
+
+def test_replace_copy():
+    import copy
+    import pickle
+
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    left = Image.new("RGB", (10, 10), (255, 0, 0))
+    right = Image.new("RGB", (10, 10), (0, 255, 0))
+    blue = Image.new("RGB", (10, 10), (0, 0, 255))
+    layout = ImageJointer(left).joint(JointAlignment.RIGHT_TOP, right)
+    expected = layout.replace(left, blue).to_image()
+
+    # copy has its own sources, so only they are replaced.
+    for copied, copied_left in (copy.deepcopy((layout, left)), pickle.loads(pickle.dumps((layout, left)))):
+        with pytest.raises(ValueError):
+            copied.replace(left, blue)
+        assert_image(copied.replace(copied_left, blue).to_image(), expected)
+
+
+def test_replace_overlapped():
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    back = Image.new("RGB", (20, 20), (160, 95, 0))
+    front = Image.new("RGBA", (20, 20), (0, 0, 255, 128))
+    overlay = ImageJointer().joint(JointAlignment.RIGHT_TOP, make_overlay(back, front))
+
+    image = overlay.to_image()
+    replaced = overlay.replace(back, Image.new("L", (20, 20), 200), image)
+    assert_image(image, replaced.to_image())
+    assert_image(image, draw_naive(replaced))
+
+
+def test_replace_figure():
+    from image_jointer import Blank, ImageJointer, JointAlignment, Vector
+    from PIL import Image
+
+    left = Image.new("RGB", (10, 10), (255, 0, 0))
+    right = Image.new("RGB", (10, 10), (0, 255, 0))
+    layout = ImageJointer(left).joint(JointAlignment.RIGHT_TOP, right)
+    blue = Image.new("RGB", (10, 10), (0, 0, 255))
+
+    # layout of one part is replaced by its source.
+    image = layout.to_image()
+    replaced = layout.replace(right, ImageJointer(blue), image)
+    assert_image(image, ImageJointer(left).joint(JointAlignment.RIGHT_TOP, blue).to_image())
+    assert_image(replaced.to_image(), image)
+
+    halves = ImageJointer(Image.new("RGB", (5, 10))).joint(JointAlignment.RIGHT_TOP, Image.new("RGB", (5, 10)))
+    with pytest.raises(ValueError):
+        layout.replace(right, halves)
+    with pytest.raises(ValueError):
+        layout.replace(right, Blank(10, 10))
+
+    # layout drawn as figure is drawn at position.
+    output = Image.new("RGBA", (30, 10))
+    layout._draw(output, Vector(10, 0))
+    expected = Image.new("RGBA", (30, 10))
+    expected.paste(left, (10, 0))
+    expected.paste(right, (20, 0))
+    assert_image(output, expected)
+
+
+def test_replace_invalid():
+    from PIL import Image
+
+    mosaic = make_mosaic()
+
+    with pytest.raises(ValueError):
+        mosaic.replace(Image.new("RGB", (10, 10)), Image.new("RGB", (10, 10)))
+    with pytest.raises(ValueError):
+        mosaic.replace(Image.new("RGB", (10, 10)), Image.new("RGB", (10, 11)))
+    with pytest.raises(ValueError):
+        mosaic.replace(Image.new("RGB", (10, 10)), Image.new("RGB", (10, 10)), Image.new("RGBA", (1, 1)))
+
+
+def make_tiles(width: int, height: int, columns: int, rows: int):
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    return ImageJointer().joint(
+        JointAlignment.DOWN_LEFT,
+        *(
+            ImageJointer().joint(
+                JointAlignment.RIGHT_TOP,
+                *(Image.new("RGB", (width, height), (30 * column, 40 * row, 100)) for column in range(columns)),
+            )
+            for row in range(rows)
+        ),
+    )
+
+
+@pytest.mark.parametrize("scale, size", ((0.5, 5), (0.3, 3), (2, 20)))
+def test_to_image_scale(scale: float, size: int):
+    tiles = make_tiles(10, 10, 6, 4)
+
+    preview = tiles.to_image(scale=scale)
+    assert_image(preview, make_tiles(size, size, 6, 4).to_image())
+    assert_image(tiles.to_image(box=(3, 2, 17, 11), scale=scale), preview.crop((3, 2, 17, 11)))
+
+
+@pytest.mark.parametrize("scale", (0.5, 0.37, 0.1, 0.013))
+def test_to_image_scale_seam(scale: float):
+    tiles = make_tiles(7, 9, 11, 13)
+
+    preview = tiles.to_image(scale=scale)
+    assert preview.size == (int(77 * scale + 0.5), int(117 * scale + 0.5))
+    # parts share rounded edges, so no pixel is left transparent.
+    assert preview.getextrema()[3] == (255, 255)
+
+
+def test_to_image_max_size():
+    from image_jointer import Blank, ImageJointer
+
+    tiles = make_tiles(10, 10, 6, 4)
+
+    assert tiles.to_image(max_size=(30, 100)).size == (30, 20)
+    assert_image(tiles.to_image(max_size=(30, 100)), tiles.to_image(scale=0.5))
+    assert_image(tiles.to_image(max_size=(100, 100)), tiles.to_image())
+
+    # side of zero length does not limit scale.
+    assert ImageJointer(Blank(0, 500)).to_image(max_size=(100, 100)).size == (0, 100)
+
+    with pytest.raises(ValueError):
+        tiles.to_image(scale=0)
+    with pytest.raises(ValueError):
+        tiles.to_image(max_size=(0, 10))
+    with pytest.raises(ValueError):
+        tiles.to_image(scale=0.5, max_size=(30, 30))
+
+
+def test_to_image_scale_sources(tmp_path):
+    from image_jointer import Blank, ImageJointer, JointAlignment, LazyImage
+    from PIL import Image
+
+    red = Image.new("RGBA", (40, 20), (255, 0, 0, 128))
+    red.save(tmp_path / "red.png")
+    palette = Image.new("P", (40, 20), 0)
+    palette.putpalette([0, 0, 255])
+
+    layout = ImageJointer().joint(
+        JointAlignment.DOWN_LEFT, red, Blank(40, 10), LazyImage(tmp_path / "red.png"), palette
+    )
+    expected = ImageJointer().joint(
+        JointAlignment.DOWN_LEFT,
+        Image.new("RGBA", (10, 5), (255, 0, 0, 128)),
+        Blank(10, 3),
+        Image.new("RGBA", (10, 5), (255, 0, 0, 128)),
+        Image.new("RGB", (10, 5), (0, 0, 255)),
+    )
+
+    assert_image(layout.to_image(scale=0.25), expected.to_image())
+    assert_image(layout.to_image(scale=0.25, workers=4), expected.to_image())
+
+
+@pytest.mark.parametrize("source_mode", ["1", "L", "LA", "La", "RGB", "RGBA", "RGBa", "P", "CMYK"])
+@pytest.mark.parametrize("mode", ["L", "LA", "RGB", "RGBA"])
+def test_to_image_repeated_source(source_mode: str, mode: str):
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    if source_mode == "La" and mode != "LA":
+        pytest.skip("Pillow pastes La only into LA")
+
+    source = Image.new("RGBA", (4, 3))
+    source.putdata([(i * 20, 255 - i * 20, i * 7, 128 + i) for i in range(12)])
+    source = source.convert(source_mode)
+
+    repeated = ImageJointer().joint(JointAlignment.RIGHT_CENTER, source, source, source)
+    copied = ImageJointer().joint(JointAlignment.RIGHT_CENTER, source, source.copy(), source.copy())
+
+    assert_image(repeated.to_image(mode=mode), copied.to_image(mode=mode))
+    assert_image(repeated.to_image(box=(2, 1, 11, 3), mode=mode), copied.to_image(box=(2, 1, 11, 3), mode=mode))
@@ -0,0 +1,130 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import pytest
+
+from assert_image import assert_image
+
+
+def make_header():
+    from image_jointer import Blank, ImageJointer, JointAlignment
+    from PIL import Image
+
+    logo = Image.new("RGB", (30, 20), (255, 0, 0))
+    title = Image.new("RGBA", (120, 12), (0, 0, 255, 128))
+    return ImageJointer(logo).joint(JointAlignment.RIGHT_CENTER, Blank(5, 0), title)
+
+
+def make_report(header, i: int):
+    from image_jointer import ImageJointer, JointAlignment
+    from PIL import Image
+
+    body = ImageJointer().joint(
+        JointAlignment.DOWN_LEFT, *(Image.new("RGB", (40 + 10 * i, 15), (0, 20 * j, 10 * i)) for j in range(3))
+    )
+    return ImageJointer(header).joint(JointAlignment.DOWN_CENTER, body)
+
+
+def test_render_cache():
+    from image_jointer import RenderCache
+
+    header = make_header()
+    cache = RenderCache()
+
+    for i in range(5):
+        report = make_report(header, i)
+        assert_image(report.to_image(cache=cache), report.to_image())
+
+    # header is stored when it is found second time, and then pasted from cache.
+    assert len(cache) == 1
+    assert cache.hits == 3
+    assert cache.bytes == 155 * 20 * 4
+
+
+def test_render_cache_box_and_workers():
+    from image_jointer import ImageJointer, JointAlignment, RenderCache
+
+    header = make_header()
+    sheet = ImageJointer().joint(JointAlignment.RIGHT_TOP, *(make_report(header, i) for i in range(4)))
+    cache = RenderCache()
+
+    assert_image(sheet.to_image(cache=cache), sheet.to_image())
+    assert cache.hits >= 2
+    assert_image(sheet.to_image(cache=cache, workers=3), sheet.to_image())
+    assert_image(sheet.to_image(box=(100, 10, 400, 40), cache=cache), sheet.to_image(box=(100, 10, 400, 40)))
+
+
+def test_render_cache_eviction():
+    from image_jointer import ImageJointer, JointAlignment, RenderCache
+    from PIL import Image
+
+    rows = [
+        ImageJointer(Image.new("RGB", (10, 10), (i, 0, 0))).joint(JointAlignment.RIGHT_TOP, Image.new("RGB", (10, 10)))
+        for i in range(3)
+    ]
+    cache = RenderCache(max_bytes=20 * 10 * 4 * 2)
+
+    for row in rows:
+        ImageJointer(row).joint(JointAlignment.DOWN_LEFT, row).to_image(cache=cache)
+
+    # first row is least recently used.
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert cache.bytes == cache.max_bytes
+
+    hits = cache.hits
+    ImageJointer(rows[2]).joint(JointAlignment.DOWN_LEFT, rows[2]).to_image(cache=cache)
+    assert cache.hits == hits + 2
+
+    cache.clear()
+    assert (len(cache), cache.bytes, cache.hits, cache.misses, cache.evictions) == (0, 0, 0, 0, 0)
+
+    with pytest.raises(ValueError):
+        RenderCache(max_bytes=-1)
+
+
+def test_render_cache_overlapped():
+    from image_jointer import ImageJointer, JointAlignment, RenderCache
+    from PIL import Image
+
+    from test_render import draw_naive, make_overlay
+
+    pair = ImageJointer(Image.new("RGB", (25, 25), (0, 255, 0))).joint(
+        JointAlignment.RIGHT_TOP, Image.new("RGB", (25, 25), (255, 0, 255))
+    )
+    overlay = make_overlay(Image.new("RGB", (15, 15), (9, 9, 9)), Image.new("RGB", (15, 15), (99, 99, 99)))
+
+    # overlay draws over next pair, so the pair must not be pasted from cache.
+    class Narrow(type(overlay)):
+        @property
+        def width(self) -> int:
+            return 5
+
+    overlay = Narrow(*overlay.images)
+    jointed = ImageJointer(pair).joint(JointAlignment.RIGHT_TOP, pair, overlay, pair)
+    cache = RenderCache()
+
+    for _ in range(3):
+        assert_image(jointed.to_image(cache=cache), draw_naive(jointed))
+    assert cache.hits > 0
+
+
+def test_render_cache_long_chain():
+    from image_jointer import ImageJointer, JointAlignment, RenderCache
+    from PIL import Image
+
+    header = make_header()
+    red = Image.new("RGB", (2, 3), (255, 0, 0))
+    chain = ImageJointer(red)
+    for _ in range(400):
+        chain = chain.joint(JointAlignment.RIGHT_CENTER, red)
+    sheet = chain.joint(JointAlignment.DOWN_LEFT, header).joint(JointAlignment.DOWN_LEFT, header)
+    cache = RenderCache()
+
+    for _ in range(3):
+        assert_image(sheet.to_image(cache=cache), sheet.to_image())
+
+    # steps of joint chain are not nested layouts. only header is stored.
+    assert len(cache) == 1
+    assert cache.bytes == 155 * 20 * 4
@@ -0,0 +1,83 @@
+# Copyright (c) 2023 Nanahuse
+# This software is released under the MIT License
+# https://github.com/Nanahuse/ImageJointer/blob/main/LICENSE
+
+import pytest
+
+from assert_image import assert_image
+
+
+def make_layouts(tmp_path, count: int):
+    from image_jointer import ImageJointer, JointAlignment, LazyImage
+    from PIL import Image
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"source{i}.png"
+        Image.new("RGB", (10 + 5 * i, 8 + 3 * i), (80 * i, 40, 200)).save(path)
+        paths.append(path)
+
+    return [
+        ImageJointer().joint(JointAlignment.RIGHT_CENTER, *(LazyImage(paths[(i + j) % 3]) for j in range(i % 4 + 1)))
+        for i in range(count)
+    ]
+
+
+def test_render_many(tmp_path):
+    from image_jointer import Utility
+
+    layouts = make_layouts(tmp_path, 9)
+    calls = []
+
+    results = list(Utility.render_many(iter(layouts), workers=2, progress=lambda *args: calls.append(args)))
+
+    assert sorted(result.index for result in results) == list(range(9))
+    assert calls == [(i + 1, 0) for i in range(9)]
+    for result in results:
+        assert result.ok
+        assert result.path is None
+        assert_image(result.image, layouts[result.index].to_image())
+
+
+def test_render_many_out(tmp_path):
+    from image_jointer import Utility
+    from PIL import Image
+
+    layouts = make_layouts(tmp_path, 5)
+
+    results = list(Utility.render_many(layouts, workers=2, out=tmp_path / "out", mode="RGB"))
+    for result in results:
+        assert result.image is None
+        assert result.path == tmp_path / "out" / f"{result.index}.png"
+        assert_image(Image.open(result.path), layouts[result.index].to_image(mode="RGB"))
+
+    results = list(
+        Utility.render_many(
+            [layout.compile() for layout in layouts],
+            workers=1,
+            out=lambda i: tmp_path / f"{i}.jpg",
+            mode="RGB",
+            quality=95,
+        )
+    )
+    assert all(result.ok for result in results)
+    assert Image.open(tmp_path / "4.jpg").format == "JPEG"
+
+
+def test_render_many_error(tmp_path):
+    from image_jointer import ImageJointer, LayoutPlan, Utility
+    from PIL import Image
+
+    layouts = make_layouts(tmp_path, 4)
+    # sources of memory are not known to workers, and missing file fails in worker.
+    layouts[1] = ImageJointer(Image.new("RGB", (5, 5)))
+    layouts[2] = LayoutPlan(5, 5, [str(tmp_path / "missing.png")], [0], [0], [0], [5], [5])
+
+    results = {result.index: result for result in Utility.render_many(layouts, workers=2)}
+
+    assert [results[i].ok for i in range(4)] == [True, False, False, True]
+    assert "ValueError" in results[1].error
+    assert "missing.png" in results[2].error
+
+    with pytest.raises(ValueError):
+        Utility.render_many(layouts, workers=0)
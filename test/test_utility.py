@@ -43,3 +43,148 @@ def test_unify_image_size(alignment: PositionAlignment):
     expected_image = Image.open(IMAGE_FOLDER / "unify_image_size" / f"{alignment.name}_expected.png")
 
     assert_image(joint_img, expected_image)
+
+
+@pytest.mark.parametrize("alignment", tuple(PositionAlignment))
+def test_unify_image_size_same_as_joint(alignment: PositionAlignment):
+    from image_jointer import Blank, ImageJointer, JointAlignment, Utility
+    from PIL import Image
+
+    images = [Image.new("RGB", (10 + 7 * (i % 5), 10 + 3 * (i % 7)), (20 * i, 0, 200)) for i in range(12)]
+    images.append(ImageJointer(images[0]).joint(JointAlignment.DOWN_RIGHT, images[1]))
+    images.append(Blank(5, 5))
+    width = max(image.width for image in images)
+    height = max(image.height for image in images)
+
+    vertical, horizontal = alignment.name.split("_")
+    height_align = JointAlignment[f"RIGHT_{vertical}"]
+    width_align = JointAlignment[f"DOWN_{horizontal}"]
+
+    for image, result in zip(images, Utility.unify_image_size(alignment, *images)):
+        expected = ImageJointer(Blank(0, height)).joint(height_align, image).joint(width_align, Blank(width, 0))
+        assert (result.width, result.height) == (expected.width, expected.height)
+        assert_image(result.to_image(), expected.to_image())
+
+
+@pytest.mark.parametrize("mode", ("L", "RGB", "RGBA"))
+def test_unify_image_size_to_array(mode: str):
+    from image_jointer import Blank, Utility
+    from PIL import Image
+
+    np = pytest.importorskip("numpy")
+
+    images = (
+        Image.new("RGB", (30, 30), (255, 0, 0)),
+        Image.new("RGBA", (100, 50), (0, 255, 0, 100)),
+        Blank(30, 30),
+    )
+
+    array = Utility.unify_image_size_to_array(PositionAlignment.CENTER_RIGHT, *images, mode=mode, background="white")
+    assert array.shape[:3] == (3, 50, 100)
+    for result, unified in zip(array, Utility.unify_image_size(PositionAlignment.CENTER_RIGHT, *images)):
+        assert (result == np.asarray(unified.to_image(mode=mode, background="white"))).all()
+
+    out = np.zeros_like(array)
+    assert (
+        Utility.unify_image_size_to_array(
+            PositionAlignment.CENTER_RIGHT, *images, mode=mode, background="white", out=out
+        )
+        is out
+    )
+    assert (out == array).all()
+
+    with pytest.raises(ValueError):
+        Utility.unify_image_size_to_array(PositionAlignment.CENTER_RIGHT, *images, mode=mode, out=out[1:])
+    with pytest.raises(ValueError):
+        Utility.unify_image_size_to_array(PositionAlignment.CENTER_RIGHT, *images, mode="auto")
+
+
+@pytest.mark.parametrize("alignment", tuple(PositionAlignment))
+def test_grid(alignment: PositionAlignment):
+    from image_jointer import Blank, ImageJointer, JointAlignment, Utility
+    from PIL import Image
+
+    images = [Image.new("RGB", (10 + 7 * (i % 4), 10 + 5 * (i % 3)), (20 * i, 100, 200)) for i in range(10)]
+    images[4] = Blank(30, 12)
+    images[7] = ImageJointer(images[0]).joint(JointAlignment.RIGHT_BOTTOM, images[1])
+
+    grid = Utility.grid(alignment, 3, *images)
+
+    # same as jointing cells unified to width of column and height of row.
+    widths = [max(image.width for image in images[i::3]) for i in range(3)]
+    heights = [max(image.height for image in images[i : i + 3]) for i in range(0, 10, 3)]
+    rows = []
+    for i in range(0, 10, 3):
+        cells = [
+            Utility.unify_image_size(alignment, images[j], Blank(widths[j % 3], heights[i // 3]))[0]
+            for j in range(i, min(i + 3, 10))
+        ]
+        rows.append(ImageJointer().joint(JointAlignment.RIGHT_TOP, *cells))
+    expected = ImageJointer().joint(JointAlignment.DOWN_LEFT, *rows)
+
+    assert (grid.width, grid.height) == (expected.width, expected.height)
+    assert_image(grid.to_image(), expected.to_image())
+
+
+def test_grid_large():
+    from image_jointer import Utility
+    from PIL import Image
+
+    images = [Image.new("L", (1 + i % 3, 1 + i % 5), i % 256) for i in range(100000)]
+
+    grid = Utility.grid(PositionAlignment.CENTER_CENTER, 400, *images)
+
+    assert grid.width == 400 * 3
+    assert grid.height == 250 * 5
+
+
+def test_grid_invalid():
+    from image_jointer import Utility
+    from PIL import Image
+
+    with pytest.raises(ValueError):
+        Utility.grid(PositionAlignment.TOP_LEFT, 0, Image.new("RGB", (10, 10)))
+    with pytest.raises(ValueError):
+        Utility.grid(PositionAlignment.TOP_LEFT, 2, Image.new("RGB", (10, 10)), "image")
+
+
+@pytest.mark.parametrize("max_width, padding", ((None, 0), (None, 3), (120, 0), (64, 2)))
+def test_pack(max_width: int | None, padding: int):
+    from image_jointer import Blank, Utility
+    from image_jointer.base.spatial_index import _is_overlapped
+    from PIL import Image
+
+    images = {f"sprite{i}": Image.new("RGB", (5 + 11 * i % 60, 5 + 7 * i % 40), (i, 255 - i, 100)) for i in range(40)}
+    images["blank"] = Blank(20, 20)
+
+    packed, boxes = Utility.pack(images, max_width=max_width, padding=padding)
+    image = packed.to_image()
+
+    assert set(boxes) == set(images)
+    if max_width is not None:
+        assert packed.width <= max_width
+    for name, (left, top, right, bottom) in boxes.items():
+        assert (right - left, bottom - top) == (images[name].width, images[name].height)
+        assert 0 <= left and 0 <= top and right <= packed.width and bottom <= packed.height
+        if name != "blank":
+            assert_image(image.crop((left, top, right, bottom)), images[name].convert("RGBA"))
+
+    # boxes are apart by padding.
+    padded = [(left, top, right + padding, bottom + padding) for left, top, right, bottom in boxes.values()]
+    for i, first in enumerate(padded):
+        assert not any(_is_overlapped(first, second) for second in padded[i + 1 :])
+
+
+def test_pack_invalid():
+    from image_jointer import Utility
+    from PIL import Image
+
+    packed, boxes = Utility.pack({})
+    assert (packed.width, packed.height, boxes) == (0, 0, {})
+
+    with pytest.raises(ValueError):
+        Utility.pack({"a": Image.new("RGB", (10, 10))}, max_width=5)
+    with pytest.raises(ValueError):
+        Utility.pack({"a": Image.new("RGB", (10, 10))}, padding=-1)
+    with pytest.raises(ValueError):
+        Utility.pack({"a": "image"})